@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-to-end publishing and /api/pending-posts throughput, fully offline
+Starts the local Graph API, Drive and Sheets stand-ins from fake_services.py, points the poster
+at them (GRAPH_API_BASE_URL, SPREADSHEET_URL, a gspread stand-in for status write-back) and, for
+each sheet size, measures:
+
+- the cold sheet load and the first / repeated get_pending_posts calls (p50 / p99, peak memory)
+- repeated first-page reads of the indexed pending-posts view behind /api/pending-posts
+- one process_scheduled_posts run over the due posts: posts per minute, p50 / p99 per stage
+- the ledger's status replication and the requests each fake service received
+
+Results can be saved with --json and compared against an earlier run (e.g. of another commit)
+with --compare, so performance changes show up without touching real pages.
+
+Usage: python benchmarks/bench_offline.py [--rows 100 1000 10000 100000] [--due-posts 100]
+           [--graph-latency 0.05] [--error-rate 0.01] [--throttle-rate 0.01] [--json out.json]
+           [--compare baseline.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import resource
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+logging.disable(logging.CRITICAL) # Keep per-row log lines out of the timings
+
+from fake_services import Behaviour, FakeDrive, FakeGraphAPI, FakeGspreadClient, FakeSheets, SyntheticSheet
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def configure_environment(graph: FakeGraphAPI, workdir: str):
+    """Point the poster at the fakes. Limits and retry pacing default to values that measure the
+    code rather than the production budgets; anything already set in the environment wins."""
+    os.environ['GRAPH_API_BASE_URL'] = graph.api_base
+    os.environ['ENABLE_INTERNAL_SCHEDULER'] = 'false'
+    os.environ.pop('SPREADSHEET_URLS', None)
+    for name, value in {
+        'FB_ACCESS_TOKEN': 'bench-token',
+        'FB_PAGE_ID': 'bench-page',
+        'INSTAGRAM_BUSINESS_ACCOUNT_ID': 'bench-ig',
+        'RATE_LIMIT_FACEBOOK_PHOTOS': '1000000/1',
+        'RATE_LIMIT_INSTAGRAM_MEDIA': '1000000/1',
+        'RATE_LIMIT_INSTAGRAM_PUBLISH': '1000000/1',
+        'RATE_LIMIT_SHEETS': '1000000/1',
+        'RATE_LIMIT_COOLDOWN_SECONDS': '1',
+        'IG_POLL_INITIAL_SECONDS': '0.05',
+        'IG_POLL_MAX_SECONDS': '0.5',
+        'HTTP_BACKOFF_FACTOR': '0.05',
+        'MEDIA_CACHE_DIR': os.path.join(workdir, 'media'),
+        'MEDIA_PREFETCH_HOURS': '0', # No background passes skewing the request counts
+        'START_BACKGROUND_SERVICES': 'false', # Nor any other background service started by the import
+    }.items():
+        os.environ.setdefault(name, value)
+
+
+def run_scenario(services: dict, rows: int, args, workdir: str) -> dict:
+    from main import SocialMediaPoster
+
+    graph, drive, sheets = services['graph'], services['drive'], services['sheets']
+    sheet = SyntheticSheet.generate(rows, args.due_posts, drive.image_url)
+    os.environ['SPREADSHEET_URL'] = sheets.add(f"bench-{rows}", sheet)
+    os.environ['LEDGER_PATH'] = '' if args.no_ledger else os.path.join(workdir, f"ledger-{rows}.db")
+    poster = SocialMediaPoster()
+    poster.gc = FakeGspreadClient(sheets)
+    for service in services.values():
+        service.reset_counters()
+
+    start = time.perf_counter()
+    poster.load_schedule()
+    sheet_load = time.perf_counter() - start
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    pending = poster.get_pending_posts()
+    pending_first = time.perf_counter() - start
+    _, pending_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pending_calls = []
+    for _ in range(args.pending_calls):
+        start = time.perf_counter()
+        poster.get_pending_posts()
+        pending_calls.append(time.perf_counter() - start)
+
+    # The indexed view behind /api/pending-posts (skipped when benchmarking a version without it)
+    view_calls = []
+    if hasattr(poster, 'pending_posts_view'):
+        for _ in range(args.pending_calls):
+            start = time.perf_counter()
+            view = poster.pending_posts_view()
+            view.page(view.select(), limit=100)
+            view_calls.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    results = poster.process_scheduled_posts(tolerance_minutes=10)
+    publish_wall = time.perf_counter() - start
+
+    status_sync = 0.0
+    if poster.replicator is not None:
+        start = time.perf_counter()
+        poster.replicator.sync_once()
+        status_sync = time.perf_counter() - start
+
+    stage_samples = {}
+    for result in results:
+        for stage, seconds in (result.get('timings') or {}).items():
+            stage_samples.setdefault(stage, []).append(seconds)
+    posted = sum(1 for result in results if result.get('status') == 'Posted')
+
+    return {
+        'rows': rows,
+        'pending_rows': len(pending),
+        'sheet_load_s': round(sheet_load, 4),
+        'pending_first_call_s': round(pending_first, 4),
+        'pending_first_call_peak_mb': round(pending_peak / (1024 * 1024), 2),
+        'pending_p50_ms': round(percentile(pending_calls, 50) * 1000, 3),
+        'pending_p99_ms': round(percentile(pending_calls, 99) * 1000, 3),
+        'pending_view_p50_ms': round(percentile(view_calls, 50) * 1000, 3),
+        'pending_view_p99_ms': round(percentile(view_calls, 99) * 1000, 3),
+        'published': len(results),
+        'posted': posted,
+        'failed': len(results) - posted,
+        'publish_wall_s': round(publish_wall, 3),
+        'posts_per_minute': round(len(results) / publish_wall * 60, 1) if publish_wall and results else 0.0,
+        'status_sync_s': round(status_sync, 4),
+        'stages': {
+            stage: {'p50': round(percentile(samples, 50), 4), 'p99': round(percentile(samples, 99), 4)}
+            for stage, samples in sorted(stage_samples.items())
+        },
+        'requests': {
+            name: dict(sorted(service.requests.items())) for name, service in services.items()
+        } | {'sheets_api': dict(sorted(poster.gc.requests.items()))},
+        'faults': {name: dict(service.faults) for name, service in services.items() if service.faults},
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def print_report(report: dict):
+    print(f"\n== {report['rows']} rows ({report['pending_rows']} pending, {report['published']} due) ==")
+    print(f"sheet load (cold):      {report['sheet_load_s'] * 1000:.1f} ms")
+    print(f"pending posts, 1st:     {report['pending_first_call_s'] * 1000:.1f} ms, peak {report['pending_first_call_peak_mb']:.1f} MB allocated")
+    print(f"pending posts, cached:  p50 {report['pending_p50_ms']:.2f} ms, p99 {report['pending_p99_ms']:.2f} ms")
+    print(f"pending view, 1st page: p50 {report['pending_view_p50_ms']:.2f} ms, p99 {report['pending_view_p99_ms']:.2f} ms")
+    print(f"publish run:            {report['publish_wall_s']:.2f}s, {report['posts_per_minute']:.0f} posts/min "
+          f"({report['posted']} posted, {report['failed']} failed)")
+    for stage, values in report['stages'].items():
+        print(f"  {stage:<20} p50 {values['p50'] * 1000:8.1f} ms   p99 {values['p99'] * 1000:8.1f} ms")
+    print(f"status replication:     {report['status_sync_s'] * 1000:.1f} ms")
+    for name, counts in report['requests'].items():
+        print(f"  {name:<8} requests: {', '.join(f'{route} x{count}' for route, count in counts.items()) or 'none'}")
+    if report['faults']:
+        print(f"injected faults:        {report['faults']}")
+    print(f"peak RSS (process):     {report['peak_rss_mb']:.0f} MB")
+
+
+def flatten(report: dict, prefix: str = '') -> dict:
+    values = {}
+    for key, value in report.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            values[f"{prefix}{key}"] = value
+    return values
+
+
+def print_comparison(baseline: list[dict], current: list[dict]):
+    """Side-by-side numbers for scenarios present in both runs"""
+    previous = {report['rows']: flatten(report) for report in baseline}
+    for report in current:
+        before = previous.get(report['rows'])
+        if before is None:
+            continue
+        print(f"\n== {report['rows']} rows: baseline -> current ==")
+        for key, value in flatten(report).items():
+            if key in before and key != 'rows':
+                change = f"{(value - before[key]) / before[key] * 100:+.1f}%" if before[key] else 'n/a'
+                print(f"  {key:<45} {before[key]:>12} -> {value:<12} {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--due-posts', type=int, default=100, help='posts scheduled for now in each sheet')
+    parser.add_argument('--pending-calls', type=int, default=50, help='cached get_pending_posts calls to time')
+    parser.add_argument('--graph-latency', type=float, default=0.05)
+    parser.add_argument('--drive-latency', type=float, default=0.02)
+    parser.add_argument('--sheets-latency', type=float, default=0.05)
+    parser.add_argument('--container-seconds', type=float, default=0.3, help='time until an IG container is FINISHED')
+    parser.add_argument('--image-kb', type=int, default=200)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of Graph/Drive requests failing with 5xx')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of Graph requests answered with a rate-limit error')
+    parser.add_argument('--no-ledger', action='store_true', help='run without the post ledger (direct status write-back)')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='results file of an earlier run to compare against')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='poster-bench-')
+    services = {
+        'graph': FakeGraphAPI(Behaviour(args.graph_latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate),
+                              container_seconds=args.container_seconds).start(),
+        'drive': FakeDrive(Behaviour(args.drive_latency, error_rate=args.error_rate), image_bytes=args.image_kb * 1024).start(),
+        'sheets': FakeSheets(Behaviour(args.sheets_latency)).start(),
+    }
+    configure_environment(services['graph'], workdir)
+    try:
+        reports = []
+        for rows in args.rows:
+            report = run_scenario(services, rows, args, workdir)
+            print_report(report)
+            reports.append(report)
+    finally:
+        for service in services.values():
+            service.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), reports)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: row-by-row parse_datetime vs. vectorized resolve_schedule
+Builds a synthetic sheet (50k rows by default) and times both schedule-resolution paths.
+
+Usage: python benchmarks/bench_schedule_parsing.py [rows]
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+logging.disable(logging.CRITICAL) # Keep per-row log lines out of the timings
+
+from main import SocialMediaPoster
+
+
+def build_sheet(rows: int, outlier_ratio: float = 0.01) -> pd.DataFrame:
+    """Synthetic sheet in the dashboard's usual formats, with a few rows in other formats"""
+    random.seed(42)
+    start = datetime.now() - timedelta(days=180)
+    records = []
+    for i in range(rows):
+        scheduled = start + timedelta(minutes=random.randint(0, 365 * 24 * 60))
+        date_fmt, time_fmt = '%d %B %Y', '%I:%M %p'
+        if random.random() < outlier_ratio:
+            date_fmt = random.choice(SocialMediaPoster.DATE_FORMATS)
+            time_fmt = random.choice(SocialMediaPoster.TIME_FORMATS)
+        records.append({
+            'Date': scheduled.strftime(date_fmt),
+            'Post Timings': scheduled.strftime(time_fmt),
+            'Caption': f'Caption {i}',
+            'Hashtags': '#bench',
+            'Filename.jpg': f'https://example.com/{i}.jpg',
+            'Status': random.choice(['', 'Pending', 'Posted']),
+        })
+    return pd.DataFrame(records)
+
+
+def row_by_row(poster: SocialMediaPoster, df: pd.DataFrame, tolerance_minutes: int = 10) -> int:
+    """The previous iterrows + parse_datetime + is_time_to_post loop"""
+    due = 0
+    for _, row in df.iterrows():
+        scheduled_datetime = poster.parse_datetime(str(row['Date']), str(row['Post Timings']))
+        if scheduled_datetime and poster.is_time_to_post(scheduled_datetime, tolerance_minutes):
+            due += 1
+    return due
+
+
+def vectorized(poster: SocialMediaPoster, df: pd.DataFrame, tolerance_minutes: int = 10) -> int:
+    scheduled = poster.resolve_schedule(df)
+    return int(poster.due_mask(scheduled, tolerance_minutes).sum())
+
+
+def timed(func, *args) -> tuple[float, int]:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    poster = SocialMediaPoster()
+    df = build_sheet(rows)
+    
+    old_seconds, old_due = timed(row_by_row, poster, df)
+    new_seconds, new_due = timed(vectorized, poster, df)
+    
+    print(f"rows:          {rows}")
+    print(f"row-by-row:    {old_seconds:.3f}s ({old_due} due)")
+    print(f"vectorized:    {new_seconds:.3f}s ({new_due} due)")
+    print(f"speedup:       {old_seconds / new_seconds:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-tick DataFrame path vs. the columnar ScheduleSnapshot
+Builds a wide synthetic sheet (20k rows, 30 extra columns by default) and measures, with
+tracemalloc, the memory allocated by one scheduler tick plus one /api/pending-posts call on
+each path, along with the memory the snapshot keeps alive between ticks.
+
+Usage: python benchmarks/bench_schedule_snapshot.py [rows] [extra_columns]
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+logging.disable(logging.CRITICAL) # Keep per-row log lines out of the measurements
+
+from main import SocialMediaPoster
+
+
+def build_sheet(poster: SocialMediaPoster, rows: int, extra_columns: int) -> pd.DataFrame:
+    """Synthetic sheet around now, with the internal identity columns a real load adds"""
+    random.seed(42)
+    start = datetime.now() - timedelta(days=7)
+    hashtags = [f'#brand #campaign{i}' for i in range(20)]
+    records = []
+    for i in range(rows):
+        scheduled = start + timedelta(minutes=random.randint(0, 14 * 24 * 60))
+        record = {
+            'Date': scheduled.strftime('%d %B %Y'),
+            'Post Timings': scheduled.strftime('%I:%M %p'),
+            'Caption': f'Caption for post {i} ' + 'lorem ipsum ' * 10,
+            'Hashtags': random.choice(hashtags),
+            'Filename.jpg': f'https://example.com/images/{i}.jpg',
+            'Status': random.choice(['', 'Pending', 'Posted', 'Posted']),
+        }
+        for column in range(extra_columns):
+            record[f'Notes {column}'] = f'note {column}-{i % 50}'
+        records.append(record)
+    return poster._assign_row_identity(pd.DataFrame(records), 'https://docs.google.com/spreadsheets/d/bench/edit')
+
+
+def dataframe_tick(poster: SocialMediaPoster, df: pd.DataFrame, tolerance_minutes: int = 10) -> int:
+    """The previous per-tick path: filter and copy the pending rows, parse, then a Series per due row
+    and a dict per pending row for the API"""
+    pending_posts = poster._drop_unscheduled(poster._select_pending(df), '')
+    scheduled = poster.resolve_schedule(pending_posts)
+    due = poster.due_mask(scheduled, tolerance_minutes)
+    ready_posts = [{'index': index, 'row': row} for index, row in pending_posts[due].iterrows()]
+    api_rows = pending_posts.to_dict('records')
+    return len(ready_posts) + len(api_rows)
+
+
+def snapshot_tick(poster: SocialMediaPoster, df: pd.DataFrame, tolerance_minutes: int = 10) -> int:
+    """The snapshot path: after the first tick the snapshot is reused, so a tick is one vectorized
+    comparison plus a two-slot record per row"""
+    snapshot = poster.schedule_snapshot(df)
+    ready_posts = [{'index': row.index, 'row': row} for row in snapshot.records(snapshot.due_positions(datetime.now(), tolerance_minutes))]
+    api_rows = snapshot.records()
+    return len(ready_posts) + len(api_rows)
+
+
+def measure(func, *args) -> tuple[float, int, int]:
+    """(seconds, peak bytes allocated during the call, bytes still allocated afterwards)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    seconds = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, retained
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    extra_columns = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    poster = SocialMediaPoster()
+    df = build_sheet(poster, rows, extra_columns)
+
+    frame_seconds, frame_peak, _ = measure(dataframe_tick, poster, df)
+    build_seconds, build_peak, snapshot_retained = measure(poster.schedule_snapshot, df)
+    tick_seconds, tick_peak, _ = measure(snapshot_tick, poster, df)
+    snapshot = poster.schedule_snapshot(df)
+
+    mb = 1024 * 1024
+    print(f"rows:                 {rows} ({len(snapshot)} pending, {len(df.columns)} columns)")
+    print(f"DataFrame tick:       {frame_seconds:.3f}s, peak {frame_peak / mb:.1f} MB allocated")
+    print(f"snapshot build:       {build_seconds:.3f}s, peak {build_peak / mb:.1f} MB allocated (once per load)")
+    print(f"snapshot retained:    {snapshot_retained / mb:.1f} MB traced, ~{snapshot.nbytes() / mb:.1f} MB by nbytes()")
+    print(f"snapshot tick:        {tick_seconds:.3f}s, peak {tick_peak / mb:.1f} MB allocated")
+    print(f"per-tick allocation:  {frame_peak / max(tick_peak, 1):.1f}x less, {frame_seconds / tick_seconds:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
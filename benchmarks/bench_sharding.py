@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark: publishing throughput of N sharded instances sharing one lease store
+Starts the local Graph API, Drive and Sheets stand-ins from fake_services.py and, for each
+instance count, N app processes sharing a SQLite (or file) lease store through SHARD_STORE, each
+with its own ledger, as separate Cloud Run instances would have. Once every instance has joined,
+all of them run process_scheduled_posts over the same sheet at the same moment. Reports:
+
+- wall time until the last instance finished, and posts per minute over all instances
+- posts published per instance, and how many due posts each skipped as another instance's or
+  found already leased
+- Graph photo uploads and Instagram publishes compared to the due posts: any difference means a
+  post went out twice (or not at all)
+
+Per-instance limits (PUBLISH_WORKERS, the Graph rate limits) stay the same, so the posts per
+minute should grow with the number of instances. Each instance has its own ledger and media
+cache, as separate Cloud Run instances would.
+
+Usage: python benchmarks/bench_sharding.py [--instances 1 2 4] [--due-posts 200] [--rows 1000]
+           [--graph-latency 0.05] [--steal-after 300] [--store sqlite|file] [--json out.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fake_services import Behaviour, FakeDrive, FakeGraphAPI, FakeSheets, SyntheticSheet
+from bench_offline import configure_environment
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def run_instance():
+    """Runs inside an instance process: joins the shards, then publishes once told to start"""
+    logging.disable(logging.CRITICAL) # Keep per-row log lines out of the timings
+    import main
+    main.poster.gc = None # Sheets are read through the CSV export; statuses stay in the ledger
+    main.poster.shards.start()
+    print('ready', flush=True)
+    sys.stdin.readline() # Every instance has joined
+
+    started = time.perf_counter()
+    results = main.poster.process_scheduled_posts(tolerance_minutes=10)
+    wall = time.perf_counter() - started
+    stats = main.poster.shards.stats
+    print(json.dumps({
+        'instance': main.poster.shards.instance_id,
+        'members': len(main.poster.shards.members()),
+        'published': len(results),
+        'posted': sum(1 for result in results if result.get('status') == 'Posted'),
+        'wall_s': round(wall, 3),
+        'foreign': stats['foreign'],
+        'taken': stats['taken'],
+        'errors': sorted({str(result.get('error')) for result in results if result.get('status') != 'Posted'}),
+    }), flush=True)
+
+
+def run_scenario(instances: int, args, spreadsheet_url: str, workdir: str) -> list[dict]:
+    store = (f"sqlite://{os.path.join(workdir, f'leases-{instances}.db')}" if args.store == 'sqlite'
+             else f"file://{os.path.join(workdir, f'leases-{instances}')}")
+    processes = []
+    for number in range(instances):
+        env = {
+            **os.environ,
+            'SPREADSHEET_URL': spreadsheet_url,
+            'SHARD_STORE': store,
+            'SHARD_INSTANCE_ID': f"instance-{number}",
+            'LEDGER_PATH': os.path.join(workdir, f"ledger-{instances}-{number}.db"),
+            'MEDIA_CACHE_DIR': os.path.join(workdir, f"media-{instances}-{number}"),
+            'SHARD_STEAL_AFTER_SECONDS': str(args.steal_after),
+            'STARTUP_WARMUP': 'off',
+        }
+        processes.append(subprocess.Popen([sys.executable, os.path.abspath(__file__), '--instance'], cwd=ROOT, env=env,
+                                          stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True))
+    try:
+        for process in processes:
+            if process.stdout.readline().strip() != 'ready':
+                raise RuntimeError(f"instance exited with code {process.wait()}")
+        for process in processes:
+            process.stdin.write('start\n')
+            process.stdin.flush()
+        return [json.loads(process.stdout.readline()) for process in processes]
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait(timeout=30)
+
+
+def summarize(instances: int, reports: list[dict], graph: FakeGraphAPI, due_posts: int) -> dict:
+    wall = max(report['wall_s'] for report in reports)
+    published = sum(report['published'] for report in reports)
+    return {
+        'instances': instances,
+        'due_posts': due_posts,
+        'published': published,
+        'posted': sum(report['posted'] for report in reports),
+        'wall_s': wall,
+        'posts_per_minute': round(published / wall * 60, 1) if wall else 0.0,
+        'per_instance': {report['instance']: report['published'] for report in reports},
+        'skipped_foreign': sum(report['foreign'] for report in reports),
+        'skipped_taken': sum(report['taken'] for report in reports),
+        'errors': sorted({error for report in reports for error in report['errors']}),
+        'facebook_uploads': graph.requests.get('POST photos', 0),
+        'instagram_publishes': graph.requests.get('POST media_publish', 0),
+    }
+
+
+def print_report(report: dict):
+    print(f"\n== {report['instances']} instance(s), {report['due_posts']} due posts ==")
+    print(f"wall time:          {report['wall_s']:.2f}s, {report['posts_per_minute']:.0f} posts/min")
+    print(f"published:          {report['published']} ({report['posted']} posted); per instance: "
+          + ', '.join(f"{name} {count}" for name, count in report['per_instance'].items()))
+    print(f"skipped:            {report['skipped_foreign']} other instances' posts, {report['skipped_taken']} already leased")
+    duplicates = report['facebook_uploads'] - report['due_posts']
+    print(f"Graph uploads:      {report['facebook_uploads']} photos, {report['instagram_publishes']} IG publishes"
+          + (f"  <-- {duplicates:+d} vs due posts" if duplicates else '  (each due post exactly once)'))
+
+
+def main():
+    if sys.argv[1:] == ['--instance']:
+        run_instance()
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--instances', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--due-posts', type=int, default=200, help='posts scheduled for now in the sheet')
+    parser.add_argument('--graph-latency', type=float, default=0.05)
+    parser.add_argument('--drive-latency', type=float, default=0.02)
+    parser.add_argument('--container-seconds', type=float, default=0.3, help='time until an IG container is FINISHED')
+    parser.add_argument('--steal-after', type=float, default=300,
+                        help="SHARD_STEAL_AFTER_SECONDS; the sheet's due posts are up to 3 minutes overdue, which a "
+                             "lower value lets every instance race for instead of leaving them to their shard")
+    parser.add_argument('--store', choices=['sqlite', 'file'], default='sqlite', help='lease store shared by the instances')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='poster-shards-')
+    graph = FakeGraphAPI(Behaviour(args.graph_latency), container_seconds=args.container_seconds).start()
+    drive = FakeDrive(Behaviour(args.drive_latency)).start()
+    sheets = FakeSheets().start()
+    configure_environment(graph, workdir) # Inherited by the instance processes
+    try:
+        results = []
+        for instances in args.instances:
+            # A fresh sheet per scenario, so every run starts with the same due posts
+            spreadsheet_url = sheets.add(f"shards-{instances}", SyntheticSheet.generate(args.rows, args.due_posts, drive.image_url))
+            graph.reset_counters()
+            report = summarize(instances, run_scenario(instances, args, spreadsheet_url, workdir), graph, args.due_posts)
+            print_report(report)
+            results.append(report)
+    finally:
+        for service in (graph, drive, sheets):
+            service.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pandas vs. csv (SheetTable) sheet backend
+For each backend (SHEET_BACKEND) and sheet size, a fresh interpreter parses a CSV export the
+way load_google_spreadsheet does (parse, row identity, schedule snapshot) and reports:
+
+- the first load, including the lazy import of pandas / numpy (what the first request pays)
+- p50 / p99 of repeated loads of the same export
+- peak memory allocated by one load and the memory the loaded sheet keeps alive (tracemalloc)
+- peak RSS of the process
+
+Each backend runs in its own process so import cost and RSS are not shared between them.
+
+Usage: python benchmarks/bench_sheet_backends.py [--rows 100 500 5000] [--repeat 50]
+           [--backends pandas csv] [--json out.json]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import subprocess
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fake_services import SyntheticSheet
+
+SPREADSHEET_URL = 'https://docs.google.com/spreadsheets/d/bench/edit'
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def measure_backend(backend: str, rows: int, repeat: int) -> dict:
+    """Runs inside the child process: SHEET_BACKEND is already set in its environment"""
+    logging.disable(logging.CRITICAL) # Keep per-row log lines out of the timings
+    text = SyntheticSheet.generate(rows, 0, lambda file_id: f"https://example.com/images/{file_id}.jpg").to_csv()[0].decode()
+
+    started = time.perf_counter()
+    from main import SocialMediaPoster
+    poster = SocialMediaPoster()
+    import_seconds = time.perf_counter() - started
+
+    def load():
+        sheet = poster._assign_row_identity(poster.table_from_csv(text), SPREADSHEET_URL)
+        return sheet, poster.schedule_snapshot(sheet)
+
+    started = time.perf_counter()
+    load()
+    first_load = time.perf_counter() - started
+
+    loads = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        load()
+        loads.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    sheet, snapshot = load()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mb = 1024 * 1024
+    return {
+        'backend': backend,
+        'rows': rows,
+        'pending_rows': len(snapshot),
+        'import_s': round(import_seconds, 4),
+        'first_load_s': round(first_load, 4),
+        'load_p50_ms': round(percentile(loads, 50) * 1000, 3),
+        'load_p99_ms': round(percentile(loads, 99) * 1000, 3),
+        'load_peak_mb': round(peak / mb, 2),
+        'retained_mb': round(retained / mb, 2),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'pandas_imported': 'pandas' in sys.modules,
+    }
+
+
+def run_child(backend: str, rows: int, repeat: int) -> dict:
+    env = {**os.environ, 'SHEET_BACKEND': backend, 'STARTUP_WARMUP': 'off', 'LEDGER_PATH': '',
+           'MEDIA_PREFETCH_HOURS': '0', 'ENABLE_INTERNAL_SCHEDULER': 'false', 'START_BACKGROUND_SERVICES': 'false'}
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', backend, str(rows), str(repeat)],
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_report(reports: list[dict]):
+    rows = reports[0]['rows']
+    print(f"\n== {rows} rows ({reports[0]['pending_rows']} pending) ==")
+    print(f"{'':<24}" + ''.join(f"{report['backend']:>12}" for report in reports))
+    for key, label in (('first_load_s', 'first load (s)'), ('load_p50_ms', 'load p50 (ms)'), ('load_p99_ms', 'load p99 (ms)'),
+                       ('load_peak_mb', 'load peak (MB)'), ('retained_mb', 'retained (MB)'), ('peak_rss_mb', 'peak RSS (MB)')):
+        print(f"{label:<24}" + ''.join(f"{report[key]:>12}" for report in reports))
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == '--child':
+        print(json.dumps(measure_backend(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 500, 5000])
+    parser.add_argument('--repeat', type=int, default=50, help='repeated loads to time per backend')
+    parser.add_argument('--backends', nargs='+', default=['pandas', 'csv'])
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        reports = [run_child(backend, rows, args.repeat) for backend in args.backends]
+        print_report(reports)
+        results.extend(reports)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start of the app server, per STARTUP_WARMUP mode
+Starts the app the way the container does (gunicorn, 1 worker, 8 threads; the Flask development
+server with --server flask) against a local Sheets stand-in, and measures for each mode:
+
+- spawn to first healthy /health response (what a Cloud Run cold start waits for)
+- the app's own import time and warm-up time, as reported by /api/status
+- latency of the first /api/pending-posts request (a sheet load, plus any lazy imports), sent
+  --settle seconds after the first healthy response
+- peak RSS of the server process
+
+Each mode is started --repeat times and the median is reported. Results can be saved with
+--json and compared against an earlier run with --compare, so startup time can be tracked
+across commits.
+
+Usage: python benchmarks/bench_startup.py [--modes off background eager] [--repeat 5]
+           [--rows 500] [--settle 0] [--server gunicorn|flask] [--json out.json] [--compare baseline.json]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import argparse
+import statistics
+import subprocess
+
+import requests
+
+from fake_services import FakeDrive, FakeSheets, SyntheticSheet
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb(pid: int) -> float:
+    """Largest VmHWM of a running process and its children, i.e. the gunicorn worker (Linux);
+    0 where /proc is not available"""
+    peak = 0
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids = [pid] + [int(child) for child in f.read().split()]
+        for process_id in pids:
+            with open(f"/proc/{process_id}/status") as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        peak = max(peak, int(line.split()[1]))
+    except OSError:
+        pass
+    return round(peak / 1024, 1)
+
+
+def server_command(server: str, port: int) -> list[str]:
+    if server == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '--bind', f"127.0.0.1:{port}", '--workers', '1',
+                '--threads', '8', '--timeout', '0', '--log-level', 'warning', 'main:app']
+    return [sys.executable, 'main.py']
+
+
+def start_once(mode: str, server: str, spreadsheet_url: str, workdir: str, settle: float = 0.0,
+               timeout: float = 60.0) -> dict:
+    port = free_port()
+    env = {
+        **os.environ,
+        'PORT': str(port),
+        'STARTUP_WARMUP': mode,
+        'SPREADSHEET_URL': spreadsheet_url,
+        'LEDGER_PATH': os.path.join(workdir, f"ledger-{port}.db"),
+        'MEDIA_CACHE_DIR': os.path.join(workdir, 'media'),
+        'MEDIA_PREFETCH_HOURS': '0',
+        'ENABLE_INTERNAL_SCHEDULER': 'false',
+    }
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(server_command(server, port), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{server} exited with code {process.returncode}")
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError(f"no healthy response within {timeout:.0f}s")
+            try:
+                if requests.get(f"{base}/health", timeout=1).status_code == 200:
+                    break
+            except requests.exceptions.ConnectionError:
+                time.sleep(0.005)
+        first_health = time.perf_counter() - started
+
+        start = time.perf_counter()
+        requests.get(f"{base}/health", timeout=10)
+        warm_health = time.perf_counter() - start
+
+        time.sleep(settle)
+        start = time.perf_counter()
+        pending = requests.get(f"{base}/api/pending-posts", timeout=60)
+        first_pending = time.perf_counter() - start
+
+        app_startup = requests.get(f"{base}/api/status", timeout=10).json().get('startup') or {}
+        return {
+            'spawn_to_health_s': round(first_health, 3),
+            'warm_health_ms': round(warm_health * 1000, 2),
+            'first_pending_ms': round(first_pending * 1000, 1),
+            'pending_rows': len(pending.json().get('posts', [])) if pending.ok else -1,
+            'import_s': app_startup.get('import_seconds', 0.0),
+            'warmup_s': app_startup.get('warmup_seconds', 0.0),
+            'peak_rss_mb': peak_rss_mb(process.pid),
+        }
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def run_mode(mode: str, args, spreadsheet_url: str, workdir: str) -> dict:
+    samples = [start_once(mode, args.server, spreadsheet_url, workdir, args.settle) for _ in range(args.repeat)]
+    report = {'mode': mode, 'server': args.server, 'repeat': args.repeat}
+    for key in samples[0]:
+        report[key] = statistics.median(sample[key] for sample in samples)
+    return report
+
+
+def print_report(report: dict):
+    print(f"\n== STARTUP_WARMUP={report['mode']} ({report['server']}, median of {report['repeat']}) ==")
+    print(f"spawn to first /health:  {report['spawn_to_health_s'] * 1000:.0f} ms")
+    print(f"app import (in-process): {report['import_s'] * 1000:.0f} ms, warm-up {report['warmup_s'] * 1000:.0f} ms")
+    print(f"warm /health:            {report['warm_health_ms']:.1f} ms")
+    print(f"first /api/pending-posts: {report['first_pending_ms']:.0f} ms ({report['pending_rows']:.0f} rows)")
+    print(f"peak RSS (server):       {report['peak_rss_mb']:.0f} MB")
+
+
+def print_comparison(baseline: list[dict], current: list[dict]):
+    """Side-by-side numbers for modes present in both runs"""
+    previous = {report['mode']: report for report in baseline}
+    for report in current:
+        before = previous.get(report['mode'])
+        if before is None:
+            continue
+        print(f"\n== {report['mode']}: baseline -> current ==")
+        for key, value in report.items():
+            if isinstance(value, (int, float)) and key in before and key != 'repeat':
+                change = f"{(value - before[key]) / before[key] * 100:+.1f}%" if before[key] else 'n/a'
+                print(f"  {key:<20} {before[key]:>10} -> {value:<10} {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--modes', nargs='+', default=['off', 'background', 'eager'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=500, help='rows in the served sheet')
+    parser.add_argument('--settle', type=float, default=0.0,
+                        help='seconds between the first healthy response and the first /api/pending-posts '
+                             '(longer than STARTUP_WARMUP_DELAY_SECONDS plus the warm-up shows the warmed path)')
+    parser.add_argument('--server', choices=['gunicorn', 'flask'], default='gunicorn')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='results file of an earlier run to compare against')
+    args = parser.parse_args()
+
+    drive = FakeDrive().start()
+    sheets = FakeSheets().start()
+    spreadsheet_url = sheets.add('startup', SyntheticSheet.generate(args.rows, 0, drive.image_url))
+    reports = []
+    with tempfile.TemporaryDirectory(prefix='poster-startup-') as workdir:
+        try:
+            for mode in args.modes:
+                report = run_mode(mode, args, spreadsheet_url, workdir)
+                print_report(report)
+                reports.append(report)
+        finally:
+            drive.stop()
+            sheets.stop()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), reports)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,388 @@
+"""
+Local stand-ins for the services the poster talks to, for offline benchmarks and load tests.
+
+- FakeGraphAPI: /{page}/photos, /{ig}/media, /{ig}/media_publish and the batched container
+  status lookup (/?ids=...), with containers that finish after a configurable delay
+- FakeDrive: /uc?export=download&id=... serving JPEG bytes of a configurable size
+- FakeSheets: /spreadsheets/d/{id}/export?format=csv with ETag / If-None-Match support
+- FakeGspreadClient: in-process gspread stand-in used for status write-back, writing into
+  the same SyntheticSheet the CSV export serves
+
+Every server takes a Behaviour (latency, injected 5xx errors and rate-limit responses) and
+counts requests per route, so runs can be compared on request volume as well as time.
+"""
+
+import json
+import random
+import struct
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from gspread.utils import a1_to_rowcol
+
+HEADER = ['Date', 'Post Timings', 'Caption', 'Hashtags', 'Filename.jpg', 'Status']
+
+
+class Behaviour:
+    """How a fake service responds: latency (mean seconds, +/- jitter fraction) and the share of
+    requests answered with a server error or a rate-limit error instead of the real response"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.5, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, seed: int = 42):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        if self.latency > 0:
+            with self._lock:
+                spread = self._random.uniform(-self.jitter, self.jitter)
+            time.sleep(max(0.0, self.latency * (1 + spread)))
+
+    def fault(self) -> str | None:
+        """'error', 'throttle' or None for a normal response"""
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.error_rate:
+            return 'error'
+        if roll < self.error_rate + self.throttle_rate:
+            return 'throttle'
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # Keep-alive, as the real endpoints allow
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                body += self.rfile.read(size + 2)[:size] # chunk data and its CRLF (the last chunk is empty)
+                if size == 0:
+                    return body
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json', headers: dict = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _json(self, status: int, payload: dict, headers: dict = None):
+        self._send(status, json.dumps(payload).encode(), headers=headers)
+
+    def _handle(self):
+        self._read_body()
+        service = self.server.service
+        parts = urlsplit(self.path)
+        route = service.route(self.command, parts.path)
+        service.requests[route] += 1
+        service.behaviour.delay()
+        fault = service.behaviour.fault()
+        if fault is not None:
+            service.faults[fault] += 1
+            return service.respond_fault(self, fault)
+        return service.respond(self, route, parts.path, parse_qs(parts.query))
+
+    do_GET = do_POST = do_HEAD = _handle
+
+
+class FakeService:
+    """A ThreadingHTTPServer on 127.0.0.1 with an ephemeral port, running in a daemon thread"""
+
+    def __init__(self, behaviour: Behaviour = None):
+        self.behaviour = behaviour or Behaviour()
+        self.requests = Counter()
+        self.faults = Counter()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.service = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counters(self):
+        self.requests.clear()
+        self.faults.clear()
+
+    def route(self, method: str, path: str) -> str:
+        return f"{method} {path}"
+
+    def respond_fault(self, handler: _Handler, fault: str):
+        status = 429 if fault == 'throttle' else 503
+        handler._send(status, b'unavailable', content_type='text/plain', headers={'Retry-After': '1'})
+
+    def respond(self, handler: _Handler, route: str, path: str, query: dict):
+        raise NotImplementedError
+
+
+class FakeGraphAPI(FakeService):
+    """Graph API photos / media / media_publish / content_publishing_limit endpoints under /<version>.
+    publishing_limit is the quota reported per 24 hours (Meta's is 50; the default does not get
+    in the way of the benchmarks) and media_publish is refused with error 9 once it is used up."""
+
+    def __init__(self, behaviour: Behaviour = None, version: str = 'v18.0', container_seconds: float = 0.2,
+                 container_error_rate: float = 0.0, publishing_limit: int = 1_000_000):
+        super().__init__(behaviour)
+        self.version = version
+        self.container_seconds = container_seconds
+        self.container_error_rate = container_error_rate
+        self.publishing_limit = publishing_limit
+        self.published = 0
+        self._containers = {} # container id -> (ready_at, final status)
+        self._ids = iter(range(1, 1 << 62))
+        self._random = random.Random(7)
+        self._lock = threading.Lock()
+
+    @property
+    def api_base(self) -> str:
+        return f"{self.base_url}/{self.version}"
+
+    def _next_id(self) -> str:
+        with self._lock:
+            return str(next(self._ids))
+
+    def route(self, method: str, path: str) -> str:
+        segments = [segment for segment in path.split('/') if segment][1:] # drop the version
+        if not segments:
+            return f"{method} container_status"
+        return f"{method} {segments[-1]}" if len(segments) > 1 else f"{method} object"
+
+    def respond_fault(self, handler: _Handler, fault: str):
+        if fault == 'throttle':
+            # Application-level throttling as the Graph API reports it: error code 4 plus usage headers
+            return handler._json(400, {'error': {'message': '(#4) Application request limit reached', 'type': 'OAuthException',
+                                                 'code': 4, 'is_transient': True}},
+                                 headers={'X-App-Usage': json.dumps({'call_count': 100, 'total_cputime': 40, 'total_time': 60})})
+        handler._json(500, {'error': {'message': 'An unexpected error has occurred. Please retry your request later.',
+                                      'type': 'OAuthException', 'code': 2, 'is_transient': True}})
+
+    def respond(self, handler: _Handler, route: str, path: str, query: dict):
+        if route.endswith(' photos'):
+            post_id = self._next_id()
+            return handler._json(200, {'id': post_id, 'post_id': f"page_{post_id}"})
+        if route.endswith(' media'):
+            container_id = f"c{self._next_id()}"
+            with self._lock:
+                failed = self._random.random() < self.container_error_rate
+                self._containers[container_id] = (time.monotonic() + self.container_seconds, 'ERROR' if failed else 'FINISHED')
+            return handler._json(200, {'id': container_id})
+        if route.endswith(' media_publish'):
+            with self._lock:
+                allowed = self.published < self.publishing_limit
+                self.published += allowed
+            if not allowed:
+                return handler._json(400, {'error': {'message': 'Application request limit reached', 'code': 9,
+                                                     'error_subcode': 2207042}})
+            return handler._json(200, {'id': f"m{self._next_id()}"})
+        if route.endswith(' content_publishing_limit'):
+            with self._lock:
+                used = self.published
+            return handler._json(200, {'data': [{'quota_usage': used,
+                                                 'config': {'quota_total': self.publishing_limit, 'quota_duration': 86400}}]})
+        if route.endswith(' container_status'):
+            now = time.monotonic()
+            statuses = {}
+            with self._lock:
+                for container_id in (query.get('ids') or [''])[0].split(','):
+                    state = self._containers.get(container_id)
+                    if state is None:
+                        continue
+                    ready_at, final_status = state
+                    statuses[container_id] = {'id': container_id, 'status_code': final_status if now >= ready_at else 'IN_PROGRESS'}
+            return handler._json(200, statuses)
+        handler._json(404, {'error': {'message': f"Unknown path {path}", 'code': 803}})
+
+
+class FakeDrive(FakeService):
+    """Drive direct downloads (/uc?export=download&id=...) returning a JPEG of image_bytes bytes"""
+
+    def __init__(self, behaviour: Behaviour = None, image_bytes: int = 200 * 1024, width: int = 1080, height: int = 1080):
+        super().__init__(behaviour)
+        # JPEG headers (JFIF and a baseline start-of-frame with the dimensions), padded to size;
+        # enough for content sniffing, dimension checks and upload
+        header = (b'\xff\xd8' + b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+                  + b'\xff\xc0' + struct.pack('>HBHHB', 17, 8, height, width, 3) + b'\x01\x22\x00\x02\x11\x01\x03\x11\x01')
+        self.image = header + b'\x00' * max(0, image_bytes - len(header) - 2) + b'\xff\xd9'
+
+    def image_url(self, file_id) -> str:
+        return f"{self.base_url}/uc?export=download&id={file_id}"
+
+    def route(self, method: str, path: str) -> str:
+        return f"{method} download"
+
+    def respond(self, handler: _Handler, route: str, path: str, query: dict):
+        handler._send(200, self.image, content_type='image/jpeg',
+                      headers={'ETag': '"bench-image"', 'Cache-Control': 'private, max-age=0'})
+
+
+class SyntheticSheet:
+    """An in-memory worksheet (header plus rows of text cells) shared by FakeSheets and FakeGspreadClient"""
+
+    def __init__(self, header: list[str], rows: list[list[str]]):
+        self.header = list(header)
+        self.rows = rows
+        self.version = 0
+        self._csv = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def generate(cls, rows: int, due_posts: int, image_url, posted_ratio: float = 0.3, seed: int = 42) -> 'SyntheticSheet':
+        """rows posts in the dashboard's formats: due_posts of them scheduled within a few minutes of now,
+        the rest spread over the surrounding weeks, with posted_ratio of those already Posted"""
+        rng = random.Random(seed)
+        now = datetime.now().replace(second=0, microsecond=0)
+        due = set(rng.sample(range(rows), min(due_posts, rows)))
+        data = []
+        for i in range(rows):
+            if i in due:
+                scheduled, status = now + timedelta(minutes=rng.randint(-3, 3)), ''
+            else:
+                # Outside the default 10-minute tolerance window either way
+                offset = rng.choice((-1, 1)) * rng.randint(15, 21 * 24 * 60)
+                scheduled = now + timedelta(minutes=offset)
+                status = 'Posted' if offset < 0 and rng.random() < posted_ratio else rng.choice(('', 'Pending'))
+            data.append([
+                scheduled.strftime('%d %B %Y'),
+                scheduled.strftime('%I:%M %p'),
+                f"Benchmark post {i}: " + 'lorem ipsum dolor sit amet ' * rng.randint(1, 6),
+                f"#bench #campaign{i % 20}",
+                image_url(i % 500), # A few hundred distinct images, so the media cache gets hits
+                status,
+            ])
+        return cls(HEADER, data)
+
+    def to_csv(self) -> tuple[bytes, str]:
+        """(CSV export body, ETag) of the current contents"""
+        with self._lock:
+            if self._csv is None:
+                lines = [','.join(self._quote(cell) for cell in row) for row in [self.header] + self.rows]
+                self._csv = ('\r\n'.join(lines) + '\r\n').encode()
+            return self._csv, f'"v{self.version}"'
+
+    @staticmethod
+    def _quote(cell: str) -> str:
+        if any(ch in cell for ch in ',"\r\n'):
+            return '"' + cell.replace('"', '""') + '"'
+        return cell
+
+    def column(self, col: int) -> list[str]:
+        """Data cells of the 1-based column"""
+        with self._lock:
+            return [row[col - 1] if col - 1 < len(row) else '' for row in self.rows]
+
+    def set_cells(self, updates: list[tuple[int, int, str]]):
+        """Apply (sheet row, column, value) updates, 1-based with the header as row 1"""
+        with self._lock:
+            for row, col, value in updates:
+                if 2 <= row <= len(self.rows) + 1:
+                    self.rows[row - 2][col - 1] = value
+            self.version += 1
+            self._csv = None
+
+
+class FakeSheets(FakeService):
+    """Sheets CSV export (/spreadsheets/d/<id>/export?format=csv) for registered SyntheticSheets"""
+
+    def __init__(self, behaviour: Behaviour = None):
+        super().__init__(behaviour)
+        self.sheets = {}
+
+    def add(self, spreadsheet_id: str, sheet: SyntheticSheet) -> str:
+        """Register sheet and return the edit URL to configure the poster with"""
+        self.sheets[spreadsheet_id] = sheet
+        return f"{self.base_url}/spreadsheets/d/{spreadsheet_id}/edit"
+
+    def route(self, method: str, path: str) -> str:
+        return f"{method} export"
+
+    def respond(self, handler: _Handler, route: str, path: str, query: dict):
+        sheet = self.sheets.get(path.split('/d/')[-1].split('/')[0])
+        if sheet is None:
+            return handler._send(404, b'not found', content_type='text/plain')
+        body, etag = sheet.to_csv()
+        if handler.headers.get('If-None-Match') == etag:
+            return handler._send(304, b'', headers={'ETag': etag})
+        handler._send(200, body, content_type='text/csv', headers={'ETag': etag})
+
+
+class _FakeWorksheet:
+    def __init__(self, client: 'FakeGspreadClient', sheet: SyntheticSheet):
+        self._client = client
+        self._sheet = sheet
+        self.id = 0
+
+    def row_values(self, row: int) -> list[str]:
+        self._client.call('row_values')
+        return list(self._sheet.header) if row == 1 else list(self._sheet.rows[row - 2])
+
+    def batch_get(self, ranges: list[str]) -> list[list[list[str]]]:
+        self._client.call('batch_get')
+        return [[[value] for value in self._sheet.column(a1_to_rowcol(a1.split(':')[0])[1])] for a1 in ranges]
+
+    def batch_update(self, data: list[dict]):
+        self._client.call('batch_update')
+        self._sheet.set_cells([(*a1_to_rowcol(item['range']), item['values'][0][0]) for item in data])
+
+    def get_all_values(self) -> list[list[str]]:
+        self._client.call('get_all_values')
+        return [list(self._sheet.header)] + [list(row) for row in self._sheet.rows]
+
+
+class _FakeSpreadsheet:
+    def __init__(self, client: 'FakeGspreadClient', sheet: SyntheticSheet):
+        self._worksheet = _FakeWorksheet(client, sheet)
+
+    def get_worksheet(self, index: int):
+        return self._worksheet
+
+    def get_worksheet_by_id(self, worksheet_id: int):
+        return self._worksheet
+
+    def worksheets(self):
+        return [self._worksheet]
+
+
+class FakeGspreadClient:
+    """The subset of gspread.Client the status write-back uses, backed by FakeSheets' sheets"""
+
+    def __init__(self, sheets: FakeSheets, behaviour: Behaviour = None):
+        self._sheets = sheets
+        self.behaviour = behaviour or sheets.behaviour
+        self.requests = Counter()
+
+    def call(self, name: str):
+        self.requests[name] += 1
+        self.behaviour.delay()
+
+    def open_by_key(self, spreadsheet_id: str) -> _FakeSpreadsheet:
+        self.call('open_by_key')
+        return _FakeSpreadsheet(self, self._sheets.sheets[spreadsheet_id])
@@ -0,0 +1,13 @@
+"""
+Gunicorn settings, loaded automatically from the working directory by `gunicorn main:app`
+(the Dockerfile's CMD and the buildpack's default entrypoint alike).
+The app's background services (internal scheduler, ledger replication, media prefetch, retry
+worker, shard membership) are started here, once the worker has loaded the app, rather than on
+`import main`, so only processes that actually serve requests run them.
+"""
+
+
+def post_worker_init(worker):
+    """Warm up and start the background services of this worker"""
+    import main
+    main.start_app_services()
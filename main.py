@@ -4,24 +4,2809 @@ Social Media Auto Poster with Flask HTTP Server
 Complete version for Google Cloud Run deployment
 """
 
+import time
+PROCESS_STARTED = time.perf_counter() # Start of the import, for the startup timings in /api/status
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import importlib
+import csv
 import os
-import time
-from datetime import datetime, timedelta
+import sys
+from datetime import date, datetime, timedelta
 import json
+import re
+import uuid
+import socket
+import heapq
+import itertools
+import random
+import hashlib
+import struct
 from io import BytesIO, StringIO
 import tempfile
+import sqlite3
+from collections import OrderedDict, deque
 from flask import Flask, jsonify, request, render_template_string
 import threading
+import asyncio
 import logging
-import gspread # New import for Google Sheets interaction
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class LazyModule:
+    """Stand-in for a module that is imported on its first attribute access.
+
+    pandas, numpy and gspread account for most of this module's import time and the health
+    check needs none of them, so they are bound through LazyModule and a cold start only pays
+    for Flask and requests. load() imports the module up front (see warm_up).
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    self._module = importlib.import_module(self._name)
+                    logger.info(f"Imported {self._name} in {time.perf_counter() - started:.2f}s")
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+gspread = LazyModule('gspread') # Google Sheets client; gspread.utils / gspread.urls come with it
+
+class MetricsRegistry:
+    """Process-wide counters and histograms, rendered in the Prometheus text exposition format.
+
+    Metrics are declared once with their label names; updates are a dict lookup and an add
+    under one lock, cheap enough to leave on in production. Served at /metrics.
+    """
+
+    # Seconds; covers quick Sheets writes up to slow Instagram container processing
+    DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+    def __init__(self):
+        self._metrics = {} # name -> {'type', 'help', 'labels', 'buckets', 'values'}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()):
+        self._metrics[name] = {'type': 'counter', 'help': help_text, 'labels': labels, 'values': {}}
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self._metrics[name] = {'type': 'histogram', 'help': help_text, 'labels': labels, 'buckets': buckets, 'values': {}}
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        metric = self._metrics[name]
+        key = tuple(str(labels.get(label, '')) for label in metric['labels'])
+        with self._lock:
+            metric['values'][key] = metric['values'].get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        metric = self._metrics[name]
+        key = tuple(str(labels.get(label, '')) for label in metric['labels'])
+        with self._lock:
+            series = metric['values'].get(key)
+            if series is None:
+                series = metric['values'][key] = {'counts': [0] * len(metric['buckets']), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(metric['buckets']):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    @staticmethod
+    def _labels(names: tuple, values: tuple, extra: str = '') -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(names, (
+            value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values))]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, metric in self._metrics.items():
+                lines.append(f"# HELP {name} {metric['help']}")
+                lines.append(f"# TYPE {name} {metric['type']}")
+                for key, value in sorted(metric['values'].items()):
+                    if metric['type'] == 'counter':
+                        lines.append(f"{name}{self._labels(metric['labels'], key)} {value}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(metric['buckets'], value['counts']):
+                        cumulative += count
+                        bucket_labels = self._labels(metric['labels'], key, 'le="%s"' % bound)
+                        lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                    bucket_labels = self._labels(metric['labels'], key, 'le="+Inf"')
+                    lines.append(f"{name}_bucket{bucket_labels} {value['count']}")
+                    lines.append(f"{name}_sum{self._labels(metric['labels'], key)} {round(value['sum'], 6)}")
+                    lines.append(f"{name}_count{self._labels(metric['labels'], key)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+metrics.histogram('poster_stage_duration_seconds', 'Duration of pipeline stages (sheet load, download, uploads, container wait, status write-back)', ('stage',))
+metrics.histogram('poster_run_duration_seconds', 'Duration of a publishing run, from claiming rows to the final status flush')
+metrics.counter('poster_posts_total', 'Rows processed by publishing runs, by outcome', ('outcome',))
+metrics.counter('poster_failures_total', 'Failed publishing steps by platform and error type', ('platform', 'error_type'))
+metrics.counter('poster_downloaded_bytes_total', 'Image bytes downloaded from their source (media cache hits excluded)')
+metrics.counter('poster_retries_total', 'Retried requests by target and reason', ('target', 'reason'))
+metrics.counter('poster_throttled_total', 'Rate-limit pauses by endpoint', ('endpoint',))
+metrics.counter('poster_prefetch_total', 'Images checked ahead of their posting time, by outcome', ('outcome',))
+metrics.counter('poster_post_retries_total', 'Failed posts resumed by the retry worker, by outcome', ('outcome',))
+metrics.counter('poster_shard_claims_total', 'Due posts seen by this instance when sharding, by outcome (own, stolen, foreign, taken, errors)', ('outcome',))
+
+class EventBus:
+    """In-process feed of pipeline events (row picked up, posted, container ready, status written,
+    failures), streamed to dashboard viewers over Server-Sent Events at /api/events.
+
+    Events are numbered and kept in a bounded history, so every viewer reads the same stream and
+    a reconnecting EventSource resumes from its Last-Event-ID. Publishing never blocks on viewers.
+    Each open stream holds a server thread, so the number of concurrent subscribers is capped;
+    viewers over the cap short-poll since() instead, which holds no thread between requests.
+    """
+
+    def __init__(self, history: int = 500, max_subscribers: int = 4):
+        self.max_subscribers = max_subscribers
+        self._events = deque(maxlen=history)
+        self._next_id = 1
+        self._subscribers = 0
+        self._condition = threading.Condition()
+
+    def publish(self, event_type: str, **data):
+        with self._condition:
+            self._events.append({'id': self._next_id, 'type': event_type,
+                                 'time': datetime.now().isoformat(timespec='seconds'), **data})
+            self._next_id += 1
+            self._condition.notify_all()
+
+    def _after(self, last_id: int) -> list[dict]:
+        """Buffered events newer than last_id (caller holds the condition)"""
+        if not self._events or last_id >= self._events[-1]['id']:
+            return []
+        skip = max(0, last_id - self._events[0]['id'] + 1)
+        return list(itertools.islice(self._events, skip, None))
+
+    def since(self, last_id: int = None, replay: int = 20) -> list[dict]:
+        """Events after last_id (or the replay most recent ones), without waiting for new ones"""
+        with self._condition:
+            if last_id is None or last_id >= self._next_id: # A fresh viewer, or an id from before a restart
+                last_id = max(0, self._next_id - 1 - replay)
+            return self._after(last_id)
+
+    def try_subscribe(self) -> bool:
+        """Reserve a stream slot; False when max_subscribers streams are already open"""
+        with self._condition:
+            if self._subscribers >= self.max_subscribers:
+                return False
+            self._subscribers += 1
+            return True
+
+    def unsubscribe(self):
+        with self._condition:
+            self._subscribers = max(0, self._subscribers - 1)
+
+    def stream(self, last_id: int = None, replay: int = 20, heartbeat: float = 15.0, max_seconds: float = 300.0):
+        """Yield events after last_id (or the replay most recent ones), then new events as they are
+        published, and None every heartbeat seconds without one. Ends after max_seconds so the
+        client reconnects and the server thread is handed back."""
+        deadline = time.monotonic() + max_seconds
+        with self._condition:
+            if last_id is None or last_id >= self._next_id: # A fresh viewer, or an id from before a restart
+                last_id = max(0, self._next_id - 1 - replay)
+        while time.monotonic() < deadline:
+            with self._condition:
+                pending = self._after(last_id)
+                if not pending:
+                    self._condition.wait(min(heartbeat, max(0.0, deadline - time.monotonic())))
+                    pending = self._after(last_id)
+            if not pending:
+                yield None
+                continue
+            for event in pending:
+                yield event
+            last_id = pending[-1]['id']
+
+    def status(self) -> dict:
+        with self._condition:
+            return {'last_event_id': self._next_id - 1, 'buffered': len(self._events),
+                    'subscribers': self._subscribers, 'max_subscribers': self.max_subscribers}
+
+events = EventBus(max_subscribers=max(1, int(os.getenv("EVENT_STREAM_MAX_SUBSCRIBERS", "4"))))
+
+@contextmanager
+def stage_timer(timings: dict, stage: str, progress=None, row=None):
+    """Record the wall-clock duration of a pipeline stage (in seconds) into timings and the stage histogram.
+    If a progress tracker is given, it is told that row entered the stage."""
+    if progress is not None:
+        progress.row_stage(row, stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings[stage] = round(elapsed, 3)
+        metrics.observe('poster_stage_duration_seconds', elapsed, stage=stage)
+
+@contextmanager
+def timed_stage(stage: str):
+    """Observe a stage duration in the stage histogram only (for stages outside a post's timings)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe('poster_stage_duration_seconds', time.perf_counter() - start, stage=stage)
+
+def compute_row_keys(id_values: list[str] | None, fingerprint_columns: list[list[str]]) -> list[str]:
+    """Stable identity for each sheet row.
+
+    Rows with a value in the hidden ID column are keyed by it ('id:<value>'). Other rows
+    get a fingerprint of their post fields ('fp:<hash>'); identical rows are told apart
+    by an occurrence suffix ('#1', '#2', ...) in sheet order.
+    """
+    keys = []
+    seen = {}
+    for position, values in enumerate(zip(*fingerprint_columns)):
+        identifier = id_values[position].strip() if id_values else ''
+        if identifier:
+            keys.append(f"id:{identifier}")
+            continue
+        digest = hashlib.sha1('\x1f'.join(value.strip() for value in values).encode('utf-8')).hexdigest()[:16]
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        keys.append(f"fp:{digest}" if occurrence == 0 else f"fp:{digest}#{occurrence}")
+    return keys
+
+def is_missing(value) -> bool:
+    """True for an absent cell: None, or NaN as pandas (and SheetTable) store empty cells"""
+    return value is None or value != value
+
+def is_blank(value) -> bool:
+    """True for a missing cell or one holding only whitespace"""
+    return is_missing(value) or str(value).strip() == ''
+
+def parse_sheet_url(spreadsheet_url: str) -> tuple[str, str | None]:
+    """(spreadsheet id, worksheet gid or None) of a Google Sheets URL; anything else is treated as a bare id"""
+    if '/d/' not in spreadsheet_url:
+        return spreadsheet_url, None
+    spreadsheet_id = spreadsheet_url.split('/d/')[1].split('/')[0]
+    parts = urlsplit(spreadsheet_url)
+    params = dict(parse_qsl(parts.query))
+    params.update(parse_qsl(parts.fragment)) # '#gid=...' wins over '?gid=...', as in the Sheets UI
+    return spreadsheet_id, params.get('gid')
+
+def sheet_source_id(spreadsheet_url: str) -> str:
+    """Identifier of one worksheet: the spreadsheet id, plus '/<gid>' when the URL names a tab"""
+    spreadsheet_id, gid = parse_sheet_url(spreadsheet_url)
+    return spreadsheet_id if gid is None else f"{spreadsheet_id}/{gid}"
+
+# Leading bytes of the image formats the Graph API accepts
+IMAGE_SIGNATURES = {
+    b'\xff\xd8\xff': 'image/jpeg',
+    b'\x89PNG\r\n\x1a\n': 'image/png',
+    b'GIF87a': 'image/gif',
+    b'GIF89a': 'image/gif',
+    b'BM': 'image/bmp',
+}
+
+def sniff_image_type(head: bytes) -> str | None:
+    """Identify an image format from its first bytes"""
+    for signature, content_type in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+def image_dimensions(head: bytes) -> tuple[int, int] | None:
+    """(width, height) read from the leading bytes of a JPEG, PNG, GIF or BMP; None if not found in head"""
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and len(head) >= 24:
+        return struct.unpack('>II', head[16:24])
+    if head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+        return struct.unpack('<HH', head[6:10])
+    if head.startswith(b'BM') and len(head) >= 26:
+        width, height = struct.unpack('<ii', head[18:26])
+        return width, abs(height) # Negative height marks a top-down bitmap
+    if head.startswith(b'\xff\xd8'):
+        # Walk the JPEG segments up to the start-of-frame marker, which holds the dimensions
+        position = 2
+        while position + 9 <= len(head):
+            if head[position] != 0xFF:
+                return None
+            marker = head[position + 1]
+            if marker == 0xFF: # Fill byte
+                position += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8: # Markers without a length
+                position += 2
+                continue
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', head[position + 5:position + 9])
+                return width, height
+            position += 2 + struct.unpack('>H', head[position + 2:position + 4])[0]
+    return None
+
+def validate_image_content_type(header_value: str, head: bytes) -> str:
+    """Return the image content type, or raise ValueError if the response is not an image"""
+    content_type = header_value.split(';')[0].strip().lower()
+    sniffed = sniff_image_type(head)
+    if content_type.startswith('image/'):
+        return content_type
+    if sniffed and content_type in ('', 'application/octet-stream', 'binary/octet-stream'):
+        return sniffed
+    raise ValueError(f"URL did not return an image (Content-Type: '{content_type or 'missing'}')")
+
+
+class MediaPayload:
+    """Image bytes on their way from the source URL to an upload: buffered, cached on disk or streamed"""
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, source_url: str, content_type: str, data: bytes = None,
+                 response=None, chunks=None, head: bytes = b'', size: int = None, file=None):
+        self.source_url = source_url
+        self.content_type = content_type
+        self.data = data
+        self.size = len(data) if data is not None else size
+        self._file = file # Open handle on a media cache blob; keeps it readable even if evicted meanwhile
+        self._response = response
+        self._chunks = chunks
+        self._head = head
+        self._consumed = False
+        # Largest amount of image data held in memory at once for this post
+        self.peak_buffer_bytes = len(data) if data is not None else len(head)
+
+    @property
+    def streamed(self) -> bool:
+        """True when the bytes come straight off a network response and can only be sent once"""
+        return self.data is None and self._file is None
+
+    def iter_chunks(self):
+        """Yield the image bytes. Buffered and cached payloads can be iterated again (e.g. on retry); streamed ones once."""
+        if self.data is not None:
+            yield self.data
+            return
+        
+        if self._file is not None:
+            self._file.seek(0)
+            while chunk := self._file.read(self.CHUNK_SIZE):
+                self.peak_buffer_bytes = max(self.peak_buffer_bytes, len(chunk))
+                yield chunk
+            return
+        
+        if self._consumed:
+            raise RuntimeError("streamed media can only be sent once")
+        self._consumed = True
+        
+        sent = 0
+        for chunk in itertools.chain([self._head], self._chunks):
+            if not chunk:
+                continue
+            sent += len(chunk)
+            if sent > self.size:
+                raise ValueError(f"source sent more than its declared {self.size} bytes")
+            self.peak_buffer_bytes = max(self.peak_buffer_bytes, len(chunk))
+            yield chunk
+        if sent != self.size:
+            raise ValueError(f"source sent {sent} of its declared {self.size} bytes")
+
+    def close(self):
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def report(self) -> dict:
+        return {
+            'bytes': self.size,
+            'content_type': self.content_type,
+            'mode': 'buffered' if self.data is not None else 'streamed' if self.streamed else 'cached',
+            'peak_buffer_bytes': self.peak_buffer_bytes
+        }
+
+
+class MediaCache:
+    """On-disk image cache keyed by normalized URL, with blobs stored by content hash.
+
+    Several URLs that serve identical bytes share one blob. Entries are evicted in
+    least-recently-used order once the unique blob bytes exceed max_bytes. An entry is
+    served without any request for revalidate_after seconds; after that the caller
+    revalidates it with If-None-Match / If-Modified-Since. lock_for() hands out one lock
+    per URL so concurrent fetches of the same image download it only once.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, directory: str, max_bytes: int, revalidate_after: float = 300.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self._entries = OrderedDict() # url key -> entry, least recently used first
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'evictions': 0}
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.directory, content_hash)
+
+    def _load_index(self):
+        """Reload entries persisted by a previous process, dropping any whose blob is gone"""
+        try:
+            with open(os.path.join(self.directory, self.INDEX_FILE)) as f:
+                for key, entry in json.load(f):
+                    if os.path.exists(self._blob_path(entry['content_hash'])):
+                        entry['checked_at'] = float('-inf') # Revalidate on first use
+                        self._entries[key] = entry
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable media cache index in {self.directory}: {e}")
+
+    def _save_index(self):
+        path = os.path.join(self.directory, self.INDEX_FILE)
+        entries = [[key, {k: v for k, v in entry.items() if k != 'checked_at'}] for key, entry in self._entries.items()]
+        with open(path + '.tmp', 'w') as f:
+            json.dump(entries, f)
+        os.replace(path + '.tmp', path)
+
+    def lock_for(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._url_locks.setdefault(key, threading.Lock())
+
+    def lookup(self, key: str) -> dict | None:
+        """Return the entry for key (marking it recently used), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return dict(entry)
+            return None
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.monotonic() - entry['checked_at'] < self.revalidate_after
+
+    def open(self, key: str, entry: dict, revalidated: bool = False) -> MediaPayload | None:
+        """Open a cached blob as a MediaPayload; None if the blob disappeared"""
+        try:
+            handle = open(self._blob_path(entry['content_hash']), 'rb')
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        with self._lock:
+            if revalidated and key in self._entries:
+                self._entries[key]['checked_at'] = time.monotonic()
+            self.stats['revalidated' if revalidated else 'hits'] += 1
+        return MediaPayload(entry['url'], entry['content_type'], file=handle, size=entry['size'])
+
+    def store(self, key: str, url: str, chunks, content_type: str, etag: str = None,
+              last_modified: str = None, max_size: int = None) -> MediaPayload:
+        """Write downloaded chunks into the cache and return a payload reading the stored blob"""
+        temp_path = os.path.join(self.directory, f"tmp-{uuid.uuid4().hex}")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(temp_path, 'wb') as f:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise ValueError(f"image exceeds the {max_size} byte limit")
+                    digest.update(chunk)
+                    f.write(chunk)
+            content_hash = digest.hexdigest()
+            blob_path = self._blob_path(content_hash)
+            if os.path.exists(blob_path):
+                os.unlink(temp_path) # Same bytes already cached under another URL
+            else:
+                os.replace(temp_path, blob_path)
+            handle = open(blob_path, 'rb')
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        
+        with self._lock:
+            self._entries[key] = {
+                'url': url, 'content_hash': content_hash, 'size': size, 'content_type': content_type,
+                'etag': etag, 'last_modified': last_modified, 'checked_at': time.monotonic()
+            }
+            self._entries.move_to_end(key)
+            self.stats['misses'] += 1
+            self._evict_over_budget()
+            self._save_index()
+        return MediaPayload(url, content_type, file=handle, size=size)
+
+    def _evict_over_budget(self):
+        """Drop least recently used entries until unique blob bytes fit the budget (lock held)"""
+        blob_sizes = {entry['content_hash']: entry['size'] for entry in self._entries.values()}
+        total = sum(blob_sizes.values())
+        while total > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+            content_hash = entry['content_hash']
+            if any(other['content_hash'] == content_hash for other in self._entries.values()):
+                continue # Blob still referenced by another URL
+            total -= entry['size']
+            try:
+                os.unlink(self._blob_path(content_hash))
+            except FileNotFoundError:
+                pass
+
+    def status(self) -> dict:
+        with self._lock:
+            blob_sizes = {entry['content_hash']: entry['size'] for entry in self._entries.values()}
+            return {'entries': len(self._entries), 'blobs': len(blob_sizes), 'bytes': sum(blob_sizes.values()),
+                    'max_bytes': self.max_bytes, **self.stats}
+
+
+class MultipartStream:
+    """multipart/form-data request body whose file part is read from a MediaPayload as it is sent.
+
+    len() is the exact encoded size, so requests sends a Content-Length instead of
+    falling back to chunked transfer encoding.
+    """
+
+    def __init__(self, fields: dict, file_field: str, filename: str, media: MediaPayload):
+        self.boundary = uuid.uuid4().hex
+        self.media = media
+        parts = []
+        for name, value in fields.items():
+            parts.append(
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode('utf-8')
+                + str(value).encode('utf-8') + b'\r\n'
+            )
+        parts.append(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f'Content-Type: {media.content_type}\r\n\r\n'.encode('utf-8')
+        )
+        self._preamble = b''.join(parts)
+        self._epilogue = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self) -> int:
+        return len(self._preamble) + self.media.size + len(self._epilogue)
+
+    def __iter__(self):
+        yield self._preamble
+        yield from self.media.iter_chunks()
+        yield self._epilogue
+
+
+class PostSafeRetry(Retry):
+    """urllib3 retry policy that also retries POSTs, but only on 429.
+
+    A 429 means the request was rejected before it was processed, so resending it
+    cannot create a duplicate post. 5xx responses and read errors are still only
+    retried for idempotent methods.
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if not self._is_method_retryable(method):
+            return status_code == 429 and bool(self.total)
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        reason = str(response.status) if response is not None and response.status else type(error).__name__ if error else 'unknown'
+        metrics.inc('poster_retries_total', target=getattr(_pool, 'host', None) or 'unknown', reason=reason)
+        return new_retry
+
+
+class HttpClient:
+    """Shared HTTP layer: one pooled keep-alive session per host with jittered retry on 429/5xx"""
+
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_size: int = 10, timeout: float = 30, max_retries: int = 3,
+                 backoff_factor: float = 0.5, backoff_jitter: float = 0.5):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self._sessions = {} # (scheme, host, retry) -> requests.Session
+        self._request_counts = {}
+        self._lock = threading.Lock()
+
+    def _build_session(self, retry: bool) -> requests.Session:
+        session = requests.Session()
+        retries = PostSafeRetry(
+            total=self.max_retries if retry else 0,
+            status_forcelist=self.RETRY_STATUS_CODES,
+            backoff_factor=self.backoff_factor,
+            backoff_jitter=self.backoff_jitter,
+            raise_on_status=False # Hand the final response back so callers can read the API error
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retries)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def session(self, url: str, retry: bool = True) -> requests.Session:
+        """Return the pooled session for the URL's host, creating it on first use"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc, retry)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = self._build_session(retry)
+                self._request_counts[key] = 0
+            self._request_counts[key] += 1
+        return session
+
+    def request(self, method: str, url: str, retry: bool = True, **kwargs) -> requests.Response:
+        """Send a request through the host's pooled session. Set retry=False for non-replayable bodies."""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session(url, retry).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def stats(self) -> dict:
+        """Per-host request and connection counters; reused = requests served on an existing connection"""
+        hosts = {}
+        with self._lock:
+            sessions = list(self._sessions.items())
+            request_counts = dict(self._request_counts)
+        for (scheme, netloc, retry), session in sessions:
+            host = hosts.setdefault(f"{scheme}://{netloc}", {'requests': 0, 'connections_opened': 0, 'connections_reused': 0})
+            host['requests'] += request_counts.get((scheme, netloc, retry), 0)
+            adapter = session.get_adapter(f"{scheme}://{netloc}")
+            for pool_key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools[pool_key]
+                host['connections_opened'] += pool.num_connections
+                host['connections_reused'] += max(0, pool.num_requests - pool.num_connections)
+        return hosts
+
+class TokenBucket:
+    """Token bucket whose refill rate can be scaled down and which can be paused outright"""
+
+    def __init__(self, requests_per_period: float, period: float, burst: float = None):
+        self.base_rate = requests_per_period / period # tokens per second
+        self.capacity = burst if burst is not None else max(1.0, requests_per_period)
+        self.scale = 1.0
+        self.tokens = self.capacity
+        self.paused_until = 0.0
+        self.granted = 0
+        self.rejected = 0
+        self.waited_seconds = 0.0
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.base_rate * self.scale
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, max_wait: float) -> bool:
+        """Take one token, sleeping until it is available. Returns False (taking nothing)
+        if that would mean waiting longer than max_wait seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(self.paused_until - now, 0.0)
+            if self.tokens < 1:
+                wait = max(wait, (1 - self.tokens) / self.rate if self.rate > 0 else float('inf'))
+            if wait > max_wait:
+                self.rejected += 1
+                return False
+            # Reserve the token now so concurrent callers queue up behind this one
+            self.tokens -= 1
+            self.granted += 1
+            self.waited_seconds += wait
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = min(self.tokens, 0.0)
+
+    def set_scale(self, scale: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.scale = scale
+
+    def status(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                'requests_per_minute': round(self.rate * 60, 4),
+                'base_requests_per_minute': round(self.base_rate * 60, 4),
+                'tokens': round(self.tokens, 2),
+                'capacity': self.capacity,
+                'paused_for_seconds': round(max(0.0, self.paused_until - now), 1),
+                'granted': self.granted,
+                'rejected': self.rejected,
+                'waited_seconds': round(self.waited_seconds, 2),
+            }
+
+
+class PublishingQuota:
+    """Rolling-window counter for a quota such as Instagram's 50 published posts per 24 hours.
+
+    Unlike a TokenBucket the whole allowance is available at once, and a call is refused
+    outright (never waited for) while limit calls were granted in the last period seconds.
+    The local count starts empty in every process, so it is reconciled with the usage the API
+    reports (sync): Meta's count covers every instance and the time before a cold start.
+    """
+
+    def __init__(self, limit: float, period: float, sync_interval: float = 300.0):
+        self.limit = limit
+        self.configured_limit = limit
+        self.period = period
+        self.sync_interval = sync_interval
+        self.paused_until = 0.0
+        self.granted = 0
+        self.rejected = 0
+        self._grants = deque() # time.time() of each grant within the window
+        self._reported_used = 0 # usage reported by the API at _synced_at
+        self._synced_at = None
+        self._lock = threading.Lock()
+        self.sync_lock = threading.Lock() # Held while the usage is read from the API, so callers wait for it
+
+    def _used(self, now: float) -> int:
+        while self._grants and self._grants[0] <= now - self.period:
+            self._grants.popleft()
+        if self._synced_at is None:
+            return len(self._grants)
+        # A grant at the very time of the sync may be missing from the reported usage: count it again
+        since_sync = sum(1 for granted_at in self._grants if granted_at >= self._synced_at)
+        return max(len(self._grants), self._reported_used + since_sync)
+
+    def available(self) -> bool:
+        with self._lock:
+            return self._used(time.time()) < self.limit
+
+    def acquire(self, max_wait: float) -> bool:
+        """Count one call; False (counting nothing) if the quota is used up or the endpoint is
+        paused for longer than max_wait seconds"""
+        with self._lock:
+            now = time.time()
+            wait = max(self.paused_until - time.monotonic(), 0.0)
+            if self._used(now) >= self.limit or wait > max_wait:
+                self.rejected += 1
+                return False
+            self._grants.append(now)
+            self.granted += 1
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def release(self):
+        """Give back the latest grant (its call was not made, or did not count against the quota)"""
+        with self._lock:
+            if self._grants:
+                self._grants.pop()
+                self.granted -= 1
+
+    def needs_sync(self) -> bool:
+        return self._synced_at is None or time.time() - self._synced_at >= self.sync_interval
+
+    def sync(self, used: int = None, limit: float = None, period: float = None):
+        """Adopt the usage reported by the API (None when it could not be read: retried after sync_interval).
+        A reported limit can only lower the configured one."""
+        with self._lock:
+            self._synced_at = time.time()
+            if used is not None:
+                self._reported_used = used
+            if limit:
+                self.limit = min(self.configured_limit, limit)
+            if period:
+                self.period = period
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def set_scale(self, scale: float):
+        pass # Usage headers describe call rates, not the publishing quota
+
+    def status(self) -> dict:
+        with self._lock:
+            now = time.time()
+            used = self._used(now)
+            return {
+                'quota': self.limit,
+                'window_seconds': self.period,
+                'used': used,
+                'remaining': max(0, int(self.limit - used)),
+                'synced_seconds_ago': round(now - self._synced_at, 1) if self._synced_at is not None else None,
+                'paused_for_seconds': round(max(0.0, self.paused_until - time.monotonic()), 1),
+                'granted': self.granted,
+                'rejected': self.rejected,
+            }
+
+
+class RateLimitExceeded(Exception):
+    """Raised instead of making a call whose endpoint has no budget left"""
+
+
+class GraphRateLimiter:
+    """Per-endpoint token buckets for Graph API and Sheets calls, tuned by Meta's usage headers.
+
+    Every call takes a token from its endpoint's bucket first. After each Graph response the
+    X-App-Usage and X-Business-Use-Case-Usage headers are read: once usage passes
+    slow_down_at percent the bucket's refill rate is scaled down linearly, reaching zero at
+    100%. A throttling error (codes 4, 17, 32, 613 and the per-business 80001/80002) or a 429
+    pauses the bucket until Meta's estimated_time_to_regain_access, or for cooldown seconds.
+    Daily quotas (QUOTA_ENDPOINTS) are PublishingQuota rolling windows instead of buckets.
+    """
+
+    # (requests, per seconds, burst); override with RATE_LIMIT_<NAME>=<requests>/<seconds>
+    DEFAULT_LIMITS = {
+        'facebook_photos': (60, 60, 5),
+        'instagram_media': (60, 60, 5),
+        'instagram_publish': (50, 24 * 3600, None), # Instagram content publishing limit per rolling 24 hours
+        'sheets': (60, 60, 10), # Sheets API: 60 requests per minute per user
+    }
+    QUOTA_ENDPOINTS = ('instagram_publish',)
+    THROTTLE_ERROR_CODES = (4, 17, 32, 613, 80001, 80002)
+
+    def __init__(self, limits: dict = None, slow_down_at: float = 75.0, min_scale: float = 0.05,
+                 cooldown: float = 60.0, max_wait: float = 30.0):
+        self.slow_down_at = slow_down_at
+        self.min_scale = min_scale
+        self.cooldown = cooldown
+        self.max_wait = max_wait
+        self.buckets = {
+            name: PublishingQuota(*limit[:2]) if name in self.QUOTA_ENDPOINTS else TokenBucket(*limit)
+            for name, limit in (limits or self.DEFAULT_LIMITS).items()
+        }
+        self.usage = {} # endpoint -> latest usage percentages reported by Meta
+        self.throttled = {name: 0 for name in self.buckets}
+
+    @classmethod
+    def from_env(cls, endpoints: tuple = None, overrides: dict = None) -> 'GraphRateLimiter':
+        """Limiter for the given endpoints (default: all), with limits from overrides or the environment"""
+        limits = {}
+        for name in endpoints or cls.DEFAULT_LIMITS:
+            requests_per_period, period, burst = cls.DEFAULT_LIMITS[name]
+            override = (overrides or {}).get(name) or os.getenv(f"RATE_LIMIT_{name.upper()}")
+            if override:
+                try:
+                    requests_per_period, period = (float(part) for part in str(override).split('/'))
+                except ValueError:
+                    logger.error(f"Ignoring invalid rate limit {override!r} for {name} (expected <requests>/<seconds>)")
+            limits[name] = (requests_per_period, period, burst)
+        return cls(
+            limits,
+            slow_down_at=float(os.getenv("RATE_LIMIT_SLOW_DOWN_AT", "75")),
+            cooldown=float(os.getenv("RATE_LIMIT_COOLDOWN_SECONDS", "60")),
+            max_wait=float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "30")),
+        )
+
+    def acquire(self, endpoint: str, max_wait: float = None):
+        """Wait for the endpoint's budget; raises RateLimitExceeded if it would take longer than max_wait"""
+        bucket = self.buckets.get(endpoint)
+        if bucket is None:
+            return
+        if not bucket.acquire(self.max_wait if max_wait is None else max_wait):
+            raise RateLimitExceeded(f"Rate limit budget for {endpoint} exhausted; try again later")
+
+    @staticmethod
+    def _header_usage(response) -> tuple[float, float]:
+        """(highest usage percentage, seconds until access is regained) from Meta's usage headers"""
+        highest = 0.0
+        regain_seconds = 0.0
+        try:
+            app_usage = json.loads(response.headers.get('X-App-Usage') or '{}')
+            highest = max([highest] + [float(value) for value in app_usage.values()])
+            business_usage = json.loads(response.headers.get('X-Business-Use-Case-Usage') or '{}')
+            for entries in business_usage.values():
+                for entry in entries:
+                    highest = max(highest, *(float(entry.get(field, 0)) for field in ('call_count', 'total_cputime', 'total_time')))
+                    regain_seconds = max(regain_seconds, float(entry.get('estimated_time_to_regain_access', 0)) * 60)
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.debug(f"Unreadable Graph API usage headers: {e}")
+        return highest, regain_seconds
+
+    @staticmethod
+    def error_code(response):
+        """Graph API error code of a response, or None when its body is not a Graph error object
+        (proxies and gateways also answer with HTML, plain text or other JSON)"""
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        error = body.get('error') if isinstance(body, dict) else None
+        return error.get('code') if isinstance(error, dict) else None
+
+    def observe(self, endpoint: str, response):
+        """Adapt the endpoint's budget to the usage and errors reported in a Graph API response"""
+        bucket = self.buckets.get(endpoint)
+        if bucket is None:
+            return
+        highest, regain_seconds = self._header_usage(response)
+        self.usage[endpoint] = highest
+        
+        if highest > self.slow_down_at:
+            bucket.set_scale(max(self.min_scale, (100.0 - highest) / (100.0 - self.slow_down_at)))
+        else:
+            bucket.set_scale(1.0)
+        
+        error_code = self.error_code(response) if response.status_code != 200 else None
+        if response.status_code == 429 or error_code in self.THROTTLE_ERROR_CODES or highest >= 100:
+            self.penalize(endpoint, regain_seconds or self.cooldown, reason=f"error code {error_code}" if error_code else f"usage {highest:.0f}%")
+
+    def penalize(self, endpoint: str, seconds: float = None, reason: str = 'throttled'):
+        """Stop spending the endpoint's budget for a while after the API pushed back"""
+        bucket = self.buckets.get(endpoint)
+        if bucket is None:
+            return
+        seconds = self.cooldown if seconds is None else seconds
+        self.throttled[endpoint] += 1
+        metrics.inc('poster_throttled_total', endpoint=endpoint)
+        bucket.pause(seconds)
+        logger.warning(f"{endpoint} throttled ({reason}); pausing calls for {seconds:.0f}s")
+
+    def status(self) -> dict:
+        return {
+            name: {**bucket.status(), 'usage_percent': self.usage.get(name), 'throttled': self.throttled[name]}
+            for name, bucket in self.buckets.items()
+        }
+
+
+class Account:
+    """One Facebook page / Instagram business account pair with its own credentials and rate budget"""
+
+    def __init__(self, name: str, access_token: str, facebook_page_id: str, instagram_id: str,
+                 graph_api_base: str, rate_limiter: GraphRateLimiter):
+        self.name = name
+        self.access_token = access_token
+        self.facebook_page_id = facebook_page_id
+        self.instagram_id = instagram_id
+        self.rate_limiter = rate_limiter
+        self.facebook_api_url = f"{graph_api_base}/{facebook_page_id}/photos"
+        self.instagram_api_url = f"{graph_api_base}/{instagram_id}/media"
+        self.instagram_publish_url = f"{graph_api_base}/{instagram_id}/media_publish"
+        # In-flight uploads per platform are limited per account, so one busy brand cannot starve the others
+        self.stage_limits = {
+            'facebook': threading.BoundedSemaphore(max(1, int(os.getenv("FB_CONCURRENCY", "2")))),
+            'instagram': threading.BoundedSemaphore(max(1, int(os.getenv("IG_CONCURRENCY", "2")))),
+        }
+
+
+class AccountRegistry:
+    """Publishing accounts and the sheets they serve, loaded once from ACCOUNTS_FILE / ACCOUNTS_JSON.
+
+    The registry document looks like:
+
+        {"accounts": {"brand-a": {"access_token_env": "BRAND_A_TOKEN", "facebook_page_id": "...",
+                                  "instagram_account_id": "...", "rate_limits": {"instagram_publish": "25/86400"}}},
+         "sheets": {"<spreadsheet id>": ["brand-a", "brand-b"]},
+         "default": ["brand-a"]}
+
+    Tokens may be given inline (access_token) or, preferably, by environment variable name
+    (access_token_env). The single account configured through FB_ACCESS_TOKEN / FB_PAGE_ID /
+    INSTAGRAM_BUSINESS_ACCOUNT_ID is always available as 'default'.
+    """
+
+    GRAPH_ENDPOINTS = ('facebook_photos', 'instagram_media', 'instagram_publish')
+
+    def __init__(self, graph_api_base: str, default_account: dict):
+        self.graph_api_base = graph_api_base
+        self.default_account = default_account
+        self._accounts = None
+        self._sheet_accounts = {}
+        self._default_names = ['default']
+        self._lock = threading.Lock()
+
+    def _build(self, name: str, config: dict) -> Account:
+        access_token = os.getenv(config['access_token_env'], '') if config.get('access_token_env') else config.get('access_token', '')
+        rate_limiter = GraphRateLimiter.from_env(self.GRAPH_ENDPOINTS, config.get('rate_limits'))
+        return Account(name, access_token, str(config.get('facebook_page_id', '')),
+                       str(config.get('instagram_account_id', '')), self.graph_api_base, rate_limiter)
+
+    def _read_document(self) -> dict:
+        path = os.getenv("ACCOUNTS_FILE")
+        if path:
+            with open(path) as f:
+                return json.load(f)
+        inline = os.getenv("ACCOUNTS_JSON")
+        return json.loads(inline) if inline else {}
+
+    def _load(self) -> dict:
+        with self._lock:
+            if self._accounts is not None:
+                return self._accounts
+            accounts = {'default': self._build('default', self.default_account)}
+            try:
+                document = self._read_document()
+                for name, config in (document.get('accounts') or {}).items():
+                    accounts[name] = self._build(name, config)
+                self._sheet_accounts = {sheet_id: list(names) for sheet_id, names in (document.get('sheets') or {}).items()}
+                self._default_names = list(document.get('default') or ['default'])
+                logger.info(f"Loaded {len(accounts)} publishing accounts: {', '.join(sorted(accounts))}")
+            except Exception as e:
+                logger.error(f"Error loading account registry: {e}. Only the default account is available.")
+            self._accounts = accounts
+            return accounts
+
+    def get(self, name: str) -> Account | None:
+        return self._load().get(name)
+
+    def target_names(self, spreadsheet_id: str, row_value: str = '') -> list[str]:
+        """Account names a row posts to: its own Accounts cell, else the sheet's, else the registry default"""
+        self._load()
+        names = [name.strip() for name in str(row_value or '').split(',') if name.strip()]
+        return names or self._sheet_accounts.get(spreadsheet_id) or self._default_names
+
+    def status(self) -> dict:
+        return {name: account.rate_limiter.status() for name, account in self._load().items()}
+
+
+class InstagramContainerPoller:
+    """Waits for Instagram media containers to finish processing, on a background asyncio loop.
+
+    Every tracked container has its own poll interval, starting at initial_interval and
+    growing by backoff_factor (up to max_interval) each time it is still IN_PROGRESS.
+    All containers due for a check are looked up together with one batched Graph API
+    request (?ids=...&fields=status_code), so many uploads can wait at once without
+    holding a request each. Waiters are released the moment their container is FINISHED.
+    """
+
+    # Graph API limit on ids per multi-id lookup
+    MAX_IDS_PER_REQUEST = 50
+
+    def __init__(self, http: HttpClient, graph_api_base: str, initial_interval: float = 0.5,
+                 max_interval: float = 5.0, backoff_factor: float = 1.5, timeout: float = 120.0):
+        self.http = http
+        self.graph_api_base = graph_api_base
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self._loop = None
+        self._wakeup = None
+        self._pending = {} # container_id -> {'future', 'access_token', 'interval', 'next_check', 'checks'}
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            ready = threading.Event()
+            
+            def run():
+                self._loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self._loop)
+                self._wakeup = asyncio.Event()
+                self._loop.create_task(self._poll_loop())
+                ready.set()
+                self._loop.run_forever()
+            
+            threading.Thread(target=run, name='ig-container-poller', daemon=True).start()
+            ready.wait()
+
+    def wait_until_ready(self, container_id: str, access_token: str, timeout: float = None) -> tuple[bool, str]:
+        """Block the calling thread until the container is FINISHED (True) or failed / timed out (False)"""
+        self._ensure_loop()
+        timeout = timeout or self.timeout
+        future = asyncio.run_coroutine_threadsafe(self._track(container_id, access_token, timeout), self._loop)
+        return future.result()
+
+    async def _track(self, container_id: str, access_token: str, timeout: float) -> tuple[bool, str]:
+        future = self._loop.create_future()
+        self._pending[container_id] = {
+            'future': future,
+            'access_token': access_token,
+            'interval': self.initial_interval,
+            'next_check': self._loop.time() + self.initial_interval,
+            'checks': 0,
+        }
+        self._wakeup.set()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False, f"Instagram container {container_id} not ready after {timeout:.0f}s"
+        finally:
+            self._pending.pop(container_id, None)
+
+    async def _poll_loop(self):
+        # The one task serving every waiter: an error in a pass is logged and the loop goes on,
+        # as a dead task would leave every upload waiting until its timeout
+        while True:
+            try:
+                await self._poll_once()
+            except Exception as e:
+                logger.error(f"Instagram container poller error: {e}", exc_info=True)
+                await asyncio.sleep(self.initial_interval)
+
+    async def _poll_once(self):
+        if not self._pending:
+            await self._wakeup.wait()
+        self._wakeup.clear()
+        
+        now = self._loop.time()
+        due = [cid for cid, state in self._pending.items() if state['next_check'] <= now]
+        if due:
+            # Group by token so containers of different accounts can share the loop
+            by_token = {}
+            for cid in due:
+                by_token.setdefault(self._pending[cid]['access_token'], []).append(cid)
+            for access_token, ids in by_token.items():
+                for start in range(0, len(ids), self.MAX_IDS_PER_REQUEST):
+                    batch = ids[start:start + self.MAX_IDS_PER_REQUEST]
+                    statuses = await self._loop.run_in_executor(None, self._fetch_statuses, batch, access_token)
+                    try:
+                        self._apply_statuses(batch, statuses)
+                    except Exception as e:
+                        logger.error(f"Could not apply Instagram container statuses for {batch}: {e}", exc_info=True)
+                        self._apply_statuses(batch, {}) # Back off and check them again later
+        
+        if self._pending:
+            next_check = min(state['next_check'] for state in self._pending.values())
+            try:
+                # A newly tracked container wakes the loop early
+                await asyncio.wait_for(self._wakeup.wait(), max(0.0, next_check - self._loop.time()))
+            except asyncio.TimeoutError:
+                pass
+
+    def _fetch_statuses(self, container_ids: list[str], access_token: str) -> dict:
+        """One batched status lookup; containers missing from the result are retried later"""
+        try:
+            response = self.http.get(
+                f"{self.graph_api_base}/",
+                params={'ids': ','.join(container_ids), 'fields': 'status_code,status', 'access_token': access_token},
+                timeout=30
+            )
+            if response.status_code != 200:
+                logger.warning(f"Instagram container status check failed ({response.status_code}): {response.text}")
+                return {}
+            statuses = response.json()
+            if not isinstance(statuses, dict):
+                logger.warning(f"Unexpected Instagram container status response: {str(statuses)[:200]}")
+                return {}
+            return statuses
+        except Exception as e:
+            logger.warning(f"Instagram container status check error: {e}")
+            return {}
+
+    def _apply_statuses(self, container_ids: list[str], statuses: dict):
+        now = self._loop.time()
+        for cid in container_ids:
+            state = self._pending.get(cid)
+            if state is None or state['future'].done():
+                continue
+            state['checks'] += 1
+            info = statuses.get(cid) if isinstance(statuses, dict) else None
+            if not isinstance(info, dict):
+                if info is not None:
+                    logger.warning(f"Unexpected status for Instagram container {cid}: {str(info)[:200]}")
+                info = {}
+            status_code = info.get('status_code')
+            if status_code in ('FINISHED', 'PUBLISHED'):
+                logger.info(f"Instagram container {cid} ready after {state['checks']} checks")
+                state['future'].set_result((True, status_code))
+            elif status_code in ('ERROR', 'EXPIRED'):
+                state['future'].set_result((False, f"Instagram container {cid} {status_code}: {info.get('status', 'no details')}"))
+            else:
+                state['interval'] = min(self.max_interval, state['interval'] * self.backoff_factor)
+                state['next_check'] = now + state['interval']
+
+    def status(self) -> dict:
+        return {'tracking': len(self._pending)}
+
+
+class StatusWriteBuffer:
+    """Coalesces 'Status' cell updates for one spreadsheet into batched Sheets API writes.
+
+    The worksheet handle and Status column index are resolved once and reused for the
+    lifetime of the buffer (one scheduler run). Updates are flushed as a single
+    batch_update when max_pending rows are queued, when the oldest queued update is
+    older than max_delay seconds, or when flush() is called at the end of the run.
+
+    Updates queued by row key (queue_key) are resolved to their current sheet row at
+    flush time, from one read of the identity columns, so a row inserted or deleted
+    since the sheet was loaded cannot redirect a status onto another post. A long-lived
+    buffer can reuse that read for row_map_ttl seconds; a key missing from it forces a
+    fresh read. Status writes never change the identity columns, so only edits made in
+    the sheet within the TTL can leave the reused map stale.
+    """
+
+    # HTTP status codes from the Sheets API that are worth retrying (quota / transient)
+    RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+    def __init__(self, gc, spreadsheet_id: str, status_col: str = 'Status',
+                 max_pending: int = 50, max_delay: float = 10.0, max_retries: int = 5, backoff_base: float = 1.0,
+                 id_col: str = None, fingerprint_cols: list[str] = None, rate_limiter: 'GraphRateLimiter' = None,
+                 worksheet_id: int = None, row_map_ttl: float = 0.0):
+        self.gc = gc
+        self.rate_limiter = rate_limiter
+        self.spreadsheet_id = spreadsheet_id
+        self.worksheet_id = worksheet_id # gid of the tab to write to; None means the first worksheet
+        self.status_col = status_col
+        self.id_col = id_col
+        self.fingerprint_cols = fingerprint_cols or []
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.row_map_ttl = row_map_ttl
+        
+        self._worksheet = None
+        self._headers = None
+        self._status_col_index = None
+        self._row_map = None
+        self._row_map_read_at = 0.0
+        self._pending = {} # sheet row number (int) or row key (str) -> status (last write wins)
+        self._oldest_queued_at = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def _resolve_target(self) -> bool:
+        """Open the worksheet and locate the Status column once per buffer"""
+        if self._worksheet is not None:
+            return True
+        
+        if self.worksheet_id is None:
+            worksheet = self._with_backoff(lambda: self.gc.open_by_key(self.spreadsheet_id).get_worksheet(0))
+        else:
+            worksheet = self._with_backoff(lambda: self.gc.open_by_key(self.spreadsheet_id).get_worksheet_by_id(self.worksheet_id))
+        headers = self._with_backoff(lambda: worksheet.row_values(1))
+        try:
+            self._status_col_index = headers.index(self.status_col) + 1 # gspread is 1-indexed
+        except ValueError:
+            logger.error(f"'{self.status_col}' column not found in spreadsheet. Cannot update status.")
+            return False
+        
+        self._headers = headers
+        self._worksheet = worksheet
+        return True
+
+    def _column_values(self, names: list[str]) -> list[list[str]]:
+        """Read the data cells of the named columns in one request (missing columns read as blank)"""
+        present = [name for name in names if name in self._headers]
+        ranges = []
+        for name in present:
+            letter = ''.join(ch for ch in gspread.utils.rowcol_to_a1(1, self._headers.index(name) + 1) if ch.isalpha())
+            ranges.append(f"{letter}2:{letter}")
+        value_ranges = self._with_backoff(lambda: self._worksheet.batch_get(ranges)) if ranges else []
+        columns = {name: [cells[0] if cells else '' for cells in values] for name, values in zip(present, value_ranges)}
+        row_count = max((len(values) for values in columns.values()), default=0)
+        return [columns.get(name, []) + [''] * (row_count - len(columns.get(name, []))) for name in names]
+
+    def _current_row_map(self) -> dict:
+        """Map each row key to the row it occupies in the sheet right now"""
+        names = ([self.id_col] if self.id_col else []) + self.fingerprint_cols
+        columns = self._column_values(names)
+        id_values = columns[0] if self.id_col and self.id_col in self._headers else None
+        fingerprint_columns = columns[1:] if self.id_col else columns
+        keys = compute_row_keys(id_values, fingerprint_columns)
+        return {key: position + 2 for position, key in enumerate(keys)} # +2: header row and 1-indexing
+
+    def _row_map_for(self, row_keys) -> dict:
+        """Row map covering the queued keys, reused while younger than row_map_ttl"""
+        if (self._row_map is None or time.monotonic() - self._row_map_read_at >= self.row_map_ttl
+                or any(row_key not in self._row_map for row_key in row_keys)):
+            self._row_map = self._current_row_map()
+            self._row_map_read_at = time.monotonic()
+        return self._row_map
+
+    def _with_backoff(self, func):
+        """Call func, retrying quota and transient Sheets API errors with exponential backoff and jitter"""
+        for attempt in range(self.max_retries):
+            try:
+                if self.rate_limiter is not None:
+                    # Background write-back can afford to wait out the whole Sheets budget
+                    self.rate_limiter.acquire('sheets', max_wait=float('inf'))
+                return func()
+            except gspread.exceptions.APIError as e:
+                status_code = getattr(e.response, 'status_code', None)
+                if status_code not in self.RETRYABLE_STATUS_CODES or attempt == self.max_retries - 1:
+                    raise
+                delay = self.backoff_base * (2 ** attempt) + random.uniform(0, self.backoff_base)
+                metrics.inc('poster_retries_total', target='sheets', reason=str(status_code))
+                if status_code == 429 and self.rate_limiter is not None:
+                    self.rate_limiter.penalize('sheets', delay, reason='Sheets API returned 429')
+                logger.warning(f"Sheets API returned {status_code}, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+            except requests.exceptions.RequestException as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = self.backoff_base * (2 ** attempt) + random.uniform(0, self.backoff_base)
+                metrics.inc('poster_retries_total', target='sheets', reason=type(e).__name__)
+                logger.warning(f"Sheets API request failed ({e}), retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+
+    def queue(self, row_index: int, status: str):
+        """Queue a status update for a pandas row index, flushing if a threshold is reached"""
+        # row_index from pandas is 0-indexed, so add 2 (1 for header, 1 for 0-indexing)
+        self._queue(row_index + 2, status)
+
+    def queue_key(self, row_key: str, status: str):
+        """Queue a status update for a row identified by its stable row key"""
+        self._queue(row_key, status)
+
+    def _queue(self, target, status: str):
+        with self._lock:
+            self._pending[target] = status
+            if self._oldest_queued_at is None:
+                self._oldest_queued_at = time.monotonic()
+            should_flush = (len(self._pending) >= self.max_pending or
+                            time.monotonic() - self._oldest_queued_at >= self.max_delay)
+        
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write all queued updates in one batch_update call.
+        Returns the number of updates handled (written, or dropped because their row no longer exists)."""
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+                self._oldest_queued_at = None
+            
+            if not pending:
+                return 0
+            
+            write_started = time.perf_counter()
+            try:
+                if not self._resolve_target():
+                    return 0
+                
+                rows = {target: status for target, status in pending.items() if isinstance(target, int)}
+                keyed = {target: status for target, status in pending.items() if isinstance(target, str)}
+                if keyed:
+                    row_map = self._row_map_for(keyed)
+                    for row_key, status in keyed.items():
+                        sheet_row = row_map.get(row_key)
+                        if sheet_row is None:
+                            logger.warning(f"Row {row_key} is no longer in the spreadsheet (edited or deleted). Status '{status}' not written.")
+                            continue
+                        rows[sheet_row] = status
+                
+                data = [
+                    {'range': gspread.utils.rowcol_to_a1(sheet_row, self._status_col_index), 'values': [[status]]}
+                    for sheet_row, status in sorted(rows.items())
+                ]
+                if data:
+                    self._with_backoff(lambda: self._worksheet.batch_update(data))
+                    events.publish('status_written', spreadsheet_id=self.spreadsheet_id, count=len(data),
+                                   rows=[{'row': row - 1, 'status': status} for row, status in sorted(rows.items())[:50]])
+                    logger.info(f"Spreadsheet status updated for {len(data)} rows in one batch: "
+                                f"{', '.join(f'row {row - 1} -> {status!r}' for row, status in sorted(rows.items()))}")
+                return len(pending)
+            except Exception as e:
+                logger.error(f"Error writing {len(pending)} status updates to Google Spreadsheet: {e}")
+                # Resolve the worksheet and rows again next time, in case they were the problem
+                self._worksheet = None
+                self._row_map = None
+                # Put the updates back so the next flush retries them, unless a newer status was queued meanwhile
+                with self._lock:
+                    for sheet_row, status in pending.items():
+                        self._pending.setdefault(sheet_row, status)
+                    if self._oldest_queued_at is None:
+                        self._oldest_queued_at = time.monotonic()
+                return 0
+            finally:
+                metrics.observe('poster_stage_duration_seconds', time.perf_counter() - write_started, stage='sheet_write')
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+class SpreadsheetCache:
+    """In-memory cache of parsed spreadsheets, revalidated against the source once the TTL expires.
+
+    Each entry keeps the parsed DataFrame together with the validators needed to detect
+    changes cheaply: the Drive file version for the gspread path, and ETag / Last-Modified
+    plus a content hash for the CSV export path. Cached DataFrames are shared between
+    callers and must be treated as read-only.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'revalidated': 0, 'reloads': 0}
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            return self._entries.get(key)
+
+    def is_fresh(self, entry: dict) -> bool:
+        """True while the entry is younger than the TTL and can be served without contacting Google"""
+        return time.monotonic() - entry['checked_at'] < self.ttl
+
+    def hit(self, key: str):
+        """Record a cache hit served without any network request"""
+        with self._lock:
+            self.stats['hits'] += 1
+
+    def mark_unchanged(self, key: str, **validators):
+        """Record that the source was checked and has not changed since it was cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry['checked_at'] = time.monotonic()
+            entry.update({name: value for name, value in validators.items() if value is not None})
+            self.stats['revalidated'] += 1
+
+    def store(self, key: str, df, **validators):
+        """Cache a freshly parsed DataFrame together with its change validators"""
+        with self._lock:
+            self._entries[key] = {'df': df, 'checked_at': time.monotonic(), 'loaded_at': datetime.now(), **validators}
+            self.stats['reloads'] += 1
+        return df
+
+    def invalidate(self, key: str = None):
+        """Force the next load of key (or of every sheet) to revalidate against the source"""
+        with self._lock:
+            if key is None:
+                for entry in self._entries.values():
+                    entry['checked_at'] = float('-inf')
+            elif key in self._entries:
+                self._entries[key]['checked_at'] = float('-inf')
+
+class PostLedger:
+    """Durable local record of scheduled posts and their outcomes, stored in SQLite (WAL mode).
+
+    Posts are keyed by (row_key, content_hash): the row's identity in its sheet plus a hash
+    of the fields that make up the post, so editing a row turns it into a new post. The
+    ledger is checked (and the post claimed) before any upload, which keeps a row from
+    being posted twice even when the Status write-back to the sheet lags or fails. Sheet
+    statuses are written here first and replicated to the sheet asynchronously.
+
+    Each post also records the stages it completed per account (downloaded, Facebook post
+    ID, Instagram container ID, Instagram media ID), so a retry resumes at the first stage
+    that is not done; sheet_synced is the final stage. A retryable failure is scheduled for
+    another attempt with exponential backoff, up to retry_max_attempts attempts in total.
+    """
+
+    # Stages of one account's upload, in pipeline order
+    STAGE_DOWNLOADED = 'downloaded'
+    STAGE_FACEBOOK_POSTED = 'facebook_posted'
+    STAGE_INSTAGRAM_CONTAINER = 'instagram_container'
+    STAGE_INSTAGRAM_PUBLISHED = 'instagram_published'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS posts (
+            row_key TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            spreadsheet_url TEXT NOT NULL,
+            row_index INTEGER NOT NULL,
+            scheduled_at TEXT,
+            state TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            facebook_post_id TEXT,
+            instagram_post_id TEXT,
+            last_error TEXT,
+            sheet_status TEXT,
+            sheet_synced INTEGER NOT NULL DEFAULT 1,
+            updated_at TEXT NOT NULL,
+            next_retry_at TEXT,
+            PRIMARY KEY (row_key, content_hash)
+        );
+        CREATE INDEX IF NOT EXISTS idx_posts_schedule ON posts (spreadsheet_url, state, scheduled_at);
+        CREATE INDEX IF NOT EXISTS idx_posts_unsynced ON posts (sheet_synced) WHERE sheet_synced = 0;
+        CREATE TABLE IF NOT EXISTS attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            row_key TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            recorded_at TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            facebook_post_id TEXT,
+            instagram_post_id TEXT,
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_attempts_post ON attempts (row_key, content_hash);
+        CREATE TABLE IF NOT EXISTS post_stages (
+            row_key TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            account TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            value TEXT,
+            recorded_at TEXT NOT NULL,
+            PRIMARY KEY (row_key, content_hash, account, stage)
+        );
+    """
+
+    # Columns added after the first release; ledgers created before them are migrated on open
+    ADDED_COLUMNS = (('next_retry_at', 'TEXT'),)
+
+    def __init__(self, path: str, retry_base: float = 300.0, retry_max_delay: float = 6 * 3600.0,
+                 retry_max_attempts: int = 5):
+        self.path = path
+        self.retry_base = retry_base
+        self.retry_max_delay = retry_max_delay
+        self.retry_max_attempts = retry_max_attempts
+        self._local = threading.local()
+        self.generation = 0 # Bumped whenever the set of settled posts may have changed
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(posts)')}
+        for name, definition in self.ADDED_COLUMNS:
+            if name not in columns:
+                conn.execute(f'ALTER TABLE posts ADD COLUMN {name} {definition}')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_posts_retry ON posts (next_retry_at) WHERE next_retry_at IS NOT NULL')
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets the replicator read while publishers write"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def sync_schedule(self, spreadsheet_url: str, entries: list[tuple]):
+        """Upsert pending rows as (row_key, content_hash, row_index, scheduled_at) for indexed lookups"""
+        now = datetime.now().isoformat()
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN')
+            conn.executemany(
+                """INSERT INTO posts (row_key, content_hash, spreadsheet_url, row_index, scheduled_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (row_key, content_hash) DO UPDATE SET
+                       row_index = excluded.row_index, scheduled_at = excluded.scheduled_at
+                   WHERE posts.state = 'pending'""",
+                [(row_key, content_hash, spreadsheet_url, row_index, scheduled_at, now)
+                 for row_key, content_hash, row_index, scheduled_at in entries]
+            )
+
+    # A failed post becomes claimable again only once its failure status has reached the sheet
+    # and the row was set back to pending there; until then it is still waiting on replication.
+    CLAIMABLE = "(state = 'pending' OR (state = 'failed' AND sheet_synced = 1))"
+
+    def due(self, spreadsheet_url: str, start: datetime, end: datetime) -> set:
+        """Keys of claimable posts scheduled in [start, end]"""
+        rows = self._conn().execute(
+            f"""SELECT row_key, content_hash FROM posts
+                WHERE spreadsheet_url = ? AND scheduled_at BETWEEN ? AND ? AND {self.CLAIMABLE}""",
+            (spreadsheet_url, start.isoformat(sep=' '), end.isoformat(sep=' '))
+        ).fetchall()
+        return set(rows)
+
+    def settled_keys(self, spreadsheet_url: str) -> set:
+        """Keys of posts that are in progress, posted, or failed and not yet replicated"""
+        rows = self._conn().execute(
+            f"SELECT row_key, content_hash FROM posts WHERE spreadsheet_url = ? AND NOT {self.CLAIMABLE}",
+            (spreadsheet_url,)
+        ).fetchall()
+        return set(rows)
+
+    def claim(self, key: tuple, spreadsheet_url: str, row_index: int, scheduled_at: datetime = None) -> bool:
+        """Atomically mark a post in progress. False if it is posted, in flight or awaiting replication."""
+        row_key, content_hash = key
+        now = datetime.now().isoformat()
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                """INSERT OR IGNORE INTO posts (row_key, content_hash, spreadsheet_url, row_index, scheduled_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (row_key, content_hash, spreadsheet_url, row_index,
+                 scheduled_at.isoformat(sep=' ') if scheduled_at else None, now)
+            )
+            cursor = conn.execute(
+                f"""UPDATE posts SET state = 'in_progress', attempts = attempts + 1, row_index = ?, updated_at = ?
+                    WHERE row_key = ? AND content_hash = ? AND {self.CLAIMABLE}""",
+                (row_index, now, row_key, content_hash)
+            )
+            claimed = cursor.rowcount == 1
+        if claimed:
+            self.generation += 1
+        return claimed
+
+    def record_stage(self, key: tuple, account: str, stage: str, value: str = None):
+        """Persist that one stage of a post is done for an account (value: the post or container ID)"""
+        row_key, content_hash = key
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """INSERT INTO post_stages (row_key, content_hash, account, stage, value, recorded_at) VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (row_key, content_hash, account, stage) DO UPDATE SET
+                       value = excluded.value, recorded_at = excluded.recorded_at""",
+                (row_key, content_hash, account, stage, value, datetime.now().isoformat())
+            )
+
+    def stages(self, key: tuple) -> dict:
+        """{account: {stage: value}} of the stages a post has completed"""
+        progress = {}
+        for account, stage, value in self._conn().execute(
+                "SELECT account, stage, value FROM post_stages WHERE row_key = ? AND content_hash = ?", key):
+            progress.setdefault(account, {})[stage] = value
+        return progress
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before the attempt after attempts tries: retry_base doubling per attempt, capped"""
+        return min(self.retry_max_delay, self.retry_base * 2 ** max(0, attempts - 1))
+
+    def record_result(self, key: tuple, sheet_status: str, facebook_post_id: str = None,
+                      instagram_post_id: str = None, error: str = None, retryable: bool = False):
+        """Store the outcome of an attempt and queue its status for replication to the sheet.
+        A retryable failure is scheduled for another attempt unless the post is out of attempts."""
+        row_key, content_hash = key
+        state = 'posted' if sheet_status == 'Posted' else 'failed'
+        now = datetime.now()
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN')
+            next_retry_at = None
+            if state == 'failed' and retryable:
+                row = conn.execute("SELECT attempts FROM posts WHERE row_key = ? AND content_hash = ?", key).fetchone()
+                attempts = row[0] if row else 0
+                if attempts < self.retry_max_attempts:
+                    next_retry_at = (now + timedelta(seconds=self.retry_delay(attempts))).isoformat()
+            conn.execute(
+                """UPDATE posts SET state = ?, sheet_status = ?, sheet_synced = 0, last_error = ?, updated_at = ?,
+                       next_retry_at = ?,
+                       facebook_post_id = COALESCE(?, facebook_post_id), instagram_post_id = COALESCE(?, instagram_post_id)
+                   WHERE row_key = ? AND content_hash = ?""",
+                (state, sheet_status, error, now.isoformat(), next_retry_at, facebook_post_id, instagram_post_id,
+                 row_key, content_hash)
+            )
+            conn.execute(
+                """INSERT INTO attempts (row_key, content_hash, recorded_at, outcome, facebook_post_id, instagram_post_id, error)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (row_key, content_hash, now.isoformat(), sheet_status, facebook_post_id, instagram_post_id, error)
+            )
+        self.generation += 1
+
+    def retry_due(self, now: datetime, limit: int = 50) -> list[tuple]:
+        """Failed posts whose next attempt is due: (row_key, content_hash, spreadsheet_url, row_index, sheet_status)"""
+        return self._conn().execute(
+            """SELECT row_key, content_hash, spreadsheet_url, row_index, sheet_status FROM posts
+               WHERE next_retry_at IS NOT NULL AND next_retry_at <= ? AND state = 'failed'
+               ORDER BY next_retry_at LIMIT ?""",
+            (now.isoformat(), limit)
+        ).fetchall()
+
+    def claim_retry(self, key: tuple) -> bool:
+        """Atomically move a failed post whose retry is due back in progress"""
+        row_key, content_hash = key
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.execute(
+                """UPDATE posts SET state = 'in_progress', attempts = attempts + 1, next_retry_at = NULL, updated_at = ?
+                   WHERE row_key = ? AND content_hash = ? AND state = 'failed' AND next_retry_at IS NOT NULL""",
+                (datetime.now().isoformat(), row_key, content_hash)
+            )
+            claimed = cursor.rowcount == 1
+        if claimed:
+            self.generation += 1
+        return claimed
+
+    def cancel_retry(self, key: tuple):
+        """Drop a scheduled retry (the row was edited, removed or given another Status in the sheet)"""
+        row_key, content_hash = key
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE posts SET next_retry_at = NULL WHERE row_key = ? AND content_hash = ?",
+                         (row_key, content_hash))
+
+    def state(self, key: tuple) -> str | None:
+        """A post's state ('pending', 'in_progress', 'posted' or 'failed'); None when it is not in the ledger"""
+        row = self._conn().execute("SELECT state FROM posts WHERE row_key = ? AND content_hash = ?", key).fetchone()
+        return row[0] if row else None
+
+    def unsynced(self, limit: int = 500) -> list[tuple]:
+        """Statuses not yet written to the sheet: (row_key, content_hash, spreadsheet_url, row_index, sheet_status)"""
+        return self._conn().execute(
+            """SELECT row_key, content_hash, spreadsheet_url, row_index, sheet_status FROM posts
+               WHERE sheet_synced = 0 ORDER BY updated_at LIMIT ?""",
+            (limit,)
+        ).fetchall()
+
+    def mark_synced(self, rows: list[tuple]):
+        """Mark replicated rows as synced, unless their status changed again in the meantime"""
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN')
+            conn.executemany(
+                "UPDATE posts SET sheet_synced = 1 WHERE row_key = ? AND content_hash = ? AND sheet_status = ?",
+                [(row_key, content_hash, sheet_status) for row_key, content_hash, _, _, sheet_status in rows]
+            )
+        self.generation += 1
+
+    def status(self) -> dict:
+        counts = dict(self._conn().execute("SELECT state, COUNT(*) FROM posts GROUP BY state").fetchall())
+        unsynced = self._conn().execute("SELECT COUNT(*) FROM posts WHERE sheet_synced = 0").fetchone()[0]
+        retries = self._conn().execute("SELECT COUNT(*) FROM posts WHERE next_retry_at IS NOT NULL").fetchone()[0]
+        return {'path': self.path, 'posts': counts, 'unsynced_statuses': unsynced, 'retries_scheduled': retries,
+                'retry_max_attempts': self.retry_max_attempts}
+
+
+class LedgerReplicator:
+    """Background thread that replicates ledger statuses to the sheet's Status column in batches.
+
+    Passes are coalesced: the thread syncs every interval seconds, or sooner once batch_size
+    new statuses are waiting or a publishing run has finished. Each sheet keeps one status
+    buffer for the replicator's lifetime, so its worksheet handle and row map are reused
+    across passes (the row map for row_map_ttl seconds), and the sheet cache is invalidated
+    once per pass that wrote to the sheet.
+    """
+
+    def __init__(self, poster, ledger: PostLedger, interval: float = 5.0, batch_size: int = 50, row_map_ttl: float = 30.0):
+        self.poster = poster
+        self.ledger = ledger
+        self.interval = interval
+        self.batch_size = batch_size
+        self.row_map_ttl = row_map_ttl
+        self._buffers = {} # spreadsheet_url -> StatusWriteBuffer
+        self._waiting = 0 # statuses recorded since the last pass
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock() # One pass at a time; a caller waiting on it finds its rows already written
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def notify(self, urgent: bool = False):
+        """Record that a status is waiting, starting the thread on first use. The pass runs at the
+        next interval unless batch_size statuses are waiting; urgent asks for one right away."""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ledger-replicator', daemon=True)
+                self._thread.start()
+        with self._lock:
+            self._waiting += 1
+            urgent = urgent or self._waiting >= self.batch_size
+        if urgent:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(timeout=self.interval)
+            self._wakeup.clear()
+            with self._lock:
+                self._waiting = 0
+            try:
+                self.sync_once()
+            except Exception as e:
+                logger.error(f"Ledger replication error: {e}", exc_info=True)
+
+    def _buffer(self, spreadsheet_url: str) -> StatusWriteBuffer | None:
+        status_buffer = self._buffers.get(spreadsheet_url)
+        if status_buffer is None:
+            status_buffer = self.poster.create_status_buffer(spreadsheet_url, row_map_ttl=self.row_map_ttl)
+            if status_buffer is not None:
+                self._buffers[spreadsheet_url] = status_buffer
+        return status_buffer
+
+    def sync_once(self) -> int:
+        """Write every unsynced status to its sheet; rows that fail stay unsynced for the next pass"""
+        if not self.poster.gc:
+            return 0
+        
+        with self._sync_lock:
+            return self._sync()
+
+    def _sync(self) -> int:
+        by_sheet = {}
+        for row in self.ledger.unsynced():
+            by_sheet.setdefault(row[2], []).append(row)
+        
+        written = 0
+        for spreadsheet_url, rows in by_sheet.items():
+            status_buffer = self._buffer(spreadsheet_url)
+            if status_buffer is None:
+                continue
+            for row_key, _, _, row_index, sheet_status in rows:
+                # row_key is '<spreadsheet id>:<row identity>'; resolve by identity so inserted rows can't shift the write
+                status_buffer.queue_key(row_key.split(':', 1)[1], sheet_status)
+            if status_buffer.flush():
+                self.ledger.mark_synced(rows)
+                self.poster.sheet_cache.invalidate(spreadsheet_url)
+                written += len(rows)
+        return written
+
+
+class PostRetryWorker:
+    """Background thread that resumes failed posts once their retry backoff has elapsed.
+
+    A failed attempt leaves the stages it completed in the ledger and, when the failure is
+    worth retrying, a next_retry_at. Each pass claims the posts that are due and publishes
+    them again through the normal pipeline, which skips every stage already done: a post
+    whose Facebook upload succeeded only retries Instagram, publishing its existing container
+    when that is still usable. Before a retry the row is re-read from its sheet; rows that
+    were edited, removed or given a Status other than pending or the failure are left alone.
+    """
+
+    def __init__(self, poster, ledger: PostLedger, interval: float = 60.0):
+        self.poster = poster
+        self.ledger = ledger
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_pass = None
+        self.stats = {'passes': 0, 'posted': 0, 'failed': 0, 'cancelled': 0}
+
+    def start(self):
+        """Start the retry thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='post-retry', daemon=True)
+        self._thread.start()
+        logger.info(f"Post retry worker started (every {self.interval:.0f}s, at most {self.ledger.retry_max_attempts} attempts)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Post retry error: {e}", exc_info=True)
+            self._stop.wait(self.interval)
+
+    def _skip_reason(self, source_url: str, key: tuple, df, position, sheet_status: str) -> str | None:
+        """Why the row behind a due retry should not be posted again (None to retry it)"""
+        if position is None:
+            return 'row is no longer in the sheet'
+        row = self.poster.sheet_row(df, position)
+        if self.poster.ledger_key(source_url, int(df.index[position]), row) != key:
+            return 'row was edited since the failed attempt'
+        status = row.get(self.poster.STATUS_COL)
+        status = '' if is_missing(status) else str(status).strip()
+        if status and status.lower() not in self.poster.PENDING_STATUSES and status != sheet_status:
+            return f"Status was changed to '{status}'"
+        return None
+
+    def run_once(self) -> list[dict]:
+        """Resume every failed post whose retry is due; returns the results of the attempts"""
+        due = self.ledger.retry_due(datetime.now())
+        self.stats['passes'] += 1
+        if not due:
+            return []
+        
+        by_sheet = {}
+        for entry in due:
+            by_sheet.setdefault(entry[2], []).append(entry)
+        
+        ready_posts = []
+        for source_url, entries in by_sheet.items():
+            df = self.poster.load_google_spreadsheet(source_url, revalidate=True)
+            if df is None or self.poster.ROW_KEY_COL not in df.columns:
+                logger.warning(f"Could not load {source_url}; its {len(entries)} retries wait for the next pass")
+                continue
+            positions = {str(identity): position for position, identity in enumerate(df[self.poster.ROW_KEY_COL])}
+            for row_key, content_hash, _, _, sheet_status in entries:
+                key = (row_key, content_hash)
+                # row_key is '<spreadsheet id>:<row identity>', as in the LedgerReplicator
+                position = positions.get(row_key.split(':', 1)[1])
+                reason = self._skip_reason(source_url, key, df, position, sheet_status)
+                if reason:
+                    logger.info(f"Not retrying {row_key}: {reason}")
+                    self.ledger.cancel_retry(key)
+                    self.stats['cancelled'] += 1
+                    metrics.inc('poster_post_retries_total', outcome='cancelled')
+                    continue
+                if self.poster.shards is not None and not self.poster.shards.acquire('|'.join(key)):
+                    # Another instance has taken the post over since it failed here
+                    logger.info(f"Not retrying {row_key}: it is leased or posted by another instance")
+                    self.ledger.cancel_retry(key)
+                    self.stats['cancelled'] += 1
+                    metrics.inc('poster_post_retries_total', outcome='cancelled')
+                    continue
+                if self.ledger.claim_retry(key):
+                    ready_posts.append({'index': int(df.index[position]), 'row': self.poster.sheet_row(df, position),
+                                        'spreadsheet_url': source_url, 'ledger_key': key})
+        
+        if not ready_posts:
+            return []
+        logger.info(f"Retrying {len(ready_posts)} failed posts from their first incomplete stage")
+        results = self.poster.publish_ready_posts(ready_posts, already_claimed=True)
+        for result in results:
+            outcome = 'posted' if result.get('status') == 'Posted' else 'failed'
+            self.stats[outcome] += 1
+            metrics.inc('poster_post_retries_total', outcome=outcome)
+        self.last_pass = {
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'retried': len(results),
+            'posted': sum(1 for result in results if result.get('status') == 'Posted'),
+        }
+        return results
+
+    def status(self) -> dict:
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'interval_seconds': self.interval,
+            'retry_base_seconds': self.ledger.retry_base,
+            'max_attempts': self.ledger.retry_max_attempts,
+            'stats': dict(self.stats),
+            'last_pass': self.last_pass,
+        }
+
+
+class SQLiteLeaseStore:
+    """Post leases and instance heartbeats shared by every instance, in one SQLite file.
+
+    Point it at a volume all instances mount (a network file system with working locks), or at
+    a local path when the instances share a host. Times are wall-clock epoch seconds, so they
+    compare across hosts. A lease is 'leased' while its holder publishes the post; afterwards it
+    is 'posted' (never leased again), 'partial' (something was published: only the holder, which
+    has the completed stages in its ledger, may lease it again) or 'released' (free for anyone).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS leases (
+            post_key TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            state TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_leases_updated ON leases (updated_at);
+        CREATE TABLE IF NOT EXISTS members (
+            instance_id TEXT PRIMARY KEY,
+            heartbeat_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread. The default rollback journal rather than WAL, which needs
+        shared memory and so does not work across hosts on a network file system."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def heartbeat(self, instance_id: str, now: float):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """INSERT INTO members (instance_id, heartbeat_at) VALUES (?, ?)
+                   ON CONFLICT (instance_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at""",
+                (instance_id, now)
+            )
+
+    def leave(self, instance_id: str):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM members WHERE instance_id = ?", (instance_id,))
+
+    def members(self, since: float) -> list[str]:
+        """Instances that sent a heartbeat at or after since"""
+        return [row[0] for row in self._conn().execute(
+            "SELECT instance_id FROM members WHERE heartbeat_at >= ? ORDER BY instance_id", (since,))]
+
+    def acquire(self, post_key: str, owner: str, ttl: float, now: float) -> bool:
+        """Lease a post for ttl seconds. False if another instance holds it, or it was posted."""
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.execute(
+                """INSERT INTO leases (post_key, owner, state, expires_at, updated_at) VALUES (?, ?, 'leased', ?, ?)
+                   ON CONFLICT (post_key) DO UPDATE SET
+                       owner = excluded.owner, state = 'leased', expires_at = excluded.expires_at, updated_at = excluded.updated_at
+                   WHERE leases.state = 'released'
+                      OR (leases.state = 'leased' AND leases.expires_at < excluded.updated_at)
+                      OR (leases.owner = excluded.owner AND leases.state != 'posted')""",
+                (post_key, owner, now + ttl, now)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, post_key: str, owner: str, state: str, now: float):
+        """End a lease held by owner with state 'posted', 'partial' or 'released'"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE leases SET state = ?, updated_at = ? WHERE post_key = ? AND owner = ? AND state = 'leased'",
+                (state, now, post_key, owner)
+            )
+
+    def prune(self, before: float):
+        """Forget settled leases and heartbeats last touched before the given time"""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM leases WHERE updated_at < ? AND state != 'leased'", (before,))
+            conn.execute("DELETE FROM members WHERE heartbeat_at < ?", (before,))
+
+    def status(self) -> dict:
+        counts = dict(self._conn().execute("SELECT state, COUNT(*) FROM leases GROUP BY state").fetchall())
+        return {'backend': 'sqlite', 'path': self.path, 'leases': counts}
+
+
+class FileLeaseStore:
+    """The SQLiteLeaseStore's leases as plain files in a shared directory: one JSON file per post,
+    read and rewritten under an exclusive flock, and one heartbeat file per instance (POSIX only)"""
+
+    def __init__(self, directory: str):
+        import fcntl
+        self._fcntl = fcntl
+        self.directory = directory
+        self._leases_dir = os.path.join(directory, 'leases')
+        self._members_dir = os.path.join(directory, 'members')
+        os.makedirs(self._leases_dir, exist_ok=True)
+        os.makedirs(self._members_dir, exist_ok=True)
+
+    def _member_path(self, instance_id: str) -> str:
+        return os.path.join(self._members_dir, re.sub(r'[^A-Za-z0-9_.-]', '_', instance_id))
+
+    @contextmanager
+    def _locked(self, post_key: str):
+        """Open file descriptor of a post's lease file, exclusively locked"""
+        path = os.path.join(self._leases_dir, hashlib.sha1(post_key.encode('utf-8')).hexdigest())
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            self._fcntl.flock(fd, self._fcntl.LOCK_EX)
+            yield fd
+        finally:
+            os.close(fd) # Also releases the lock
+
+    @staticmethod
+    def _read(fd) -> dict | None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        data = os.read(fd, 65536)
+        return json.loads(data) if data else None
+
+    @staticmethod
+    def _write(fd, lease: dict):
+        data = json.dumps(lease).encode('utf-8')
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.ftruncate(fd, 0)
+        os.write(fd, data)
+        os.fsync(fd)
+
+    def heartbeat(self, instance_id: str, now: float):
+        path = self._member_path(instance_id)
+        with open(f"{path}.tmp", 'w') as f:
+            f.write(json.dumps({'instance_id': instance_id, 'heartbeat_at': now}))
+        os.replace(f"{path}.tmp", path)
+
+    def leave(self, instance_id: str):
+        try:
+            os.remove(self._member_path(instance_id))
+        except FileNotFoundError:
+            pass
+
+    def _heartbeats(self) -> list[dict]:
+        heartbeats = []
+        for name in os.listdir(self._members_dir):
+            if name.endswith('.tmp'):
+                continue
+            try:
+                with open(os.path.join(self._members_dir, name)) as f:
+                    heartbeats.append(json.load(f))
+            except (OSError, ValueError):
+                continue # Removed or being replaced
+        return heartbeats
+
+    def members(self, since: float) -> list[str]:
+        return sorted(beat['instance_id'] for beat in self._heartbeats() if beat['heartbeat_at'] >= since)
+
+    def acquire(self, post_key: str, owner: str, ttl: float, now: float) -> bool:
+        with self._locked(post_key) as fd:
+            lease = self._read(fd)
+            if lease is not None and not (
+                    lease['state'] == 'released'
+                    or (lease['state'] == 'leased' and lease['expires_at'] < now)
+                    or (lease['owner'] == owner and lease['state'] != 'posted')):
+                return False
+            self._write(fd, {'post_key': post_key, 'owner': owner, 'state': 'leased', 'expires_at': now + ttl, 'updated_at': now})
+            return True
+
+    def complete(self, post_key: str, owner: str, state: str, now: float):
+        with self._locked(post_key) as fd:
+            lease = self._read(fd)
+            if lease is not None and lease['owner'] == owner and lease['state'] == 'leased':
+                self._write(fd, {**lease, 'state': state, 'updated_at': now})
+
+    def prune(self, before: float):
+        for name in os.listdir(self._leases_dir):
+            path = os.path.join(self._leases_dir, name)
+            try:
+                with open(path) as f:
+                    lease = json.load(f)
+                if lease['state'] != 'leased' and lease['updated_at'] < before:
+                    os.remove(path)
+            except (OSError, ValueError):
+                continue
+        for beat in self._heartbeats():
+            if beat['heartbeat_at'] < before:
+                self.leave(beat['instance_id'])
+
+    def status(self) -> dict:
+        return {'backend': 'file', 'directory': self.directory, 'lease_files': len(os.listdir(self._leases_dir))}
+
+
+class ShardCoordinator:
+    """Splits publishing between the instances (e.g. Cloud Run) that share a lease store.
+
+    Every instance sends a heartbeat to the store; the instances heard from in the last
+    member_ttl seconds are the members. Each post is owned by one member, chosen by rendezvous
+    hashing of the post's ledger key (the member with the highest sha1 of member and key), so
+    a joining or leaving instance only moves the posts it gains or loses. An instance publishes
+    the due posts it owns, plus posts of other members that are steal_after seconds past their
+    scheduled time, which covers an owner that died or is not running its scheduler.
+
+    Ownership only spreads the work; the lease is what keeps a post from going out twice.
+    Before a post is published it is leased in the store for lease_seconds. A post that is
+    leased by another instance, or already posted, is skipped, and the lease of an instance
+    that died expires. A post that failed after something was published stays with its
+    instance, whose ledger holds the completed stages for the retry.
+    """
+
+    # How often settled leases older than RETENTION_SECONDS are pruned from the store
+    PRUNE_INTERVAL = 3600.0
+    RETENTION_SECONDS = 7 * 86400.0
+
+    def __init__(self, store, instance_id: str = None, lease_seconds: float = 900.0, member_ttl: float = 60.0,
+                 steal_after: float = 120.0):
+        self.store = store
+        self.instance_id = instance_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.member_ttl = member_ttl
+        self.steal_after = steal_after
+        self._members = (0.0, [self.instance_id]) # (monotonic time read, members)
+        self._members_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._last_prune = 0.0
+        self.stats = {'own': 0, 'stolen': 0, 'foreign': 0, 'taken': 0, 'errors': 0}
+
+    @classmethod
+    def from_env(cls):
+        """Coordinator for SHARD_STORE ('sqlite:///path/leases.db' or 'file:///shared/dir'); None when unset"""
+        url = os.getenv("SHARD_STORE", "")
+        if not url:
+            return None
+        scheme, _, path = url.partition('://')
+        if scheme == 'sqlite':
+            store = SQLiteLeaseStore(path)
+        elif scheme == 'file':
+            store = FileLeaseStore(path)
+        else:
+            raise ValueError(f"Unsupported SHARD_STORE '{url}' (expected sqlite:///path or file:///directory)")
+        return cls(
+            store,
+            instance_id=os.getenv("SHARD_INSTANCE_ID") or None,
+            lease_seconds=float(os.getenv("SHARD_LEASE_SECONDS", "900")),
+            member_ttl=float(os.getenv("SHARD_MEMBER_TTL_SECONDS", "60")),
+            steal_after=float(os.getenv("SHARD_STEAL_AFTER_SECONDS", "120"))
+        )
+
+    def start(self):
+        """Join the members and keep sending heartbeats (idempotent; also done on first use)"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self.store.heartbeat(self.instance_id, time.time())
+            self._members = (0.0, self._members[1]) # Re-read the members now that this instance is one
+            self._thread = threading.Thread(target=self._run, name='shard-heartbeat', daemon=True)
+            self._thread.start()
+        logger.info(f"Joined the publishing shards as {self.instance_id} (heartbeat every {self.member_ttl / 3:.0f}s)")
+
+    def stop(self):
+        """Stop the heartbeat and leave, so the other members take over this instance's posts at once"""
+        self._stop.set()
+        try:
+            self.store.leave(self.instance_id)
+        except Exception as e:
+            logger.warning(f"Could not leave the publishing shards: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.member_ttl / 3):
+            try:
+                now = time.time()
+                self.store.heartbeat(self.instance_id, now)
+                if now - self._last_prune >= self.PRUNE_INTERVAL:
+                    self._last_prune = now
+                    self.store.prune(now - self.RETENTION_SECONDS)
+            except Exception as e:
+                logger.error(f"Shard heartbeat error: {e}", exc_info=True)
+
+    def members(self) -> list[str]:
+        """Live members, re-read from the store at most every few seconds; always includes this instance"""
+        self.start()
+        read_at, members = self._members
+        if time.monotonic() - read_at < min(5.0, self.member_ttl / 4):
+            return members
+        with self._members_lock:
+            try:
+                members = self.store.members(time.time() - self.member_ttl)
+            except Exception as e:
+                logger.warning(f"Could not read the shard members, keeping the last list: {e}")
+            if self.instance_id not in members:
+                members = sorted([*members, self.instance_id])
+            self._members = (time.monotonic(), members)
+        return members
+
+    def owner(self, post_key: str) -> str:
+        """Member that publishes a post (rendezvous hashing)"""
+        return max(self.members(), key=lambda member: hashlib.sha1(f"{member}\x1f{post_key}".encode('utf-8')).digest())
+
+    def should_take(self, post_key: str, scheduled_datetime: datetime = None, now: datetime = None) -> bool:
+        """True for posts in this instance's shard, and for other members' posts once they are
+        steal_after seconds overdue"""
+        if self.owner(post_key) == self.instance_id:
+            return True
+        if scheduled_datetime is not None and ((now or datetime.now()) - scheduled_datetime).total_seconds() >= self.steal_after:
+            return True
+        self.stats['foreign'] += 1
+        metrics.inc('poster_shard_claims_total', outcome='foreign')
+        return False
+
+    def acquire(self, post_key: str) -> bool:
+        """Lease a post before publishing it; False if another instance has it or it was posted"""
+        self.start()
+        try:
+            acquired = self.store.acquire(post_key, self.instance_id, self.lease_seconds, time.time())
+        except Exception as e:
+            # Without the store a post could go out twice, so it waits for the next run instead
+            logger.error(f"Could not lease post {post_key}: {e}")
+            outcome = 'errors'
+        else:
+            outcome = ('own' if self.owner(post_key) == self.instance_id else 'stolen') if acquired else 'taken'
+        self.stats[outcome] += 1
+        metrics.inc('poster_shard_claims_total', outcome=outcome)
+        return outcome in ('own', 'stolen')
+
+    def complete(self, post_key: str, state: str):
+        """End this instance's lease: 'posted', 'partial' (something was published) or 'released'"""
+        try:
+            self.store.complete(post_key, self.instance_id, state, time.time())
+        except Exception as e:
+            # The lease runs out after lease_seconds instead
+            logger.error(f"Could not complete the lease of post {post_key}: {e}")
+
+    def status(self) -> dict:
+        try:
+            store = self.store.status()
+        except Exception as e:
+            store = {'error': str(e)}
+        return {
+            'instance_id': self.instance_id,
+            'heartbeat_running': bool(self._thread and self._thread.is_alive()),
+            'members': self._members[1], # As last read: members() would join the shards as a side effect
+            'lease_seconds': self.lease_seconds,
+            'steal_after_seconds': self.steal_after,
+            'store': store,
+            'stats': dict(self.stats),
+        }
+
+
+class MediaPrefetcher:
+    """Background look-ahead that downloads and validates the images of rows due in the next hours.
+    Opt-in (MEDIA_PREFETCH_HOURS > 0), since it writes to the sheet.
+
+    Each pass fetches every distinct upcoming image concurrently (within the poster's download
+    limit), which warms the media cache. Rows whose image cannot be posted anywhere (missing,
+    private, not an image, over MEDIA_MAX_BYTES) get a 'Media Error: ...' Status, which takes
+    them out of the pending schedule until the image is fixed and the row set back to Pending.
+    Images outside Instagram's own limits (JPEG only, at most 8 MB, aspect ratio between 4:5
+    and 1.91:1) can still go to Facebook, so they are only reported as warnings. Network errors
+    and 5xx responses are only logged and retried on the next pass. Images that passed are not
+    checked again for recheck_after seconds.
+    """
+
+    IG_CONTENT_TYPES = ('image/jpeg',)
+    IG_MAX_BYTES = 8 * 1024 * 1024
+    IG_MIN_ASPECT_RATIO = 4 / 5
+    IG_MAX_ASPECT_RATIO = 1.91
+    HEADER_BYTES = 512 * 1024 # Read at most this much of an image to find its dimensions
+    PERMANENT_HTTP_ERRORS = (400, 401, 403, 404, 410)
+    ERROR_STATUS = 'Media Error'
+
+    def __init__(self, poster, hours: float = 6.0, interval: float = 600.0, workers: int = 4, recheck_after: float = 3600.0):
+        self.poster = poster
+        self.hours = hours
+        self.interval = interval
+        self.workers = workers
+        self.recheck_after = recheck_after
+        self._checked = {} # media cache key -> time.monotonic() it last passed
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_pass = None
+        self.stats = {'passes': 0, 'ok': 0, 'warning': 0, 'invalid': 0, 'error': 0}
+        self.instagram_warnings = {} # image URL -> why Instagram will likely reject it
+
+    def start(self):
+        """Start the prefetch thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='media-prefetcher', daemon=True)
+        self._thread.start()
+        logger.info(f"Media prefetcher started ({self.hours:g}h look-ahead, every {self.interval:.0f}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Media prefetch error: {e}", exc_info=True)
+            self._stop.wait(self.interval)
+
+    def validate(self, media: MediaPayload) -> list[str]:
+        """Reasons the image would be rejected by Instagram (empty when it is fine); Facebook accepts it either way"""
+        problems = []
+        if media.content_type not in self.IG_CONTENT_TYPES:
+            problems.append(f"Instagram only accepts JPEG images, got {media.content_type}")
+        if media.size is not None and media.size > self.IG_MAX_BYTES:
+            problems.append(f"image is {media.size / (1024 * 1024):.1f} MB, over Instagram's 8 MB limit")
+        
+        head = bytearray()
+        dimensions = None
+        for chunk in media.iter_chunks():
+            head.extend(chunk)
+            dimensions = image_dimensions(bytes(head))
+            if dimensions is not None or len(head) >= self.HEADER_BYTES:
+                break
+        if dimensions is None:
+            logger.warning(f"Could not read the dimensions of {media.source_url}; aspect ratio not checked")
+        elif dimensions[1] > 0:
+            width, height = dimensions
+            ratio = width / height
+            if not self.IG_MIN_ASPECT_RATIO <= ratio <= self.IG_MAX_ASPECT_RATIO:
+                problems.append(f"aspect ratio {width}x{height} is outside Instagram's 4:5 to 1.91:1 range")
+        return problems
+
+    def check(self, image_url: str) -> tuple[str, str]:
+        """('ok' | 'warning' | 'invalid' | 'error', detail) for one image: 'warning' is usable on Facebook
+        only, 'invalid' on neither platform and 'error' a failure worth retrying"""
+        try:
+            with self.poster.stage_limits['download']:
+                media = self.poster.open_media(image_url)
+                try:
+                    problems = self.validate(media)
+                finally:
+                    media.close()
+        except requests.exceptions.HTTPError as e:
+            status_code = e.response.status_code if e.response is not None else None
+            if status_code in self.PERMANENT_HTTP_ERRORS:
+                return 'invalid', f"image URL returned HTTP {status_code}"
+            return 'error', str(e)
+        except requests.exceptions.RequestException as e:
+            return 'error', str(e)
+        except ValueError as e: # Not an image (e.g. Drive's sign-in page for a private file) or over MEDIA_MAX_BYTES
+            return 'invalid', str(e)
+        return ('warning', '; '.join(problems)) if problems else ('ok', '')
+
+    def run_once(self) -> dict:
+        """Check the images of rows due in the next hours and flag the rows whose image is unusable"""
+        started = time.perf_counter()
+        df = self.poster.load_schedule()
+        if df is None or self.poster.IMAGEURL_COL not in df.columns:
+            return {}
+        snapshot = self.poster.schedule_snapshot(df)
+        now = datetime.now()
+        rows = snapshot.records(snapshot.positions_between(now, now + timedelta(hours=self.hours)))
+        
+        by_image = {} # media cache key -> (image URL, rows using it)
+        for row in rows:
+            image_url = str(row[self.poster.IMAGEURL_COL]).strip()
+            if image_url and image_url.lower() != 'nan':
+                by_image.setdefault(self.poster.media_cache_key(image_url), (image_url, []))[1].append(row)
+        
+        checked_since = time.monotonic() - self.recheck_after
+        self._checked = {key: checked_at for key, checked_at in self._checked.items() if checked_at >= checked_since}
+        self.instagram_warnings = {image_url: detail for image_url, detail in self.instagram_warnings.items()
+                                   if self.poster.media_cache_key(image_url) in self._checked}
+        due = {key: entry for key, entry in by_image.items() if key not in self._checked}
+        outcomes = {}
+        if due:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(due)), thread_name_prefix='prefetch') as executor:
+                outcomes = dict(zip(due, executor.map(lambda entry: self.check(entry[0]), due.values())))
+        
+        flagged = {} # source URL -> [(row key, status)]
+        for key, (outcome, detail) in outcomes.items():
+            image_url, image_rows = due[key]
+            self.stats[outcome] += 1
+            metrics.inc('poster_prefetch_total', outcome=outcome)
+            if outcome in ('ok', 'warning'):
+                self._checked[key] = time.monotonic()
+            if outcome == 'warning':
+                # Left in the schedule: it still posts to Facebook, and Instagram reports its own error
+                logger.warning(f"Image for {len(image_rows)} upcoming row(s) will likely be rejected by Instagram: {image_url}: {detail}")
+                self.instagram_warnings[image_url] = detail
+                for row in image_rows:
+                    events.publish('media_warning', row=row.index + 1, image_url=image_url, warning=detail)
+            elif outcome == 'invalid':
+                logger.warning(f"Image for {len(image_rows)} upcoming row(s) is unusable: {image_url}: {detail}")
+                for row in image_rows:
+                    flagged.setdefault(row[self.poster.SOURCE_COL], []).append(
+                        (row[self.poster.ROW_KEY_COL], f"{self.ERROR_STATUS}: {detail}"[:250]))
+                    events.publish('media_flagged', row=row.index + 1, image_url=image_url, error=detail)
+            else:
+                logger.warning(f"Prefetch of {image_url} failed, retrying next pass: {detail}")
+        
+        for source_url, updates in flagged.items():
+            status_buffer = self.poster.create_status_buffer(source_url)
+            if status_buffer is None:
+                continue
+            for row_key, status in updates:
+                status_buffer.queue_key(row_key, status)
+            status_buffer.flush()
+            self.poster.sheet_cache.invalidate(source_url)
+        
+        self.stats['passes'] += 1
+        self.last_pass = {
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'rows': len(rows),
+            'images': len(by_image),
+            'checked': len(outcomes),
+            'flagged_rows': sum(len(updates) for updates in flagged.values()),
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+        logger.info(f"Media prefetch: {self.last_pass['checked']} of {len(by_image)} upcoming images checked, "
+                    f"{self.last_pass['flagged_rows']} rows flagged in {self.last_pass['seconds']}s")
+        return self.last_pass
+
+    def status(self) -> dict:
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'hours': self.hours,
+            'interval_seconds': self.interval,
+            'images_passed': len(self._checked),
+            'instagram_warnings': dict(list(self.instagram_warnings.items())[:50]),
+            'stats': dict(self.stats),
+            'last_pass': self.last_pass,
+        }
+
+
+class SheetRow:
+    """One row of a SheetTable, indexable by column name like a pandas row"""
+
+    __slots__ = ('table', 'position')
+
+    def __init__(self, table: 'SheetTable', position: int):
+        self.table = table
+        self.position = position
+
+    def __getitem__(self, column: str):
+        return self.table[column][self.position]
+
+    def get(self, column: str, default=None):
+        return self.table[column][self.position] if column in self.table else default
+
+    @property
+    def index(self) -> int:
+        return self.position
+
+
+class SheetTable:
+    """A loaded sheet as plain column lists: the pandas-free counterpart of the DataFrame (SHEET_BACKEND=csv).
+
+    Built from the CSV export with the stdlib csv module, or from gspread's cell values. It
+    offers what the schedule needs from a loaded sheet: columns, len(), a column as a list
+    (table[name]), assigning a column, rows by position and concatenation. Rows are indexed by
+    position, like the reset index of a loaded DataFrame. Cells are read as pd.read_csv(dtype=str)
+    reads them: empty cells and pandas' default NA strings become NaN, duplicate headers are
+    numbered ('Notes', 'Notes.1'), so row keys, ledger keys and filtering match the pandas path.
+    """
+
+    MISSING_CELL = float('nan')
+    # Strings pd.read_csv treats as missing by default
+    NA_VALUES = frozenset(['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                           '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'])
+
+    def __init__(self, columns: dict, length: int):
+        self._columns = columns
+        self.index = range(length)
+
+    @classmethod
+    def from_rows(cls, header: list[str], rows: list[list]) -> 'SheetTable':
+        """Table of rows under header; short rows are padded with missing cells, extra cells dropped"""
+        names = []
+        seen = {}
+        for position, name in enumerate(header):
+            name = name or f"Unnamed: {position}"
+            occurrence = seen.get(name, 0)
+            seen[name] = occurrence + 1
+            names.append(name if occurrence == 0 else f"{name}.{occurrence}")
+        columns = {name: [row[position] if position < len(row) else cls.MISSING_CELL for row in rows]
+                   for position, name in enumerate(names)}
+        return cls(columns, len(rows))
+
+    @classmethod
+    def from_csv(cls, text: str) -> 'SheetTable':
+        """Parse a CSV export, keeping blank lines as rows so positions match the sheet rows"""
+        reader = csv.reader(StringIO(text))
+        header = [name.strip() for name in next(reader, [])]
+        na_values, missing = cls.NA_VALUES, cls.MISSING_CELL
+        return cls.from_rows(header, [[missing if cell in na_values else cell for cell in row] for row in reader])
+
+    @classmethod
+    def concat(cls, tables: list['SheetTable']) -> 'SheetTable':
+        """Rows of every table in order, over the union of their columns (missing cells where a table lacks one)"""
+        names = list(dict.fromkeys(name for table in tables for name in table.columns))
+        columns = {name: [] for name in names}
+        for table in tables:
+            for name in names:
+                columns[name].extend(table[name] if name in table else [cls.MISSING_CELL] * len(table))
+        return cls(columns, sum(len(table) for table in tables))
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self._columns)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, name: str) -> list:
+        return self._columns[name]
+
+    def __setitem__(self, name: str, values):
+        """Set a column from a sequence, or from one value repeated for every row"""
+        self._columns[name] = list(values) if isinstance(values, (list, tuple, range)) else [values] * len(self)
+
+    def row(self, position: int) -> SheetRow:
+        return SheetRow(self, position)
+
+
+class ScheduledPost:
+    """Read-only view of one row of a ScheduleSnapshot, indexable by sheet column like a pandas row"""
+
+    __slots__ = ('snapshot', 'position')
+
+    def __init__(self, snapshot: 'ScheduleSnapshot', position: int):
+        self.snapshot = snapshot
+        self.position = position
+
+    def __getitem__(self, column: str):
+        return self.snapshot.columns[column][self.position]
+
+    def get(self, column: str, default=None):
+        values = self.snapshot.columns.get(column)
+        return default if values is None else values[self.position]
+
+    @property
+    def index(self) -> int:
+        """Index of the row in the loaded DataFrame"""
+        return int(self.snapshot.index[self.position])
+
+    @property
+    def scheduled_datetime(self) -> datetime | None:
+        return self.snapshot.scheduled_datetime(self.position)
+
+
+class ScheduleSnapshot:
+    """Compact, read-only schedule of the pending rows of one loaded sheet (or merged set of sheets).
+
+    Built once per loaded DataFrame and shared by /api/pending-posts, scheduled runs and the
+    in-process scheduler, so a tick no longer filters and copies the DataFrame, re-parses
+    dates or builds a Series per row. Scheduled times are an int64 array of epoch seconds
+    (MISSING where unparseable), Status is an int8 code, and the text columns are object
+    arrays of interned strings so repeated values (hashtags, sources, statuses) are stored once.
+    """
+
+    STATUS_BLANK = 0
+    STATUS_CODES = {'pending': 1, 'scheduled': 2} # Any other Status is not pending and never enters a snapshot
+    MISSING = -2 ** 63 # np.iinfo(np.int64).min, spelled out so defining the class does not import numpy
+
+    def __init__(self, index, columns: dict, scheduled_seconds, status_codes):
+        self.index = np.asarray(index, dtype=np.int64)
+        self.columns = {}
+        for name, values in columns.items():
+            array = np.empty(len(values), dtype=object)
+            array[:] = [sys.intern(value) if type(value) is str else value for value in values]
+            self.columns[name] = array
+        self.scheduled_seconds = np.asarray(scheduled_seconds, dtype=np.int64)
+        self.status_codes = np.asarray(status_codes, dtype=np.int8)
+
+    @classmethod
+    def status_code(cls, status) -> int:
+        if is_blank(status):
+            return cls.STATUS_BLANK
+        return cls.STATUS_CODES.get(str(status).lower(), cls.STATUS_BLANK)
+
+    @staticmethod
+    def to_seconds(moment: datetime) -> int:
+        return int(np.datetime64(moment, 's').astype(np.int64))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def record(self, position: int) -> ScheduledPost:
+        return ScheduledPost(self, int(position))
+
+    def records(self, positions=None) -> list[ScheduledPost]:
+        return [ScheduledPost(self, int(position)) for position in (range(len(self)) if positions is None else positions)]
+
+    def scheduled_datetime(self, position: int) -> datetime | None:
+        seconds = self.scheduled_seconds[position]
+        return None if seconds == self.MISSING else datetime(1970, 1, 1) + timedelta(seconds=int(seconds))
+
+    def due_positions(self, now: datetime, tolerance_minutes: int) -> 'np.ndarray':
+        """Positions scheduled within tolerance_minutes of now (vectorized is_time_to_post)"""
+        valid = self.scheduled_seconds != self.MISSING
+        distance = np.abs(self.scheduled_seconds[valid] - self.to_seconds(now))
+        return np.flatnonzero(valid)[distance <= tolerance_minutes * 60]
+
+    def positions_between(self, start: datetime, end: datetime) -> 'np.ndarray':
+        """Positions scheduled in [start, end]"""
+        return np.flatnonzero((self.scheduled_seconds != self.MISSING) & (self.scheduled_seconds >= self.to_seconds(start))
+                              & (self.scheduled_seconds <= self.to_seconds(end)))
+
+    def upcoming_positions(self, cutoff: datetime) -> 'np.ndarray':
+        """Positions scheduled at or after cutoff"""
+        return np.flatnonzero((self.scheduled_seconds != self.MISSING) & (self.scheduled_seconds >= self.to_seconds(cutoff)))
+
+    def positions_by(self, column: str) -> dict:
+        """Positions grouped by the value of column, in first-seen order"""
+        groups = {}
+        for position, value in enumerate(self.columns[column]):
+            groups.setdefault(value, []).append(position)
+        return groups
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the snapshot: arrays plus the distinct objects they reference"""
+        total = self.index.nbytes + self.scheduled_seconds.nbytes + self.status_codes.nbytes
+        seen = set()
+        for array in self.columns.values():
+            total += array.nbytes
+            for value in array:
+                if id(value) not in seen:
+                    seen.add(id(value))
+                    total += sys.getsizeof(value)
+        return total
+
+
+class PendingPostsView:
+    """Serialized pending posts of one schedule snapshot, as served by /api/pending-posts.
+
+    Built once per snapshot and ledger generation and shared by every dashboard request until
+    the schedule changes. Posts are ordered by scheduled time (unparseable times last, ties in
+    sheet order). The sorted times and a position array per Status are the indexes the date
+    range and status filters go through. A page cursor is the sort key of the next post, so
+    paging keeps its place when the view is rebuilt between pages.
+    """
+
+    UNSCHEDULED = 2 ** 63 - 1 # np.iinfo(np.int64).max: sort key of posts whose date or time could not be parsed
+    STATUS_FILTERS = {'blank': ScheduleSnapshot.STATUS_BLANK, **ScheduleSnapshot.STATUS_CODES}
+
+    def __init__(self, posts: list[dict], scheduled_seconds, status_codes):
+        seconds = np.asarray(scheduled_seconds, dtype=np.int64)
+        seconds = np.where(seconds == ScheduleSnapshot.MISSING, self.UNSCHEDULED, seconds)
+        order = np.lexsort((np.arange(len(posts)), seconds))
+        self.posts = [posts[i] for i in order]
+        self.seconds = seconds[order]
+        self.tiebreak = order # Position before sorting, ascending within equal times
+        self.scheduled_count = int(np.searchsorted(self.seconds, self.UNSCHEDULED, 'left'))
+        codes = np.asarray(status_codes, dtype=np.int8)[order]
+        self.by_status = {code: np.flatnonzero(codes == code) for code in set(self.STATUS_FILTERS.values())}
+        self.etag = hashlib.sha1(json.dumps(self.posts, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:20]
+
+    def __len__(self) -> int:
+        return len(self.posts)
+
+    def select(self, start: datetime = None, end: datetime = None, statuses: list[str] = None) -> 'np.ndarray':
+        """Ordered positions of the posts scheduled in [start, end) whose Status is one of statuses
+        (names from STATUS_FILTERS). Posts without a valid schedule only match when no date bound is given."""
+        low, high = 0, len(self.posts)
+        if start is not None or end is not None:
+            high = self.scheduled_count
+        if start is not None:
+            low = int(np.searchsorted(self.seconds[:high], ScheduleSnapshot.to_seconds(start), 'left'))
+        if end is not None:
+            high = int(np.searchsorted(self.seconds[:high], ScheduleSnapshot.to_seconds(end), 'left'))
+        if statuses is None:
+            return np.arange(low, max(low, high))
+        groups = [self.by_status[self.STATUS_FILTERS[name]] for name in statuses]
+        positions = np.sort(np.concatenate(groups)) if groups else np.empty(0, dtype=np.int64)
+        return positions[np.searchsorted(positions, low):np.searchsorted(positions, high)]
+
+    def page(self, positions: 'np.ndarray', cursor: str = None, limit: int = None) -> tuple[list[dict], str | None]:
+        """(posts, next cursor or None) for up to limit of the selected positions, starting at cursor.
+        Raises ValueError for a malformed cursor."""
+        if cursor:
+            seconds, tiebreak = (int(part) for part in cursor.split(':'))
+            first = int(np.searchsorted(self.seconds, seconds, 'left'))
+            last = int(np.searchsorted(self.seconds, seconds, 'right'))
+            start = first + int(np.searchsorted(self.tiebreak[first:last], tiebreak, 'left'))
+            positions = positions[np.searchsorted(positions, start):]
+        if limit is None or len(positions) <= limit:
+            return [self.posts[position] for position in positions], None
+        following = positions[limit]
+        return [self.posts[position] for position in positions[:limit]], f"{self.seconds[following]}:{self.tiebreak[following]}"
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
 
 class SocialMediaPoster:
+    # Column names - ensure these match your Google Sheet exactly
+    DATE_COL = 'Date'
+    TIME_COL = 'Post Timings'
+    CAPTION_COL = 'Caption'
+    HASHTAGS_COL = 'Hashtags'
+    IMAGEURL_COL = 'Filename.jpg'
+    STATUS_COL = 'Status' # Make sure this column exists
+    ACCOUNTS_COL = 'Accounts' # Optional: comma-separated account names a row posts to
+    
+    # Internal columns added at load time: stable row key and the row's position in the sheet
+    ROW_KEY_COL = '_row_key'
+    SHEET_ROW_COL = '_sheet_row'
+    SOURCE_COL = '_source' # URL of the worksheet the row was loaded from
+    
+    # Status values that mark a row as still waiting to be posted (blank / NaN also count)
+    PENDING_STATUSES = ['pending', 'scheduled', '']
+    
+    # Supported date formats, in the order they are tried
+    DATE_FORMATS = [
+        '%d %B %Y',      # 12 June 2025
+        '%d %b %Y',      # 12 Jun 2025
+        '%Y-%m-%d',      # 2025-06-12
+        '%m/%d/%Y',      # 06/12/2025
+        '%d/%m/%Y',      # 12/06/2025
+        '%m-%d-%Y',      # 06-12-2025
+        '%d-%m-%Y',      # 12-06-2025
+        '%B %d, %Y',     # June 12, 2025
+        '%b %d, %Y',     # Jun 12, 2025
+    ]
+    
+    # Supported time formats (matched against the upper-cased value), in the order they are tried
+    TIME_FORMATS = [
+        '%I:%M %p',      # 1:00 PM
+        '%I:%M%p',       # 1:00PM
+        '%H:%M',         # 13:00
+        '%H:%M:%S',      # 13:00:00
+        '%I:%M:%S %p'    # 1:00:00 PM
+    ]
+    
+    # Number of distinct values sampled per column to detect its format
+    FORMAT_SAMPLE_SIZE = 200
+    
+    # Schedule snapshots kept for recently loaded DataFrames (one per sheet or merged set of sheets)
+    SNAPSHOT_CACHE_SIZE = 8
+    
+    # Headers sent when downloading images
+    DOWNLOAD_HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+
     def __init__(self):
         # Facebook/Instagram API credentials from environment variables
         self.app_id = os.getenv("FB_APP_ID", "YOUR_FB_APP_ID")
@@ -31,108 +2816,552 @@ class SocialMediaPoster:
         self.instagram_id = os.getenv("INSTAGRAM_BUSINESS_ACCOUNT_ID", "YOUR_IG_BUSINESS_ACCOUNT_ID")
         
         # API endpoints
-        self.facebook_api_url = f"https://graph.facebook.com/v18.0/{self.facebook_page_id}/photos"
-        self.instagram_api_url = f"https://graph.facebook.com/v18.0/{self.instagram_id}/media"
-        self.instagram_publish_url = f"https://graph.facebook.com/v18.0/{self.instagram_id}/media_publish"
+        self.graph_api_base = os.getenv("GRAPH_API_BASE_URL", "https://graph.facebook.com/v18.0").rstrip('/')
+        self.facebook_api_url = f"{self.graph_api_base}/{self.facebook_page_id}/photos"
+        self.instagram_api_url = f"{self.graph_api_base}/{self.instagram_id}/media"
+        self.instagram_publish_url = f"{self.graph_api_base}/{self.instagram_id}/media_publish"
+        
+        # Publishing accounts (the env credentials above are the 'default' account), loaded on first use
+        self.accounts = AccountRegistry(self.graph_api_base, {
+            'access_token': self.access_token,
+            'facebook_page_id': self.facebook_page_id,
+            'instagram_account_id': self.instagram_id,
+        })
+        
+        # Optional hidden column holding a unique ID per post; rows without one are keyed by content fingerprint
+        self.row_id_col = os.getenv("ROW_ID_COLUMN", "Post ID")
         
         # Default spreadsheet URL from environment variable
         self.default_spreadsheet_url = os.getenv("SPREADSHEET_URL", "https://docs.google.com/spreadsheets/d/14mo8-qCZNcOeNSsY_GRwHOPyH4LjY5iRneWahK75cZM/edit?pli=1&gid=0#gid=0")
+        
+        # Worksheets that make up the schedule: SPREADSHEET_URLS lists sheet/tab URLs (whitespace or comma
+        # separated; '#gid=*' selects every tab of that spreadsheet). Defaults to SPREADSHEET_URL alone.
+        self.spreadsheet_sources = [url for url in re.split(r'[\s,]+', os.getenv("SPREADSHEET_URLS", "")) if url] \
+            or [self.default_spreadsheet_url]
+        self.sheet_load_workers = max(1, int(os.getenv("SHEET_LOAD_WORKERS", "8")))
+        # How loaded sheets are held: 'pandas' DataFrames, or 'csv' for plain SheetTables that never import pandas
+        self.sheet_backend = os.getenv("SHEET_BACKEND", "pandas").lower()
+        if self.sheet_backend not in ('pandas', 'csv'):
+            logger.warning(f"Unknown SHEET_BACKEND '{self.sheet_backend}', using 'pandas'")
+            self.sheet_backend = 'pandas'
+        self._tab_cache = {} # spreadsheet id -> (expires_at, [worksheet gids])
+        self._merged_schedules = {} # source URLs -> (component DataFrames, merged DataFrame) of the last load
+        self._snapshots = OrderedDict() # id(DataFrame) -> (DataFrame, ScheduleSnapshot)
+        self._snapshot_lock = threading.Lock()
+        self._pending_view = None # (ScheduleSnapshot, ledger generation, PendingPostsView) last served to the dashboard
+        self._pending_view_lock = threading.Lock()
+
+        # gspread client, created on first use (see the gc property) so importing the app stays fast
+        self._gc = None
+        self._gc_initialized = False
+        self._gc_lock = threading.Lock()
+
+        # Publishing pipeline: size of the per-run worker pool and in-flight limits per stage.
+        # These replace the fixed sleeps between platforms and posts; Facebook and Instagram
+        # uploads are limited per account (see Account).
+        self.publish_workers = max(1, int(os.getenv("PUBLISH_WORKERS", "4")))
+        self.fanout_workers = max(1, int(os.getenv("FANOUT_WORKERS", "8"))) # accounts posted in parallel per row
+        self.stage_limits = {
+            'download': threading.BoundedSemaphore(max(1, int(os.getenv("DOWNLOAD_CONCURRENCY", "4")))),
+            'status_update': threading.BoundedSemaphore(max(1, int(os.getenv("SHEETS_CONCURRENCY", "1")))),
+        }
+        
+        # Status write-back batching thresholds (rows per batch, seconds before a forced flush)
+        self.status_batch_size = max(1, int(os.getenv("STATUS_BATCH_SIZE", "50")))
+        self.status_batch_max_delay = float(os.getenv("STATUS_BATCH_MAX_DELAY", "10"))
+        
+        # Shared HTTP client: pooled keep-alive sessions per host with retry on 429/5xx
+        self.http = HttpClient(
+            pool_size=max(1, int(os.getenv("HTTP_POOL_SIZE", "10"))),
+            timeout=float(os.getenv("HTTP_TIMEOUT", "30")),
+            max_retries=max(0, int(os.getenv("HTTP_MAX_RETRIES", "3"))),
+            backoff_factor=float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5")),
+            backoff_jitter=float(os.getenv("HTTP_BACKOFF_JITTER", "0.5"))
+        )
+        
+        # Sheets request budget; Graph API budgets are kept per account and adapted to Meta's usage headers
+        self.rate_limiter = GraphRateLimiter.from_env(('sheets',))
+        
+        # Media handling: 'stream' pipes images from the source into the upload without temp files,
+        # 'tempfile' keeps the previous download-to-disk behaviour
+        self.media_mode = os.getenv("MEDIA_MODE", "stream").lower()
+        self.media_max_bytes = int(os.getenv("MEDIA_MAX_BYTES", str(10 * 1024 * 1024)))
+        self.media_buffer_bytes = int(os.getenv("MEDIA_BUFFER_BYTES", str(4 * 1024 * 1024)))
+        
+        # Instagram containers are polled for readiness instead of waiting a fixed delay before publishing
+        self.ig_poller = InstagramContainerPoller(
+            self.http, self.graph_api_base,
+            initial_interval=float(os.getenv("IG_POLL_INITIAL_SECONDS", "0.5")),
+            max_interval=float(os.getenv("IG_POLL_MAX_SECONDS", "5")),
+            timeout=float(os.getenv("IG_CONTAINER_TIMEOUT", "120"))
+        )
+        
+        # Content-addressed on-disk media cache. Off unless MEDIA_CACHE_DIR or MEDIA_CACHE_MAX_BYTES is set:
+        # on Cloud Run the filesystem is in memory, so cached images count against the instance's RAM
+        media_cache_dir = os.getenv("MEDIA_CACHE_DIR", "")
+        media_cache_bytes = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(128 * 1024 * 1024) if media_cache_dir else "0"))
+        self.media_cache = None
+        if media_cache_bytes > 0:
+            try:
+                self.media_cache = MediaCache(
+                    media_cache_dir or os.path.join(tempfile.gettempdir(), 'social-media-poster-media'),
+                    media_cache_bytes,
+                    revalidate_after=float(os.getenv("MEDIA_CACHE_REVALIDATE_SECONDS", "300"))
+                )
+            except Exception as e:
+                logger.error(f"Error initializing media cache: {e}. Continuing without it.")
+        
+        # Local post ledger (LEDGER_PATH='' disables it): checked before every upload, replicated to the sheet.
+        # Without an explicit LEDGER_PATH it lives in the temp directory, which on Cloud Run is in memory and
+        # lost with the instance; the sheet's Status is then the only durable record of a post, so each
+        # publishing run writes its statuses through to the sheet before it returns instead of leaving
+        # them to the background replication.
+        ledger_path = os.getenv("LEDGER_PATH", os.path.join(tempfile.gettempdir(), 'social-media-poster-ledger.db'))
+        self.ledger_write_through = os.getenv(
+            "LEDGER_WRITE_THROUGH", "false" if os.getenv("LEDGER_PATH") else "true").lower() in ('1', 'true', 'yes')
+        self.ledger = None
+        self.replicator = None
+        self.retry_worker = None
+        self._ledger_synced_snapshots = {} # spreadsheet_url -> ScheduleSnapshot last synced into the ledger
+        if ledger_path:
+            try:
+                self.ledger = PostLedger(
+                    ledger_path,
+                    retry_base=float(os.getenv("RETRY_BASE_SECONDS", "300")),
+                    retry_max_delay=float(os.getenv("RETRY_MAX_DELAY_SECONDS", "21600")),
+                    retry_max_attempts=int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+                )
+                self.replicator = LedgerReplicator(
+                    self, self.ledger,
+                    interval=float(os.getenv("LEDGER_SYNC_SECONDS", "5")),
+                    batch_size=self.status_batch_size,
+                    row_map_ttl=float(os.getenv("STATUS_ROW_MAP_TTL_SECONDS", "30"))
+                )
+                if self.ledger_write_through:
+                    logger.info(f"Post ledger at {ledger_path} writes statuses through to the sheet; set LEDGER_PATH "
+                                "to a durable volume to replicate them in the background instead")
+                # Failed posts resume at their first incomplete stage (RETRY_MAX_ATTEMPTS=1 disables retries)
+                if self.ledger.retry_max_attempts > 1:
+                    self.retry_worker = PostRetryWorker(self, self.ledger, interval=float(os.getenv("RETRY_INTERVAL_SECONDS", "60")))
+            except Exception as e:
+                logger.error(f"Error initializing post ledger at {ledger_path}: {e}. Continuing without it.")
+        
+        # Horizontal sharding: instances sharing SHARD_STORE split the due posts and lease each one before publishing
+        self.shards = None
+        try:
+            self.shards = ShardCoordinator.from_env()
+        except Exception as e:
+            logger.error(f"Error initializing shard coordination: {e}. Continuing without it.")
+        
+        # Look-ahead download and validation of upcoming images; opt-in, as it flags unusable rows in the sheet
+        prefetch_hours = float(os.getenv("MEDIA_PREFETCH_HOURS", "0"))
+        self.prefetcher = MediaPrefetcher(
+            self, hours=prefetch_hours,
+            interval=float(os.getenv("MEDIA_PREFETCH_INTERVAL_SECONDS", "600")),
+            workers=max(1, int(os.getenv("MEDIA_PREFETCH_WORKERS", "4")))
+        ) if prefetch_hours > 0 else None
+        
+        # Parsed spreadsheet cache; after the TTL the sheet is revalidated with one cheap request
+        self.sheet_cache = SpreadsheetCache(ttl=float(os.getenv("SHEET_CACHE_TTL", "60")))
+
+    @property
+    def gc(self):
+        """gspread client (None when it could not be initialized), created on first access"""
+        if not self._gc_initialized:
+            with self._gc_lock:
+                if not self._gc_initialized:
+                    # Assumes Google Cloud service account authentication; for local development
+                    # you might need to set the GOOGLE_APPLICATION_CREDENTIALS environment variable
+                    try:
+                        self._gc = gspread.service_account()
+                        logger.info("Successfully initialized gspread client.")
+                    except Exception as e:
+                        logger.error(f"Error initializing gspread client: {e}. Make sure GOOGLE_APPLICATION_CREDENTIALS is set for service account authentication.")
+                        self._gc = None # Set to None if initialization fails
+                    self._gc_initialized = True
+        return self._gc
+
+    @gc.setter
+    def gc(self, client):
+        with self._gc_lock:
+            self._gc = client
+            self._gc_initialized = True
 
-        # Initialize gspread client (assuming Google Cloud service account authentication)
-        # For local development, you might need to set GOOGLE_APPLICATION_CREDENTIALS environment variable
+    def _get_sheet_revision(self, spreadsheet_id: str) -> str | None:
+        """Fetch the Drive version of a spreadsheet (a single small metadata request)"""
         try:
-            self.gc = gspread.service_account()
-            logger.info("Successfully initialized gspread client.")
+            response = self.gc.request(
+                'get', f"{gspread.urls.DRIVE_FILES_API_V3_URL}/{spreadsheet_id}",
+                params={'fields': 'version,modifiedTime', 'supportsAllDrives': True}
+            )
+            metadata = response.json()
+            return str(metadata.get('version') or metadata.get('modifiedTime') or '') or None
         except Exception as e:
-            logger.error(f"Error initializing gspread client: {e}. Make sure GOOGLE_APPLICATION_CREDENTIALS is set for service account authentication.")
-            self.gc = None # Set to None if initialization fails
+            logger.warning(f"Could not fetch revision for spreadsheet {spreadsheet_id}, falling back to a full reload: {e}")
+            return None
+
+    def table_from_values(self, values: list[list[str]]):
+        """Loaded sheet (DataFrame or SheetTable, per SHEET_BACKEND) from cell values, header row first"""
+        if self.sheet_backend == 'csv':
+            return SheetTable.from_rows(values[0], values[1:])
+        return pd.DataFrame(values[1:], columns=values[0])
+
+    def table_from_csv(self, text: str):
+        """Loaded sheet (DataFrame or SheetTable, per SHEET_BACKEND) from a CSV export"""
+        if self.sheet_backend == 'csv':
+            return SheetTable.from_csv(text)
+        # Keep blank lines and read every cell as text so DataFrame positions and values match the sheet rows
+        df = pd.read_csv(StringIO(text), dtype=str, skip_blank_lines=False)
+        df.columns = df.columns.str.strip()
+        return df
+
+    @staticmethod
+    def sheet_row(df, position: int):
+        """Row at position of a loaded sheet, as a pandas row or a SheetRow"""
+        return df.row(position) if isinstance(df, SheetTable) else df.iloc[position]
+
+    def _assign_row_identity(self, df, spreadsheet_url: str):
+        """Add the source worksheet, stable row key and current sheet row number of every row as internal columns"""
+        fingerprint_cols = self.fingerprint_columns()
+        if isinstance(df, SheetTable):
+            def column(name):
+                return ['' if is_missing(value) else str(value) for value in df[name]] if name in df else [''] * len(df)
+        else:
+            df = df.reset_index(drop=True)
+            
+            def column(name):
+                return df[name].fillna('').astype(str).tolist() if name in df.columns else [''] * len(df)
+        
+        id_values = column(self.row_id_col) if self.row_id_col in df.columns else None
+        df[self.ROW_KEY_COL] = compute_row_keys(id_values, [column(name) for name in fingerprint_cols])
+        df[self.SHEET_ROW_COL] = range(2, len(df) + 2) # Row 1 is the header
+        df[self.SOURCE_COL] = spreadsheet_url
+        return df
+
+    def fingerprint_columns(self) -> list[str]:
+        """Columns whose contents identify a post when it has no ID"""
+        return [self.DATE_COL, self.TIME_COL, self.CAPTION_COL, self.HASHTAGS_COL, self.IMAGEURL_COL]
 
-    def load_google_spreadsheet(self, spreadsheet_url: str):
-        """Load data directly from Google Spreadsheet using CSV export URL or gspread if available"""
+    def load_google_spreadsheet(self, spreadsheet_url: str, revalidate: bool = False):
+        """Load data directly from Google Spreadsheet using CSV export URL or gspread if available.
+
+        Parsed sheets are cached for SHEET_CACHE_TTL seconds; after that (or when revalidate
+        is True) the sheet is only downloaded again if its revision / ETag / content changed.
+        The returned DataFrame is shared with the cache and must not be modified in place.
+        """
+        load_started = None
         try:
+            entry = self.sheet_cache.get(spreadsheet_url)
+            if entry is not None and not revalidate and self.sheet_cache.is_fresh(entry):
+                self.sheet_cache.hit(spreadsheet_url)
+                return entry['df']
+            
+            # Revalidations and reloads are timed; fresh cache hits are not
+            load_started = time.perf_counter()
+            spreadsheet_id, gid = parse_sheet_url(spreadsheet_url)
             if self.gc and 'docs.google.com/spreadsheets/d/' in spreadsheet_url:
                 # Attempt to use gspread for better integration and less reliance on CSV export
-                spreadsheet_id = spreadsheet_url.split('/d/')[1].split('/')[0]
-                worksheet = self.gc.open_by_id(spreadsheet_id).get_worksheet(0) # Assumes first worksheet
+                
+                revision = self._get_sheet_revision(spreadsheet_id)
+                if entry is not None and revision is not None and entry.get('revision') == revision:
+                    self.sheet_cache.mark_unchanged(spreadsheet_url)
+                    logger.info(f"Google Sheet unchanged (revision {revision}), reusing {len(entry['df'])} cached rows.")
+                    return entry['df']
+                
+                self.rate_limiter.acquire('sheets')
+                spreadsheet = self.gc.open_by_key(spreadsheet_id)
+                # The tab named by the URL's gid, else the first worksheet
+                worksheet = spreadsheet.get_worksheet_by_id(int(gid)) if gid is not None else spreadsheet.get_worksheet(0)
                 data = worksheet.get_all_values()
-                df = pd.DataFrame(data[1:], columns=data[0])
+                df = self._assign_row_identity(self.table_from_values(data), spreadsheet_url)
                 logger.info(f"Successfully loaded {len(df)} rows from Google Sheets using gspread.")
-                return df
+                return self.sheet_cache.store(spreadsheet_url, df, revision=revision)
             else:
                 # Fallback to CSV export if gspread not initialized or URL not supported
-                if '/edit' in spreadsheet_url:
+                if gid is not None and 'docs.google.com/spreadsheets/d/' in spreadsheet_url:
+                    csv_url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export?format=csv&gid={gid}"
+                elif '/edit' in spreadsheet_url:
                     csv_url = spreadsheet_url.replace('/edit#gid=0', '/export?format=csv&gid=0')
                     csv_url = csv_url.replace('/edit?pli=1&gid=0#gid=0', '/export?format=csv&gid=0')
                     csv_url = csv_url.replace('/edit', '/export?format=csv')
                 else:
                     csv_url = spreadsheet_url + '/export?format=csv'
                 
+                # Conditional request so an unchanged export can be answered with 304 Not Modified
+                headers = {}
+                if entry is not None:
+                    if entry.get('etag'):
+                        headers['If-None-Match'] = entry['etag']
+                    if entry.get('last_modified'):
+                        headers['If-Modified-Since'] = entry['last_modified']
+                
                 logger.info(f"Fetching data from Google Sheets via CSV export: {csv_url}")
                 
-                response = requests.get(csv_url, timeout=30)
+                response = self.http.get(csv_url, headers=headers, timeout=30)
+                if response.status_code == 304 and entry is not None:
+                    self.sheet_cache.mark_unchanged(spreadsheet_url)
+                    logger.info(f"Google Sheet CSV export not modified, reusing {len(entry['df'])} cached rows.")
+                    return entry['df']
                 response.raise_for_status()
                 
-                df = pd.read_csv(StringIO(response.text))
-                df.columns = df.columns.str.strip()
+                validators = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'content_hash': hashlib.sha256(response.content).hexdigest(),
+                }
+                # The export endpoint does not always honour conditional headers; skip the parse if the body is identical
+                if entry is not None and entry.get('content_hash') == validators['content_hash']:
+                    self.sheet_cache.mark_unchanged(spreadsheet_url, **validators)
+                    logger.info(f"Google Sheet CSV export unchanged, reusing {len(entry['df'])} cached rows.")
+                    return entry['df']
+                
+                df = self._assign_row_identity(self.table_from_csv(response.text), spreadsheet_url)
                 logger.info(f"Successfully loaded {len(df)} rows from Google Sheets via CSV export.")
-                return df
+                return self.sheet_cache.store(spreadsheet_url, df, **validators)
             
         except Exception as e:
             logger.error(f"Error loading Google Spreadsheet from {spreadsheet_url}: {e}")
             return None
+        finally:
+            if load_started is not None:
+                metrics.observe('poster_stage_duration_seconds', time.perf_counter() - load_started, stage='sheet_load')
 
-    def update_google_spreadsheet_status(self, row_index: int, status: str, spreadsheet_url: str = None):
-        """Update the 'Status' column in the Google Spreadsheet for a given row index."""
+    def expand_sources(self, sources: list[str]) -> list[str]:
+        """Resolve '#gid=*' entries to one URL per tab of that spreadsheet (tab lists are cached for SHEET_CACHE_TTL)"""
+        expanded = []
+        for source in sources:
+            spreadsheet_id, gid = parse_sheet_url(source)
+            if gid != '*':
+                expanded.append(source)
+                continue
+            if not self.gc:
+                logger.warning(f"gspread client not initialized. Cannot list the tabs of {spreadsheet_id}; using its first worksheet.")
+                expanded.append(f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/edit")
+                continue
+            expires_at, gids = self._tab_cache.get(spreadsheet_id, (0.0, None))
+            if gids is None or time.monotonic() >= expires_at:
+                try:
+                    self.rate_limiter.acquire('sheets')
+                    gids = [worksheet.id for worksheet in self.gc.open_by_key(spreadsheet_id).worksheets()]
+                    self._tab_cache[spreadsheet_id] = (time.monotonic() + self.sheet_cache.ttl, gids)
+                except Exception as e:
+                    logger.error(f"Error listing the tabs of spreadsheet {spreadsheet_id}: {e}")
+                    gids = gids or []
+            expanded.extend(f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/edit#gid={tab_gid}" for tab_gid in gids)
+        return list(dict.fromkeys(expanded))
+
+    def load_schedule(self, sources: list[str] = None, revalidate: bool = False):
+        """Load every source worksheet concurrently and merge them into one schedule DataFrame.
+
+        Sources default to SPREADSHEET_URLS. Each row keeps the worksheet it came from in
+        SOURCE_COL, alongside its row key and sheet row, so the merged index is only a position
+        in the schedule. Worksheets are fetched in parallel, so a load takes about as long as the
+        slowest one. Worksheets that fail to load or lack the post columns are left out; None
+        is returned when nothing could be loaded. An unchanged set of worksheets returns the
+        same DataFrame object as the previous load.
+        """
+        sources = self.expand_sources(sources or self.spreadsheet_sources)
+        if len(sources) == 1:
+            return self.load_google_spreadsheet(sources[0], revalidate=revalidate)
+        
+        workers = min(len(sources), self.sheet_load_workers)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sheet-load') as executor:
+            frames = list(executor.map(lambda url: self.load_google_spreadsheet(url, revalidate=revalidate), sources))
+        
+        required_cols = self.fingerprint_columns() + [self.STATUS_COL]
+        loaded = []
+        for url, df in zip(sources, frames):
+            if df is None:
+                continue
+            missing = [col for col in required_cols if col not in df.columns]
+            if missing:
+                logger.error(f"Worksheet {url} is missing columns {missing}. Leaving it out of the schedule.")
+                continue
+            loaded.append(df)
+        if not loaded:
+            return None
+        
+        cache_key = tuple(sources)
+        previous_frames, merged = self._merged_schedules.get(cache_key, (None, None))
+        if previous_frames is not None and len(previous_frames) == len(loaded) and all(
+                previous is current for previous, current in zip(previous_frames, loaded)):
+            return merged
+        
+        if isinstance(loaded[0], SheetTable):
+            merged = SheetTable.concat(loaded)
+        else:
+            merged = pd.concat(loaded, ignore_index=True, sort=False)
+        self._merged_schedules[cache_key] = (loaded, merged)
+        logger.info(f"Merged {len(merged)} rows from {len(loaded)} worksheets")
+        return merged
+
+    def create_status_buffer(self, spreadsheet_url: str = None, row_map_ttl: float = 0.0) -> StatusWriteBuffer | None:
+        """Create a status write buffer that batches Status updates for one run (or, with a
+        row_map_ttl, for the ledger replicator's lifetime)"""
         if not self.gc:
             logger.warning("gspread client not initialized. Cannot update Google Spreadsheet status.")
-            return
+            return None
 
         if not spreadsheet_url:
             spreadsheet_url = self.default_spreadsheet_url
 
-        try:
-            spreadsheet_id = spreadsheet_url.split('/d/')[1].split('/')[0]
-            worksheet = self.gc.open_by_id(spreadsheet_id).get_worksheet(0) # Assumes first worksheet
-            
-            # Find the 'Status' column index (assuming header row)
-            headers = worksheet.row_values(1)
-            try:
-                status_col_index = headers.index('Status') + 1 # gspread is 1-indexed
-            except ValueError:
-                logger.error("'Status' column not found in spreadsheet. Cannot update status.")
-                return
+        spreadsheet_id, gid = parse_sheet_url(spreadsheet_url)
+        if spreadsheet_id == spreadsheet_url:
+            logger.error(f"Could not extract spreadsheet ID from {spreadsheet_url}. Cannot update status.")
+            return None
+
+        return StatusWriteBuffer(self.gc, spreadsheet_id, status_col=self.STATUS_COL,
+                                 max_pending=self.status_batch_size, max_delay=self.status_batch_max_delay,
+                                 id_col=self.row_id_col, fingerprint_cols=self.fingerprint_columns(),
+                                 rate_limiter=self.rate_limiter, worksheet_id=int(gid) if gid is not None else None,
+                                 row_map_ttl=row_map_ttl)
+
+    def update_google_spreadsheet_status(self, row_index: int, status: str, spreadsheet_url: str = None):
+        """Update the 'Status' column in the Google Spreadsheet for a given row index."""
+        status_buffer = self.create_status_buffer(spreadsheet_url)
+        if status_buffer is None:
+            return
+        
+        status_buffer.queue(row_index, status)
+        status_buffer.flush()
+        self.sheet_cache.invalidate(spreadsheet_url or self.default_spreadsheet_url)
+
 
-            # Update the cell. row_index from pandas is 0-indexed, so add 2 (1 for header, 1 for 0-indexing)
-            # This assumes your sheet index directly corresponds to the pandas DataFrame index + 2 (for header + 0-indexing)
-            # You might need to adjust this logic if your sheet has filters or hidden rows.
-            worksheet.update_cell(row_index + 2, status_col_index, status)
-            logger.info(f"Spreadsheet row {row_index + 1} updated to status: '{status}'")
+    def normalize_image_url(self, image_url: str) -> str:
+        """Rewrite Google Drive share links to their direct download URL"""
+        # Handle Google Drive URLs
+        if 'drive.google.com' in image_url:
+            if '/file/d/' in image_url:
+                file_id = image_url.split('/file/d/')[1].split('/')[0]
+                image_url = f"https://drive.google.com/uc?export=download&id={file_id}"
+                logger.info(f"Converted Google Drive URL to export URL: {image_url}")
+            elif 'id=' in image_url:
+                file_id = image_url.split('id=')[1].split('&')[0]
+                image_url = f"https://drive.google.com/uc?export=download&id={file_id}"
+                logger.info(f"Converted Google Drive URL (id format) to export URL: {image_url}")
+        return image_url
+
+    def media_cache_key(self, image_url: str) -> str:
+        """Cache key for an image URL: Drive links rewritten, host lower-cased, query sorted, fragment dropped"""
+        parts = urlsplit(self.normalize_image_url(image_url.strip()))
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
+
+    def _open_image_response(self, response):
+        """Validate an image response and return (chunks, head, content_type, declared_size)"""
+        content_length = response.headers.get('Content-Length')
+        declared_size = int(content_length) if content_length and content_length.isdigit() else None
+        if declared_size is not None and declared_size > self.media_max_bytes:
+            raise ValueError(f"image is {declared_size} bytes, over the {self.media_max_bytes} byte limit")
+        
+        chunks = response.iter_content(chunk_size=MediaPayload.CHUNK_SIZE)
+        head = next(chunks, b'')
+        content_type = validate_image_content_type(response.headers.get('Content-Type', ''), head)
+        return chunks, head, content_type, declared_size
+
+    def fetch_media(self, image_url: str) -> MediaPayload | None:
+        """Open the image at image_url for upload.
+
+        With the media cache enabled the image is served from (or downloaded once into) the
+        cache. Otherwise small images (or ones without a Content-Length) are read into a
+        bounded in-memory buffer and larger ones stay on the open response and are streamed
+        into the upload. Non-image responses (e.g. Drive's HTML page for private files) and
+        images over MEDIA_MAX_BYTES are rejected before any upload starts.
+        """
+        try:
+            logger.info(f"Attempting to fetch image from: {image_url}")
+            return self.open_media(image_url)
+        except requests.exceptions.RequestException as req_err:
+            logger.error(f"Network or request error fetching image from {image_url}: {req_err}")
         except Exception as e:
-            logger.error(f"Error updating Google Spreadsheet status for row {row_index + 1}: {e}")
+            logger.error(f"Error fetching image from {image_url}: {e}")
+        return None
+
+    def open_media(self, image_url: str) -> MediaPayload:
+        """fetch_media without the error handling: raises requests exceptions for failed requests
+        and ValueError for responses that are not an acceptable image"""
+        image_url = self.normalize_image_url(image_url)
+        if self.media_cache is not None:
+            return self._fetch_media_cached(image_url)
+        
+        response = self.http.get(image_url, headers=self.DOWNLOAD_HEADERS, stream=True, timeout=30)
+        try:
+            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+            
+            chunks, head, content_type, declared_size = self._open_image_response(response)
+            
+            # Stream only when the exact size is known up front (needed for the multipart Content-Length)
+            if (declared_size is not None and declared_size > self.media_buffer_bytes
+                    and not response.headers.get('Content-Encoding')):
+                logger.info(f"Streaming image from {image_url} ({declared_size} bytes, {content_type})")
+                metrics.inc('poster_downloaded_bytes_total', declared_size)
+                return MediaPayload(image_url, content_type, response=response, chunks=chunks, head=head, size=declared_size)
+            
+            buffer = bytearray(head)
+            for chunk in chunks:
+                buffer.extend(chunk)
+                if len(buffer) > self.media_max_bytes:
+                    raise ValueError(f"image exceeds the {self.media_max_bytes} byte limit")
+        except Exception:
+            response.close()
+            raise
+        response.close()
+        metrics.inc('poster_downloaded_bytes_total', len(buffer))
+        logger.info(f"Image buffered in memory from {image_url} ({len(buffer)} bytes, {content_type})")
+        return MediaPayload(image_url, content_type, data=bytes(buffer))
 
+    def _fetch_media_cached(self, image_url: str) -> MediaPayload | None:
+        """Serve image_url from the media cache, revalidating or downloading it under a per-URL lock"""
+        key = self.media_cache_key(image_url)
+        with self.media_cache.lock_for(key):
+            entry = self.media_cache.lookup(key)
+            if entry is not None and self.media_cache.is_fresh(entry):
+                media = self.media_cache.open(key, entry)
+                if media is not None:
+                    logger.info(f"Image served from media cache: {image_url} ({media.size} bytes)")
+                    return media
+                entry = None
+            
+            headers = dict(self.DOWNLOAD_HEADERS)
+            if entry is not None:
+                if entry.get('etag'):
+                    headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    headers['If-Modified-Since'] = entry['last_modified']
+            
+            response = self.http.get(image_url, headers=headers, stream=True, timeout=30)
+            try:
+                if response.status_code == 304 and entry is not None:
+                    media = self.media_cache.open(key, entry, revalidated=True)
+                    if media is not None:
+                        logger.info(f"Cached image still current: {image_url} ({media.size} bytes)")
+                        return media
+                    # Blob vanished after the lookup: fetch it again without validators
+                    response.close()
+                    response = self.http.get(image_url, headers=self.DOWNLOAD_HEADERS, stream=True, timeout=30)
+                response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+                
+                chunks, head, content_type, _ = self._open_image_response(response)
+                media = self.media_cache.store(
+                    key, image_url, itertools.chain([head], chunks), content_type,
+                    etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'),
+                    max_size=self.media_max_bytes
+                )
+                metrics.inc('poster_downloaded_bytes_total', media.size)
+                logger.info(f"Image downloaded into media cache from {image_url} ({media.size} bytes, {content_type})")
+                return media
+            finally:
+                response.close()
 
     def download_image_from_url(self, image_url: str) -> str | None:
         """Download image from URL and return temporary file path"""
         try:
             logger.info(f"Attempting to download image from: {image_url}")
             
-            # Handle Google Drive URLs
-            if 'drive.google.com' in image_url:
-                if '/file/d/' in image_url:
-                    file_id = image_url.split('/file/d/')[1].split('/')[0]
-                    image_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-                    logger.info(f"Converted Google Drive URL to export URL: {image_url}")
-                elif 'id=' in image_url:
-                    file_id = image_url.split('id=')[1].split('&')[0]
-                    image_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-                    logger.info(f"Converted Google Drive URL (id format) to export URL: {image_url}")
+            image_url = self.normalize_image_url(image_url)
             
             # Download the image
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(image_url, headers=headers, stream=True, timeout=30)
+            response = self.http.get(image_url, headers=self.DOWNLOAD_HEADERS, stream=True, timeout=30)
             response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
             
             # Create temporary file
@@ -146,6 +3375,7 @@ class SocialMediaPoster:
             
             # Verify file size
             file_size = os.path.getsize(temp_file.name)
+            metrics.inc('poster_downloaded_bytes_total', file_size)
             logger.info(f"Image downloaded successfully to {temp_file.name} ({file_size} bytes)")
             
             return temp_file.name
@@ -166,56 +3396,36 @@ class SocialMediaPoster:
         except Exception as e:
             logger.warning(f"Could not delete temp file {file_path}: {e}")
 
+    def parse_date(self, date_str: str) -> datetime | None:
+        """Parse a Date cell with the first of DATE_FORMATS that matches"""
+        for fmt in self.DATE_FORMATS:
+            try:
+                return datetime.strptime(str(date_str).strip(), fmt)
+            except ValueError:
+                continue
+        logger.error(f"Could not parse date: '{date_str}'")
+        return None
+
+    def parse_time(self, time_str: str):
+        """Parse a Post Timings cell (case-insensitive) with the first of TIME_FORMATS that matches"""
+        time_str_upper = str(time_str).strip().upper() # Convert once
+        for fmt in self.TIME_FORMATS:
+            try:
+                return datetime.strptime(time_str_upper, fmt).time()
+            except ValueError:
+                continue
+        logger.error(f"Could not parse time: '{time_str}'")
+        return None
+
     def parse_datetime(self, date_str: str, time_str: str) -> datetime | None:
         """Parse date and time strings into datetime object"""
         try:
-            # Handle various date formats
-            date_formats = [
-                '%d %B %Y',      # 12 June 2025
-                '%d %b %Y',      # 12 Jun 2025
-                '%Y-%m-%d',      # 2025-06-12
-                '%m/%d/%Y',      # 06/12/2025
-                '%d/%m/%Y',      # 12/06/2025
-                '%m-%d-%Y',      # 06-12-2025
-                '%d-%m-%Y',      # 12-06-2025
-                '%B %d, %Y',     # June 12, 2025
-                '%b %d, %Y',     # Jun 12, 2025
-            ]
-            
-            parsed_date = None
-            for fmt in date_formats:
-                try:
-                    parsed_date = datetime.strptime(str(date_str).strip(), fmt)
-                    break
-                except ValueError:
-                    continue
-            
+            parsed_date = self.parse_date(date_str)
             if parsed_date is None:
-                logger.error(f"Could not parse date: '{date_str}'")
                 return None
             
-            # Handle various time formats
-            time_formats = [
-                '%I:%M %p',      # 1:00 PM
-                '%I:%M%p',       # 1:00PM
-                '%H:%M',         # 13:00
-                '%H:%M:%S',      # 13:00:00
-                '%I:%M:%S %p'    # 1:00:00 PM
-            ]
-            
-            parsed_time = None
-            time_str_upper = str(time_str).strip().upper() # Convert once
-            
-            for fmt in time_formats:
-                try:
-                    time_obj = datetime.strptime(time_str_upper, fmt).time()
-                    parsed_time = time_obj
-                    break
-                except ValueError:
-                    continue
-            
+            parsed_time = self.parse_time(time_str)
             if parsed_time is None:
-                logger.error(f"Could not parse time: '{time_str}'")
                 return None
             
             # Combine date and time
@@ -226,6 +3436,66 @@ class SocialMediaPoster:
             logger.error(f"Unhandled error parsing datetime - Date: '{date_str}', Time: '{time_str}', Error: {e}")
             return None
 
+    def _detect_format_cutoff(self, values, formats: list[str]) -> int:
+        """Return how many of formats (in order) are needed to parse a sample of the column"""
+        cutoff = 0
+        for value in values.drop_duplicates().head(self.FORMAT_SAMPLE_SIZE):
+            for position, fmt in enumerate(formats):
+                try:
+                    datetime.strptime(value, fmt)
+                    cutoff = max(cutoff, position + 1)
+                    break
+                except ValueError:
+                    continue
+        return cutoff
+
+    def _parse_column(self, values, formats: list[str]):
+        """Parse a column of strings in bulk with the formats detected from a sample.
+
+        Formats are applied in parse_datetime's order, each as one vectorized pass over the
+        rows that are still unresolved, so a value gets the same result as it would from the
+        row-by-row parser. Formats that never appear in the sample are skipped; rows that
+        need them stay NaT and are left to the per-row fallback.
+        """
+        parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+        cutoff = self._detect_format_cutoff(values, formats)
+        unresolved = values
+        for fmt in formats[:cutoff]:
+            if unresolved.empty:
+                break
+            attempt = pd.to_datetime(unresolved, format=fmt, errors='coerce')
+            matched = attempt.notna()
+            parsed[attempt.index[matched]] = attempt[matched]
+            unresolved = unresolved[~matched]
+        return parsed
+
+    def resolve_schedule(self, posts):
+        """Parse the Date and Post Timings columns of posts in bulk into a datetime64 Series.
+
+        Rows with missing Date or Post Timings are expected to be filtered out by the caller.
+        Values the bulk pass cannot handle fall back to parse_datetime; rows that still can't
+        be parsed are NaT.
+        """
+        dates = posts[self.DATE_COL].astype(str).str.strip()
+        times = posts[self.TIME_COL].astype(str).str.strip().str.upper()
+        
+        parsed_dates = self._parse_column(dates, self.DATE_FORMATS)
+        parsed_times = self._parse_column(times, self.TIME_FORMATS)
+        scheduled = parsed_dates.dt.normalize() + (parsed_times - parsed_times.dt.normalize())
+        
+        # Row-by-row fallback for the outliers only
+        for index in scheduled.index[scheduled.isna()]:
+            fallback = self.parse_datetime(str(posts.at[index, self.DATE_COL]), str(posts.at[index, self.TIME_COL]))
+            if fallback is not None:
+                scheduled[index] = fallback
+        
+        return scheduled
+
+    def due_mask(self, scheduled, tolerance_minutes: int = 10, now: datetime = None):
+        """Vectorized is_time_to_post: True where the scheduled time is within tolerance of now"""
+        current_time = now or datetime.now()
+        return ((scheduled - pd.Timestamp(current_time)).abs() <= pd.Timedelta(minutes=tolerance_minutes)).fillna(False)
+
     def is_time_to_post(self, scheduled_datetime: datetime, tolerance_minutes: int = 10) -> bool:
         """Check if it's time to post based on scheduled datetime"""
         if scheduled_datetime is None:
@@ -241,20 +3511,42 @@ class SocialMediaPoster:
         
         return is_ready
 
-    def upload_image_to_facebook(self, image_path: str, caption: str, hashtags: str) -> tuple[bool, str]:
+    def _graph_post(self, account: Account, endpoint: str, url: str, **kwargs) -> requests.Response:
+        """POST to the Graph API within the account's endpoint budget, feeding the response back to its limiter"""
+        account.rate_limiter.acquire(endpoint)
+        response = self.http.post(url, **kwargs)
+        account.rate_limiter.observe(endpoint, response)
+        return response
+
+    @staticmethod
+    def _graph_error_type(response) -> str:
+        """Failure metric label for a non-200 Graph API response"""
+        if response.status_code == 429 or GraphRateLimiter.error_code(response) in GraphRateLimiter.THROTTLE_ERROR_CODES:
+            return 'throttled'
+        return 'api_error'
+
+    @staticmethod
+    def _exception_type(error: Exception) -> str:
+        """Failure metric label for an exception raised during an upload"""
+        return 'rate_limited' if isinstance(error, RateLimitExceeded) else 'error'
+
+    def upload_image_to_facebook(self, image_path: str, caption: str, hashtags: str, account: Account = None) -> tuple[bool, str]:
         """Upload image to Facebook page"""
+        account = account or self.accounts.get('default')
         try:
             full_message = f"{caption}\n\n{hashtags}"
             
             files = {'source': open(image_path, 'rb')}
             data = {
                 'message': full_message,
-                'access_token': self.access_token
+                'access_token': account.access_token
             }
             
             logger.info(f"Attempting to upload image to Facebook from {image_path}...")
-            response = requests.post(self.facebook_api_url, files=files, data=data, timeout=60)
-            files['source'].close()
+            try:
+                response = self._graph_post(account, 'facebook_photos', account.facebook_api_url, files=files, data=data, timeout=60)
+            finally:
+                files['source'].close()
             
             if response.status_code == 200:
                 result = response.json()
@@ -264,133 +3556,682 @@ class SocialMediaPoster:
             else:
                 error_msg = response.json().get('error', {}).get('message', 'Unknown Facebook error')
                 logger.error(f"Facebook post failed: {error_msg}. Response: {response.text}")
+                metrics.inc('poster_failures_total', platform='facebook', error_type=self._graph_error_type(response))
                 return False, error_msg
                 
         except requests.exceptions.RequestException as req_err:
             logger.error(f"Network or request error during Facebook upload: {req_err}")
+            metrics.inc('poster_failures_total', platform='facebook', error_type='network')
             return False, str(req_err)
         except Exception as e:
             logger.error(f"Facebook upload error: {e}")
+            metrics.inc('poster_failures_total', platform='facebook', error_type=self._exception_type(e))
             return False, str(e)
 
-    def upload_image_to_instagram(self, image_url: str, caption: str, hashtags: str) -> tuple[bool, str]:
-        """Upload image to Instagram using image_url parameter (2-step process)"""
+    def upload_media_to_facebook(self, media: MediaPayload, caption: str, hashtags: str, account: Account = None) -> tuple[bool, str]:
+        """Upload an in-memory or streamed image to the Facebook page"""
+        account = account or self.accounts.get('default')
         try:
-            full_caption = f"{caption}\n\n{hashtags}"
-            
-            data = {
-                'image_url': image_url,
-                'caption': full_caption,
-                'access_token': self.access_token
-            }
-            
-            logger.info(f"Attempting Instagram media creation for image URL: {image_url}...")
-            response = requests.post(self.instagram_api_url, data=data, timeout=60)
-            
-            if response.status_code != 200:
-                error_msg = response.json().get('error', {}).get('message', 'Unknown Instagram creation error')
-                logger.error(f"Instagram media creation failed: {error_msg}. Response: {response.text}")
-                return False, error_msg
+            full_message = f"{caption}\n\n{hashtags}"
             
-            container_id = response.json().get('id')
-            if not container_id:
-                logger.error(f"Instagram media creation did not return a container ID. Response: {response.text}")
-                return False, "No container ID returned for Instagram media creation."
-
-            logger.info(f"Instagram media container created: {container_id}. Waiting before publishing...")
-            time.sleep(2) # Wait for container to be ready
-
-            publish_data = {
-                'creation_id': container_id,
-                'access_token': self.access_token
-            }
+            body = MultipartStream({'message': full_message, 'access_token': account.access_token}, 'source', 'image.jpg', media)
             
-            logger.info(f"Attempting Instagram publish for container ID: {container_id}...")
-            publish_response = requests.post(self.instagram_publish_url, data=publish_data, timeout=60)
+            logger.info(f"Attempting to upload image to Facebook from {media.source_url} ({media.report()['mode']}, {media.size} bytes)...")
+            # A streamed body cannot be replayed, so it is sent without transport-level retries
+            response = self._graph_post(account, 'facebook_photos', account.facebook_api_url, data=body,
+                                        headers={'Content-Type': body.content_type}, timeout=60, retry=not media.streamed)
             
-            if publish_response.status_code == 200:
-                result = publish_response.json()
+            if response.status_code == 200:
+                result = response.json()
                 post_id = result.get('id', 'Unknown')
-                logger.info(f"Instagram post successful! Post ID: {post_id}")
+                logger.info(f"Facebook post successful! Post ID: {post_id}")
                 return True, post_id
             else:
-                error_msg = publish_response.json().get('error', {}).get('message', 'Unknown Instagram publish error')
-                logger.error(f"Instagram publish failed: {error_msg}. Response: {publish_response.text}")
+                error_msg = response.json().get('error', {}).get('message', 'Unknown Facebook error')
+                logger.error(f"Facebook post failed: {error_msg}. Response: {response.text}")
+                metrics.inc('poster_failures_total', platform='facebook', error_type=self._graph_error_type(response))
                 return False, error_msg
                 
+        except requests.exceptions.RequestException as req_err:
+            logger.error(f"Network or request error during Facebook upload: {req_err}")
+            metrics.inc('poster_failures_total', platform='facebook', error_type='network')
+            return False, str(req_err)
+        except Exception as e:
+            logger.error(f"Facebook upload error: {e}")
+            metrics.inc('poster_failures_total', platform='facebook', error_type=self._exception_type(e))
+            return False, str(e)
+
+    def upload_image_to_instagram(self, image_url: str, caption: str, hashtags: str, account: Account = None,
+                                  container_id: str = None, on_container=None) -> tuple[bool, str]:
+        """Upload image to Instagram using image_url parameter (2-step process).
+        container_id resumes an earlier attempt: while that container is usable it is published
+        instead of creating a new one. on_container(container_id) is called once a new container exists."""
+        account = account or self.accounts.get('default')
+        try:
+            if container_id:
+                logger.info(f"Resuming Instagram container {container_id}...")
+                with timed_stage('instagram_container_wait'):
+                    ready, detail = self.ig_poller.wait_until_ready(container_id, account.access_token)
+                if ready and detail == 'PUBLISHED':
+                    # The earlier publish went through but its response was lost
+                    logger.info(f"Instagram container {container_id} was already published")
+                    return True, container_id
+                if ready:
+                    return self._publish_instagram_container(account, container_id)
+                logger.warning(f"Instagram container {container_id} is not usable ({detail}); creating a new one")
+            
+            # Take the publish from the daily quota before creating a container that could not be published today
+            quota = self._reserve_publishing_quota(account)
+            success = False
+            try:
+                success, result = self._create_and_publish_instagram(account, image_url, caption, hashtags, on_container,
+                                                                     reserved=quota is not None)
+                return success, result
+            finally:
+                if quota is not None and not success:
+                    quota.release()
+                
         except requests.exceptions.RequestException as req_err:
             logger.error(f"Network or request error during Instagram upload: {req_err}")
+            metrics.inc('poster_failures_total', platform='instagram', error_type='network')
             return False, str(req_err)
         except Exception as e:
             logger.error(f"Instagram upload error: {e}")
+            metrics.inc('poster_failures_total', platform='instagram', error_type=self._exception_type(e))
             return False, str(e)
 
+    def _create_and_publish_instagram(self, account: Account, image_url: str, caption: str, hashtags: str,
+                                      on_container=None, reserved: bool = False) -> tuple[bool, str]:
+        """Create a media container for image_url, wait for it and publish it"""
+        full_caption = f"{caption}\n\n{hashtags}"
+        
+        data = {
+            'image_url': image_url,
+            'caption': full_caption,
+            'access_token': account.access_token
+        }
+        
+        logger.info(f"Attempting Instagram media creation for image URL: {image_url}...")
+        response = self._graph_post(account, 'instagram_media', account.instagram_api_url, data=data, timeout=60)
+        
+        if response.status_code != 200:
+            error_msg = response.json().get('error', {}).get('message', 'Unknown Instagram creation error')
+            logger.error(f"Instagram media creation failed: {error_msg}. Response: {response.text}")
+            metrics.inc('poster_failures_total', platform='instagram', error_type=self._graph_error_type(response))
+            return False, error_msg
+        
+        container_id = response.json().get('id')
+        if not container_id:
+            logger.error(f"Instagram media creation did not return a container ID. Response: {response.text}")
+            metrics.inc('poster_failures_total', platform='instagram', error_type='api_error')
+            return False, "No container ID returned for Instagram media creation."
+        if on_container is not None:
+            on_container(container_id)
+
+        logger.info(f"Instagram media container created: {container_id}. Waiting for it to finish processing...")
+        with timed_stage('instagram_container_wait'):
+            ready, detail = self.ig_poller.wait_until_ready(container_id, account.access_token)
+        if not ready:
+            logger.error(f"Instagram container not publishable: {detail}")
+            metrics.inc('poster_failures_total', platform='instagram', error_type='container')
+            return False, detail
+        return self._publish_instagram_container(account, container_id, reserved=reserved)
+
+    def _reserve_publishing_quota(self, account: Account) -> PublishingQuota | None:
+        """Take one publish from the account's Instagram publishing quota, raising RateLimitExceeded
+        when it is used up (None when the account has no quota). The count is refreshed from Meta's
+        content_publishing_limit endpoint every few minutes; release() gives an unused publish back."""
+        quota = account.rate_limiter.buckets.get('instagram_publish')
+        if not isinstance(quota, PublishingQuota):
+            return None
+        if quota.needs_sync():
+            with quota.sync_lock:
+                if quota.needs_sync():
+                    try:
+                        response = self.http.get(f"{self.graph_api_base}/{account.instagram_id}/content_publishing_limit",
+                                                 params={'fields': 'config,quota_usage', 'access_token': account.access_token},
+                                                 timeout=10)
+                        response.raise_for_status()
+                        usage = (response.json().get('data') or [{}])[0]
+                        config = usage.get('config') or {}
+                        quota.sync(int(usage.get('quota_usage', 0)), config.get('quota_total'), config.get('quota_duration'))
+                    except (requests.exceptions.RequestException, ValueError, TypeError, AttributeError) as e:
+                        logger.warning(f"Could not read {account.name}'s Instagram publishing quota, using the local count: {e}")
+                        quota.sync()
+        if not quota.acquire(account.rate_limiter.max_wait):
+            raise RateLimitExceeded(f"Instagram publishing quota of {quota.limit:.0f} posts per "
+                                    f"{quota.period / 3600:.0f}h used up for {account.name}; try again later")
+        return quota
+
+    def _publish_instagram_container(self, account: Account, container_id: str, reserved: bool = False) -> tuple[bool, str]:
+        """Publish a FINISHED media container (step 2 of an Instagram upload).
+        reserved: the publish was already taken from the quota (see _reserve_publishing_quota)."""
+        events.publish('instagram_container_ready', account=account.name, container_id=container_id)
+
+        publish_data = {
+            'creation_id': container_id,
+            'access_token': account.access_token
+        }
+        
+        logger.info(f"Attempting Instagram publish for container ID: {container_id}...")
+        if reserved:
+            publish_response = self.http.post(account.instagram_publish_url, data=publish_data, timeout=60)
+            account.rate_limiter.observe('instagram_publish', publish_response)
+        else:
+            publish_response = self._graph_post(account, 'instagram_publish', account.instagram_publish_url, data=publish_data, timeout=60)
+        
+        if publish_response.status_code == 200:
+            result = publish_response.json()
+            post_id = result.get('id', 'Unknown')
+            logger.info(f"Instagram post successful! Post ID: {post_id}")
+            return True, post_id
+        else:
+            error_msg = publish_response.json().get('error', {}).get('message', 'Unknown Instagram publish error')
+            logger.error(f"Instagram publish failed: {error_msg}. Response: {publish_response.text}")
+            metrics.inc('poster_failures_total', platform='instagram', error_type=self._graph_error_type(publish_response))
+            return False, error_msg
+
+    def _select_pending(self, df):
+        """Return the rows whose Status marks them as still to be posted"""
+        # Handle NaN values for 'Status' explicitly
+        status = df[self.STATUS_COL]
+        return df[
+            (status.astype(str).str.lower().isin(self.PENDING_STATUSES)) |
+            (status.isna()) |
+            (status.astype(str).str.strip() == '')
+        ]
+
+    def _drop_unscheduled(self, pending_posts, message: str):
+        """Drop rows with a missing Date or Post Timings, logging each one"""
+        missing = pending_posts[self.DATE_COL].isna() | pending_posts[self.TIME_COL].isna()
+        for index in pending_posts.index[missing]:
+            logger.warning(message.format(row=index + 1))
+        return pending_posts[~missing]
+
+    def snapshot_columns(self, available) -> list[str]:
+        """Columns of a loaded sheet that are kept in its ScheduleSnapshot"""
+        return [col for col in self.fingerprint_columns() + [
+            self.STATUS_COL, self.ACCOUNTS_COL, self.row_id_col, self.ROW_KEY_COL, self.SHEET_ROW_COL, self.SOURCE_COL
+        ] if col in available]
+
+    def _table_snapshot(self, table: SheetTable) -> ScheduleSnapshot:
+        """schedule_snapshot for a SheetTable: the pandas path's filtering, in plain Python.
+        Rows are pending when their Status is blank, 'pending' or 'scheduled'; pending rows with a
+        missing Date or Post Timings are skipped. Each distinct Date and Post Timings value is parsed
+        once, with parse_datetime's formats and order."""
+        statuses, dates, times = table[self.STATUS_COL], table[self.DATE_COL], table[self.TIME_COL]
+        positions = []
+        for position, status in enumerate(statuses):
+            if not (is_blank(status) or str(status).lower() in self.PENDING_STATUSES):
+                continue
+            if is_missing(dates[position]) or is_missing(times[position]):
+                logger.warning(f"Row {position + 1} has missing Date or Post Timings. Skipping.")
+                continue
+            positions.append(position)
+        
+        # Epoch seconds of each distinct date and time of day; a sheet reuses the same few of each
+        day_seconds, time_seconds = {}, {}
+        seconds = []
+        for position in positions:
+            date_str, time_str = str(dates[position]), str(times[position])
+            if date_str not in day_seconds:
+                parsed_date = self.parse_date(date_str)
+                day_seconds[date_str] = None if parsed_date is None else (parsed_date.date() - date(1970, 1, 1)).days * 86400
+            if day_seconds[date_str] is None:
+                seconds.append(ScheduleSnapshot.MISSING)
+                continue
+            if time_str not in time_seconds:
+                parsed_time = self.parse_time(time_str)
+                time_seconds[time_str] = None if parsed_time is None else \
+                    parsed_time.hour * 3600 + parsed_time.minute * 60 + parsed_time.second
+            time_of_day = time_seconds[time_str]
+            seconds.append(ScheduleSnapshot.MISSING if time_of_day is None else day_seconds[date_str] + time_of_day)
+        
+        return ScheduleSnapshot(
+            positions,
+            {col: [table[col][position] for position in positions] for col in self.snapshot_columns(table)},
+            seconds,
+            [ScheduleSnapshot.status_code(statuses[position]) for position in positions]
+        )
+
+    def schedule_snapshot(self, df) -> ScheduleSnapshot:
+        """Compact snapshot of df's pending rows with their parsed schedule, built once per loaded DataFrame or SheetTable"""
+        with self._snapshot_lock:
+            cached = self._snapshots.get(id(df))
+            if cached is not None and cached[0] is df:
+                self._snapshots.move_to_end(id(df))
+                return cached[1]
+        
+        if isinstance(df, SheetTable):
+            snapshot = self._table_snapshot(df)
+        else:
+            pending_posts = self._drop_unscheduled(self._select_pending(df), "Row {row} has missing Date or Post Timings. Skipping.")
+            scheduled = self.resolve_schedule(pending_posts)
+            snapshot = ScheduleSnapshot(
+                pending_posts.index,
+                {col: pending_posts[col].tolist() for col in self.snapshot_columns(pending_posts.columns)},
+                scheduled.to_numpy(dtype='datetime64[s]').astype(np.int64), # NaT becomes ScheduleSnapshot.MISSING
+                [ScheduleSnapshot.status_code(status) for status in pending_posts[self.STATUS_COL]]
+            )
+        
+        with self._snapshot_lock:
+            # Holding the DataFrame keeps its id() from being reused while the entry is cached
+            self._snapshots[id(df)] = (df, snapshot)
+            while len(self._snapshots) > self.SNAPSHOT_CACHE_SIZE:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
     def get_pending_posts(self, spreadsheet_url: str = None) -> list[dict]:
-        """Get all pending posts from the spreadsheet"""
-        if not spreadsheet_url:
-            spreadsheet_url = self.default_spreadsheet_url
-            
-        df = self.load_google_spreadsheet(spreadsheet_url)
+        """Get all pending posts from the spreadsheet (or every configured worksheet when none is given)"""
+        df = self.load_schedule([spreadsheet_url] if spreadsheet_url else None)
         
         if df is None:
             return []
         
-        # Map column names - ensure these match your Google Sheet exactly
-        date_col = 'Date'
-        time_col = 'Post Timings'
-        caption_col = 'Caption'
-        hashtags_col = 'Hashtags'
-        imageurl_col = 'Filename.jpg'
-        status_col = 'Status' # Make sure this column exists
+        date_col = self.DATE_COL
+        time_col = self.TIME_COL
+        caption_col = self.CAPTION_COL
+        hashtags_col = self.HASHTAGS_COL
+        imageurl_col = self.IMAGEURL_COL
+        status_col = self.STATUS_COL
 
         # Check if all required columns exist
         required_cols = [date_col, time_col, caption_col, hashtags_col, imageurl_col, status_col]
         if not all(col in df.columns for col in required_cols):
-            logger.error(f"Missing one or more required columns in spreadsheet. Expected: {required_cols}. Found: {df.columns.tolist()}")
+            logger.error(f"Missing one or more required columns in spreadsheet. Expected: {required_cols}. Found: {list(df.columns)}")
             return []
 
-        # Filter pending posts
-        # Handle NaN values for 'Status' explicitly
-        pending_posts = df[
-            (df[status_col].astype(str).str.lower().isin(['pending', 'scheduled', ''])) |
-            (df[status_col].isna()) |
-            (df[status_col].astype(str).str.strip() == '')
-        ].copy()
+        return [post for _, post in self._pending_post_entries(self.schedule_snapshot(df))]
+
+    def _pending_post_entries(self, snapshot: ScheduleSnapshot) -> list[tuple[ScheduledPost, dict]]:
+        """(row, API record) for each pending row of snapshot that the ledger has not settled yet"""
+        date_col = self.DATE_COL
+        time_col = self.TIME_COL
+        caption_col = self.CAPTION_COL
+        hashtags_col = self.HASHTAGS_COL
+        imageurl_col = self.IMAGEURL_COL
+        status_col = self.STATUS_COL
+
+        posts = snapshot.records()
+        if self.ledger is not None and posts:
+            # Hide rows the ledger already settled whose status has not reached the sheet yet
+            settled = set()
+            for source_url in snapshot.positions_by(self.SOURCE_COL):
+                settled |= self.ledger.settled_keys(source_url)
+            if settled:
+                posts = [row for row in posts if self.ledger_key(row[self.SOURCE_COL], row.index, row) not in settled]
         
         posts_data = []
-        for index, row in pending_posts.iterrows():
+        for row in posts:
+            index = row.index
             try:
-                date_val = row[date_col]
-                time_val = row[time_col]
-                
-                if pd.isna(date_val) or pd.isna(time_val):
-                    logger.warning(f"Skipping row {index + 1} due to missing Date or Post Timings.")
-                    continue
-                
-                scheduled_datetime = self.parse_datetime(str(date_val), str(time_val))
-                
-                posts_data.append({
-                    'index': int(index),
-                    'date': str(date_val),
-                    'time': str(time_val),
+                caption = str(row[caption_col])
+                scheduled_datetime = row.scheduled_datetime
+                posts_data.append((row, {
+                    'index': index,
+                    'row_key': row.get(self.ROW_KEY_COL),
+                    'sheet_row': row.get(self.SHEET_ROW_COL),
+                    'source': row[self.SOURCE_COL],
+                    'accounts': self.accounts.target_names(parse_sheet_url(row[self.SOURCE_COL])[0], row.get(self.ACCOUNTS_COL, '')),
+                    'date': str(row[date_col]),
+                    'time': str(row[time_col]),
                     'scheduled_datetime': scheduled_datetime.strftime('%Y-%m-%d %H:%M') if scheduled_datetime else 'Invalid',
-                    'caption': str(row[caption_col])[:100] + '...' if len(str(row[caption_col])) > 100 else str(row[caption_col]),
+                    'caption': caption[:100] + '...' if len(caption) > 100 else caption,
                     'hashtags': str(row[hashtags_col]),
                     'image_url': str(row[imageurl_col]),
                     'status': str(row[status_col])
-                })
+                }))
             except Exception as e:
                 logger.error(f"Error processing pending post at row {index + 1}: {e}")
                 continue # Continue to next row even if one fails
         
         return posts_data
 
-    def process_scheduled_posts(self, spreadsheet_url: str = None, tolerance_minutes: int = 10) -> list[dict]:
-        """Process posts that are scheduled for the current time"""
-        if not spreadsheet_url:
-            spreadsheet_url = self.default_spreadsheet_url
+    def pending_posts_view(self) -> PendingPostsView | None:
+        """Pending posts of every configured worksheet, indexed for /api/pending-posts.
+
+        The view is rebuilt only when the schedule snapshot or the ledger changed. Concurrent
+        callers are collapsed into one load: the first revalidates the sheets and builds the
+        view while the others wait for it and reuse the result. None if nothing could be loaded.
+        """
+        with self._pending_view_lock:
+            df = self.load_schedule()
+            if df is None:
+                return None
+            
+            required_cols = [self.DATE_COL, self.TIME_COL, self.CAPTION_COL, self.HASHTAGS_COL, self.IMAGEURL_COL, self.STATUS_COL]
+            if not all(col in df.columns for col in required_cols):
+                logger.error(f"Missing one or more required columns in spreadsheet. Expected: {required_cols}. Found: {list(df.columns)}")
+                return None
+            
+            snapshot = self.schedule_snapshot(df)
+            generation = self.ledger.generation if self.ledger is not None else None
+            if self._pending_view is not None and self._pending_view[0] is snapshot and self._pending_view[1] == generation:
+                return self._pending_view[2]
+            
+            entries = self._pending_post_entries(snapshot)
+            positions = [row.position for row, _ in entries]
+            view = PendingPostsView([post for _, post in entries], snapshot.scheduled_seconds[positions],
+                                    snapshot.status_codes[positions])
+            self._pending_view = (snapshot, generation, view)
+            return view
+
+    def ledger_key(self, spreadsheet_url: str, index, row) -> tuple[str, str]:
+        """(row_key, content_hash) identifying a post in the ledger"""
+        content = '\x1f'.join(str(row.get(col, '')) for col in self.fingerprint_columns())
+        return f"{sheet_source_id(spreadsheet_url)}:{row.get(self.ROW_KEY_COL, index)}", hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def shard_key(self, post_info: dict, spreadsheet_url: str = None) -> str:
+        """Key a ready post is sharded and leased by across instances: its ledger key as one string"""
+        key = post_info.get('ledger_key') or self.ledger_key(
+            post_info.get('spreadsheet_url') or post_info['row'].get(self.SOURCE_COL) or spreadsheet_url or self.default_spreadsheet_url,
+            post_info['index'], post_info['row'])
+        return '|'.join(key)
+
+    def _lease_outcome(self, result: dict, ledger_key: tuple = None) -> str:
+        """How a post's shard lease ends: 'posted', 'partial' when a platform has it, else 'released'"""
+        if result.get('status') == 'Posted':
+            return 'posted'
+        published = result.get('facebook_success') or result.get('instagram_success')
+        if not published and self.ledger is not None and ledger_key is not None:
+            published = any(stage in done for done in self.ledger.stages(ledger_key).values()
+                            for stage in (PostLedger.STAGE_FACEBOOK_POSTED, PostLedger.STAGE_INSTAGRAM_PUBLISHED))
+        return 'partial' if published else 'released'
+
+    def _end_unpublished_lease(self, post_info: dict, claimed: bool = False):
+        """End the shard lease of a ready post this run leased but will not publish. Unless this run
+        claimed it, a post in progress keeps its lease: another run of this instance is publishing it."""
+        shard_key = post_info['shard_key']
+        try:
+            ledger_key = self.ledger_key(post_info['spreadsheet_url'], post_info['index'], post_info['row'])
+            state = None if claimed else self.ledger.state(ledger_key)
+            if state == 'in_progress':
+                return
+            outcome = 'posted' if state == 'posted' else self._lease_outcome({}, ledger_key)
+        except Exception as e:
+            # The ledger cannot tell whether anything was published: let the lease run out instead
+            logger.error(f"Could not end the lease of post {shard_key}: {e}")
+            return
+        self.shards.complete(shard_key, outcome)
+
+    def _sync_ledger_schedule(self, spreadsheet_url: str, snapshot: ScheduleSnapshot, posts: list[ScheduledPost]) -> dict:
+        """Upsert one worksheet's pending rows into the ledger (once per snapshot); returns {position: key}"""
+        keys = {row.position: self.ledger_key(spreadsheet_url, row.index, row) for row in posts}
+        if self._ledger_synced_snapshots.get(spreadsheet_url) is not snapshot:
+            entries = []
+            for row in posts:
+                scheduled_datetime = row.scheduled_datetime
+                entries.append((*keys[row.position], int(row[self.SHEET_ROW_COL]),
+                                scheduled_datetime.isoformat(sep=' ') if scheduled_datetime else None))
+            self.ledger.sync_schedule(spreadsheet_url, entries)
+            self._ledger_synced_snapshots[spreadsheet_url] = snapshot
+        return keys
+
+    def _replicate_run_statuses(self):
+        """Replicate the statuses of a finished publishing run: synchronously with ledger_write_through,
+        otherwise on the replicator's thread right away"""
+        if self.ledger_write_through:
+            try:
+                self.replicator.sync_once()
+                return
+            except Exception as e:
+                logger.error(f"Could not write the run's statuses through to the sheet: {e}", exc_info=True)
+        self.replicator.notify(urgent=True)
+
+    def _write_status(self, index, status: str, spreadsheet_url: str, status_buffer: StatusWriteBuffer | None,
+                      ledger_key: tuple = None, facebook_post_id: str = None, instagram_post_id: str = None,
+                      error: str = None, row_key: str = None, retryable: bool = False):
+        """Record a row's outcome: in the ledger when enabled (replicated to the sheet later, or
+        at the end of the run with ledger_write_through), otherwise on the run's status buffer,
+        or written directly when there is none.
+        A retryable failure is picked up again by the retry worker (ledger only)."""
+        if self.ledger is not None and ledger_key is not None:
+            self.ledger.record_result(ledger_key, status, facebook_post_id, instagram_post_id, error,
+                                      retryable=retryable and self.retry_worker is not None)
+            self.replicator.notify()
+        elif status_buffer is not None:
+            if row_key is not None:
+                status_buffer.queue_key(row_key, status)
+            else:
+                status_buffer.queue(index, status)
+        else:
+            self.update_google_spreadsheet_status(index, status, spreadsheet_url)
+
+    def _publish_to_account(self, account: Account, index, image_url: str, caption: str, hashtags: str,
+                            timings: dict, progress=None, ledger_key: tuple = None) -> dict:
+        """Download the image and post it to one account's Facebook page and Instagram profile.
+        With a ledger key, every completed stage is recorded and stages an earlier attempt
+        already completed are skipped, so a retry only redoes what failed."""
+        temp_image_path = None
+        media = None
+        tracked = self.ledger is not None and ledger_key is not None
+        done = self.ledger.stages(ledger_key).get(account.name, {}) if tracked else {}
+        
+        def record_stage(stage: str, value: str = None):
+            if tracked:
+                self.ledger.record_stage(ledger_key, account.name, stage, value)
+        
+        try:
+            if PostLedger.STAGE_FACEBOOK_POSTED in done:
+                # Facebook already has this post; the image is only needed again for Facebook
+                fb_success, fb_result = True, done[PostLedger.STAGE_FACEBOOK_POSTED]
+                logger.info(f"Row {index + 1} is already on {account.name}'s Facebook page ({fb_result}); resuming at Instagram")
+            else:
+                fb_success, fb_result = None, None
+            
+            if fb_success is None:
+                # Fetch the image for Facebook: streamed/in-memory, or a local temp file in 'tempfile' mode
+                with self.stage_limits['download'], stage_timer(timings, 'download', progress, index):
+                    if self.media_mode == 'tempfile':
+                        temp_image_path = self.download_image_from_url(image_url)
+                    else:
+                        media = self.fetch_media(image_url)
+            
+            if fb_success is None and not temp_image_path and media is None:
+                error_msg = 'Could not download image'
+                logger.error(f"Skipping post for row {index + 1} on {account.name}: {error_msg}")
+                metrics.inc('poster_failures_total', platform='media', error_type='download')
+                events.publish('step_failed', row=index + 1, account=account.name, step='download', error=error_msg)
+                return {
+                    'facebook_success': False,
+                    'instagram_success': False,
+                    'status': "Failed: " + error_msg,
+                    'error': error_msg
+                }
+            
+            if fb_success is None:
+                record_stage(PostLedger.STAGE_DOWNLOADED, str(media.size) if media is not None and media.size is not None else None)
+                # Post to Facebook
+                with account.stage_limits['facebook'], stage_timer(timings, 'facebook', progress, index):
+                    if media is not None:
+                        fb_success, fb_result = self.upload_media_to_facebook(media, caption, hashtags, account)
+                        media.close()
+                    else:
+                        fb_success, fb_result = self.upload_image_to_facebook(temp_image_path, caption, hashtags, account)
+                if fb_success:
+                    record_stage(PostLedger.STAGE_FACEBOOK_POSTED, fb_result)
+                    events.publish('facebook_posted', row=index + 1, account=account.name, post_id=fb_result)
+                else:
+                    events.publish('step_failed', row=index + 1, account=account.name, step='facebook', error=fb_result)
+            
+            if PostLedger.STAGE_INSTAGRAM_PUBLISHED in done:
+                ig_success, ig_result = True, done[PostLedger.STAGE_INSTAGRAM_PUBLISHED]
+                logger.info(f"Row {index + 1} is already on {account.name}'s Instagram profile ({ig_result})")
+            else:
+                # Post to Instagram (uses image URL directly), publishing the container of an earlier attempt if there is one
+                with account.stage_limits['instagram'], stage_timer(timings, 'instagram', progress, index):
+                    ig_success, ig_result = self.upload_image_to_instagram(
+                        image_url, caption, hashtags, account,
+                        container_id=done.get(PostLedger.STAGE_INSTAGRAM_CONTAINER),
+                        on_container=lambda container_id: record_stage(PostLedger.STAGE_INSTAGRAM_CONTAINER, container_id)
+                    )
+                if ig_success:
+                    record_stage(PostLedger.STAGE_INSTAGRAM_PUBLISHED, ig_result)
+                    events.publish('instagram_published', row=index + 1, account=account.name, media_id=ig_result)
+                else:
+                    events.publish('step_failed', row=index + 1, account=account.name, step='instagram', error=ig_result)
             
-        df = self.load_google_spreadsheet(spreadsheet_url)
+            status_message = "Posted"
+            if not fb_success and not ig_success:
+                status_message = "Failed All"
+            elif not fb_success:
+                status_message = "Failed FB"
+            elif not ig_success:
+                status_message = "Failed IG"
+            
+            return {
+                'facebook_success': fb_success,
+                'instagram_success': ig_success,
+                'facebook_result': fb_result,
+                'instagram_result': ig_result,
+                'status': status_message,
+                'media': media.report() if media is not None else None
+            }
+        finally:
+            if media is not None:
+                media.close()
+            if temp_image_path:
+                self.cleanup_temp_file(temp_image_path)
+
+    def _publish_post(self, index, row, spreadsheet_url: str, status_buffer: StatusWriteBuffer | None = None,
+                      progress=None, ledger_key: tuple = None) -> dict:
+        """Publish a single ready row to each of its target accounts, then write back its status"""
+        caption_col = self.CAPTION_COL
+        hashtags_col = self.HASHTAGS_COL
+        imageurl_col = self.IMAGEURL_COL
+        timings = {}
+        started = time.perf_counter()
+        
+        try:
+            image_url = str(row[imageurl_col]).strip()
+            caption = str(row[caption_col]).strip()
+            hashtags = str(row[hashtags_col]).strip()
+            
+            spreadsheet_id, _ = parse_sheet_url(spreadsheet_url)
+            names = self.accounts.target_names(spreadsheet_id, row.get(self.ACCOUNTS_COL, ''))
+            accounts = [self.accounts.get(name) for name in names]
+            
+            logger.info(f"Processing post for row {index + 1} (Image: {image_url}, accounts: {', '.join(names)})")
+            events.publish('row_picked', row=index + 1, caption=caption[:80], accounts=names)
+            
+            unknown = [name for name, account in zip(names, accounts) if account is None]
+            if unknown:
+                error_msg = f"Unknown account(s): {', '.join(unknown)}"
+                logger.error(f"Skipping post for row {index + 1}: {error_msg}")
+                metrics.inc('poster_failures_total', platform='all', error_type='unknown_account')
+                with self.stage_limits['status_update'], stage_timer(timings, 'status_update', progress, index):
+                    self._write_status(index, "Failed: " + error_msg, spreadsheet_url, status_buffer, ledger_key,
+                                       error=error_msg, row_key=row.get(self.ROW_KEY_COL))
+                events.publish('post_failed', row=index + 1, status="Failed: " + error_msg, error=error_msg)
+                return {
+                    'index': index,
+                    'image_url': image_url,
+                    'caption': caption,
+                    'accounts': names,
+                    'facebook_success': False,
+                    'instagram_success': False,
+                    'error': error_msg,
+                    'status': "Failed: " + error_msg,
+                    'timings': timings
+                }
+            
+            if len(accounts) == 1:
+                outcomes = {accounts[0].name: self._publish_to_account(accounts[0], index, image_url, caption, hashtags,
+                                                                       timings, progress, ledger_key)}
+            else:
+                # Fan out: each account downloads, uploads and spends its rate budget independently
+                account_timings = {account.name: {} for account in accounts}
+                with ThreadPoolExecutor(max_workers=min(len(accounts), self.fanout_workers), thread_name_prefix='fanout') as pool:
+                    futures = {
+                        account.name: pool.submit(self._publish_to_account, account, index, image_url, caption,
+                                                  hashtags, account_timings[account.name], progress, ledger_key)
+                        for account in accounts
+                    }
+                outcomes = {name: future.result() for name, future in futures.items()}
+                # Accounts run side by side, so a stage took as long as its slowest account
+                for stage_timings in account_timings.values():
+                    for stage, seconds in stage_timings.items():
+                        timings[stage] = max(timings.get(stage, 0.0), seconds)
+            
+            fb_success = all(outcome['facebook_success'] for outcome in outcomes.values())
+            ig_success = all(outcome['instagram_success'] for outcome in outcomes.values())
+            if len(outcomes) == 1:
+                outcome = next(iter(outcomes.values()))
+                status_message = outcome['status']
+                fb_result = outcome.get('facebook_result')
+                ig_result = outcome.get('instagram_result')
+                media_report = outcome.get('media')
+            else:
+                failed = [f"{name}: {outcome['status']}" for name, outcome in outcomes.items() if outcome['status'] != 'Posted']
+                status_message = f"Failed ({', '.join(failed)})" if failed else "Posted"
+                fb_result = ', '.join(f"{name}: {outcome.get('facebook_result')}" for name, outcome in outcomes.items())
+                ig_result = ', '.join(f"{name}: {outcome.get('instagram_result')}" for name, outcome in outcomes.items())
+                media_report = {name: outcome.get('media') for name, outcome in outcomes.items()}
+            
+            def posted_ids(platform: str) -> str | None:
+                ids = [(name, outcome[f'{platform}_result']) for name, outcome in outcomes.items() if outcome[f'{platform}_success']]
+                if len(outcomes) == 1:
+                    return ids[0][1] if ids else None
+                return ', '.join(f"{name}: {post_id}" for name, post_id in ids) or None
+            
+            errors = [outcome.get('error') or f"FB: {outcome.get('facebook_result')} / IG: {outcome.get('instagram_result')}"
+                      for outcome in outcomes.values() if outcome['status'] != 'Posted']
+            
+            # Update status in Google Sheet
+            with self.stage_limits['status_update'], stage_timer(timings, 'status_update', progress, index):
+                self._write_status(index, status_message, spreadsheet_url, status_buffer, ledger_key,
+                                   facebook_post_id=posted_ids('facebook'),
+                                   instagram_post_id=posted_ids('instagram'),
+                                   error='; '.join(errors) or None,
+                                   row_key=row.get(self.ROW_KEY_COL), retryable=True)
+            events.publish('post_posted' if status_message == 'Posted' else 'post_failed', row=index + 1,
+                           status=status_message, error='; '.join(errors) or None, timings=timings)
+            
+            result = {
+                'index': index,
+                'image_url': image_url,
+                'caption': caption,
+                'accounts': names,
+                'facebook_success': fb_success,
+                'instagram_success': ig_success,
+                'facebook_result': fb_result,
+                'instagram_result': ig_result,
+                'status': status_message, # Add status to result for better reporting
+                'timings': timings,
+                'media': media_report
+            }
+            if len(outcomes) == 1 and outcome.get('error'):
+                result['error'] = outcome['error']
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error processing post at row {index + 1}: {e}", exc_info=True) # Log full traceback
+            metrics.inc('poster_failures_total', platform='all', error_type='unhandled')
+            error_msg_full = f"Unhandled error: {e}"
+            with self.stage_limits['status_update']:
+                self._write_status(index, "Failed: Unhandled Error", spreadsheet_url, status_buffer, ledger_key,
+                                   error=error_msg_full, row_key=row.get(self.ROW_KEY_COL), retryable=True)
+            events.publish('post_failed', row=index + 1, status="Failed: Unhandled Error", error=error_msg_full)
+            return {
+                'index': index,
+                'image_url': row.get(imageurl_col, 'unknown'),
+                'caption': str(row.get(caption_col, '')),
+                'facebook_success': False,
+                'instagram_success': False,
+                'error': error_msg_full,
+                'status': "Failed: Unhandled Error",
+                'timings': timings
+            }
+        finally:
+            timings['total'] = round(time.perf_counter() - started, 3)
+            if progress is not None:
+                progress.row_stage(index, 'done')
+
+    def process_scheduled_posts(self, spreadsheet_url: str = None, tolerance_minutes: int = 10, progress=None) -> list[dict]:
+        """Process posts that are scheduled for the current time, from spreadsheet_url or every configured worksheet.
+        progress (optional) receives row_stage / row_result callbacks as posts move through the pipeline."""
+        # Always revalidate before posting so rows posted by a previous run are never served from a stale cache
+        df = self.load_schedule([spreadsheet_url] if spreadsheet_url else None, revalidate=True)
         
         if df is None:
             logger.error("Could not load spreadsheet data. Aborting post processing.")
@@ -398,13 +4239,12 @@ class SocialMediaPoster:
         
         logger.info(f"Loaded {len(df)} posts from Google Spreadsheet")
         
-        # Map column names - ensure these match your Google Sheet exactly
-        date_col = 'Date'
-        time_col = 'Post Timings'
-        caption_col = 'Caption'
-        hashtags_col = 'Hashtags'
-        imageurl_col = 'Filename.jpg'
-        status_col = 'Status' # Make sure this column exists
+        date_col = self.DATE_COL
+        time_col = self.TIME_COL
+        caption_col = self.CAPTION_COL
+        hashtags_col = self.HASHTAGS_COL
+        imageurl_col = self.IMAGEURL_COL
+        status_col = self.STATUS_COL
 
         # Check if all required columns exist
         required_cols = [date_col, time_col, caption_col, hashtags_col, imageurl_col, status_col]
@@ -412,129 +4252,549 @@ class SocialMediaPoster:
             logger.error(f"Missing one or more required columns in spreadsheet. Expected: {required_cols}. Aborting.")
             return []
 
-        # Filter pending posts
-        pending_posts = df[
-            (df[status_col].astype(str).str.lower().isin(['pending', 'scheduled', ''])) |
-            (df[status_col].isna()) |
-            (df[status_col].astype(str).str.strip() == '')
-        ].copy()
+        # Pending rows with their schedules parsed in bulk, shared with the API and the in-process scheduler
+        snapshot = self.schedule_snapshot(df)
         
-        logger.info(f"Found {len(pending_posts)} pending posts")
+        logger.info(f"Found {len(snapshot)} pending posts")
         
-        # Filter posts ready to publish
-        ready_posts = []
+        current_time = datetime.now()
+        if self.ledger is not None:
+            # Indexed lookup of unclaimed posts in the window; rows already settled in the ledger drop out here
+            window = timedelta(minutes=tolerance_minutes)
+            due = []
+            for source_url, positions in snapshot.positions_by(self.SOURCE_COL).items():
+                keys = self._sync_ledger_schedule(source_url, snapshot, snapshot.records(positions))
+                due_keys = self.ledger.due(source_url, current_time - window, current_time + window)
+                due.extend(position for position in positions if keys[position] in due_keys)
+            due.sort()
+        else:
+            due = snapshot.due_positions(current_time, tolerance_minutes)
         
-        for index, row in pending_posts.iterrows():
-            try:
-                date_val = row[date_col]
-                time_val = row[time_col]
-                
-                if pd.isna(date_val) or pd.isna(time_val):
-                    logger.warning(f"Row {index + 1} has missing Date or Post Timings. Skipping.")
-                    continue
-                
-                scheduled_datetime = self.parse_datetime(str(date_val), str(time_val))
-                
-                if scheduled_datetime and self.is_time_to_post(scheduled_datetime, tolerance_minutes):
-                    ready_posts.append({
-                        'index': index,
-                        'row': row,
-                        'scheduled_datetime': scheduled_datetime
-                    })
-                    
-            except Exception as e:
-                logger.error(f"Error checking schedule for row {index + 1}: {e}")
+        ready_posts = []
+        for row in snapshot.records(due):
+            scheduled_datetime = row.scheduled_datetime
+            logger.info(f"Time to post! Scheduled: {scheduled_datetime.strftime('%Y-%m-%d %H:%M')}, Current: {current_time.strftime('%Y-%m-%d %H:%M')}")
+            ready_posts.append({
+                'index': row.index,
+                'row': row,
+                'scheduled_datetime': scheduled_datetime,
+                'spreadsheet_url': row[self.SOURCE_COL]
+            })
         
         logger.info(f"Found {len(ready_posts)} posts ready to publish")
         
         if len(ready_posts) == 0:
             return []
         
-        results = []
+        return self.publish_ready_posts(ready_posts, spreadsheet_url, progress)
+
+    def publish_ready_posts(self, ready_posts: list[dict], spreadsheet_url: str = None, progress=None,
+                            already_claimed: bool = False) -> list[dict]:
+        """Publish a batch of ready posts on the worker pool and flush their status updates.
+        Each post is written back to the worksheet it came from (falling back to spreadsheet_url).
+        already_claimed: the posts were already claimed in the ledger and carry their 'ledger_key'."""
+        ready_posts = [
+            {**post_info, 'spreadsheet_url': post_info.get('spreadsheet_url') or post_info['row'].get(self.SOURCE_COL)
+                                             or spreadsheet_url or self.default_spreadsheet_url}
+            for post_info in ready_posts
+        ]
+        
+        if self.shards is not None:
+            # Keep this instance's shard (and overdue posts of other instances) and lease each post;
+            # posts leased or posted by another instance are skipped. Claimed retries are already ours.
+            now = datetime.now()
+            leased = []
+            for post_info in ready_posts:
+                shard_key = self.shard_key(post_info)
+                if not already_claimed and not self.shards.should_take(shard_key, post_info.get('scheduled_datetime'), now):
+                    continue
+                if self.shards.acquire(shard_key):
+                    leased.append({**post_info, 'shard_key': shard_key})
+                else:
+                    logger.info(f"Row {post_info['index'] + 1} is leased or posted by another instance. Skipping.")
+            ready_posts = leased
+            if not ready_posts:
+                return []
         
-        for post_info in ready_posts:
-            index = post_info['index']
-            row = post_info['row']
-            temp_image_path = None
-            
+        if self.ledger is not None and not already_claimed:
+            # Claim every post in the ledger first; anything already posted or in flight is skipped
+            claimed_posts = []
             try:
-                image_url = str(row[imageurl_col]).strip()
-                caption = str(row[caption_col]).strip()
-                hashtags = str(row[hashtags_col]).strip()
-                
-                logger.info(f"Processing post for row {index + 1} (Image: {image_url})")
-                
-                # Download image for Facebook (required local path for Facebook API)
-                temp_image_path = self.download_image_from_url(image_url)
-                
-                if not temp_image_path:
-                    error_msg = 'Could not download image'
-                    logger.error(f"Skipping post for row {index + 1}: {error_msg}")
-                    results.append({
-                        'index': index,
-                        'image_url': image_url,
-                        'caption': caption,
-                        'facebook_success': False,
-                        'instagram_success': False,
-                        'error': error_msg
-                    })
-                    self.update_google_spreadsheet_status(index, "Failed: " + error_msg, spreadsheet_url)
+                for post_info in ready_posts:
+                    source_url = post_info['spreadsheet_url']
+                    key = self.ledger_key(source_url, post_info['index'], post_info['row'])
+                    sheet_row = int(post_info['row'].get(self.SHEET_ROW_COL, post_info['index'] + 2))
+                    if self.ledger.claim(key, source_url, sheet_row, post_info.get('scheduled_datetime')):
+                        claimed_posts.append({**post_info, 'ledger_key': key})
+                    else:
+                        logger.info(f"Row {post_info['index'] + 1} is already posted, in progress or awaiting its status "
+                                    "write-back according to the ledger. Skipping.")
+                        if post_info.get('shard_key') is not None:
+                            self._end_unpublished_lease(post_info)
+            except Exception:
+                # None of the batch gets published: hand its leases back rather than hold them for lease_seconds
+                if self.shards is not None:
+                    claimed_keys = {post_info['shard_key'] for post_info in claimed_posts}
+                    for post_info in ready_posts:
+                        self._end_unpublished_lease(post_info, claimed=post_info['shard_key'] in claimed_keys)
+                raise
+            ready_posts = claimed_posts
+            if not ready_posts:
+                return []
+        
+        run_started = time.perf_counter()
+        workers = min(self.publish_workers, len(ready_posts))
+        source_urls = list(dict.fromkeys(post_info['spreadsheet_url'] for post_info in ready_posts))
+        # One status buffer per worksheet; with the ledger, statuses are replicated by the LedgerReplicator instead
+        status_buffers = {url: self.create_status_buffer(url) for url in source_urls} if self.ledger is None else {}
+        if progress is not None:
+            for post_info in ready_posts:
+                progress.row_stage(post_info['index'], 'queued')
+        events.publish('run_started', posts=len(ready_posts), workers=workers)
+        
+        def publish(post_info):
+            source_url = post_info['spreadsheet_url']
+            result = self._publish_post(post_info['index'], post_info['row'], source_url, status_buffers.get(source_url),
+                                        progress, post_info.get('ledger_key'))
+            if post_info.get('shard_key') is not None:
+                self.shards.complete(post_info['shard_key'], self._lease_outcome(result, post_info.get('ledger_key')))
+            if progress is not None:
+                progress.row_result(result)
+            metrics.inc('poster_posts_total', outcome='posted' if result.get('status') == 'Posted' else 'failed')
+            return result
+        
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='publish') as executor:
+                results = list(executor.map(publish, ready_posts))
+        finally:
+            # Write any status updates still buffered at the end of the run
+            for status_buffer in status_buffers.values():
+                if status_buffer is not None:
+                    status_buffer.flush()
+            if self.replicator is not None:
+                # The run's statuses go out in one replication pass instead of waiting for the interval;
+                # with an ephemeral ledger, before the run returns (once, not per post)
+                self._replicate_run_statuses()
+            for url in source_urls:
+                self.sheet_cache.invalidate(url)
+        
+        metrics.observe('poster_run_duration_seconds', time.perf_counter() - run_started)
+        events.publish('run_finished', posts=len(results), posted=sum(1 for result in results if result.get('status') == 'Posted'),
+                       seconds=round(time.perf_counter() - run_started, 1))
+        logger.info(f"Published {len(results)} posts in {time.perf_counter() - run_started:.1f}s using {workers} workers")
+        return results
+
+class PostScheduler:
+    """In-process dispatcher that fires pending posts at their scheduled minute.
+
+    Upcoming rows are kept in a min-heap keyed by scheduled datetime. The dispatcher
+    thread sleeps until the earliest entry is due (or the next sheet refresh), pops every
+    due entry and hands them to SocialMediaPoster.publish_ready_posts. The sheet is
+    revalidated every refresh_interval seconds; when it has changed, only rows that
+    were added, rescheduled or are no longer pending are pushed to or dropped from the
+    queue. Stale heap entries are discarded lazily when they reach the top.
+    """
+
+    def __init__(self, poster, spreadsheet_url: str = None, refresh_interval: float = 60.0, tolerance_minutes: int = 10):
+        self.poster = poster
+        self.spreadsheet_url = spreadsheet_url # None: every worksheet configured on the poster
+        self.refresh_interval = refresh_interval
+        self.tolerance_minutes = tolerance_minutes
+        
+        self._heap = [] # (scheduled_datetime, key)
+        self._entries = {} # key -> ready post dict, for rows currently pending in the sheet
+        self._dispatched = set() # keys handed to the publisher, kept until the row stops being pending
+        self._last_df = None
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._dispatcher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='dispatch')
+        self.stats = {'refreshes': 0, 'dispatched': 0, 'missed': 0, 'deferred': 0}
+
+    def start(self):
+        """Start the dispatcher thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='post-scheduler', daemon=True)
+        self._thread.start()
+        logger.info(f"In-process scheduler started (refresh every {self.refresh_interval:.0f}s)")
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def request_refresh(self):
+        """Ask the dispatcher to revalidate the sheet on its next wake-up"""
+        self._next_refresh = 0.0
+        self._wakeup.set()
+
+    @staticmethod
+    def _row_key(index, row, scheduled_datetime: datetime) -> tuple:
+        """Identity of a queued post: rescheduling or editing the row produces a new key"""
+        return (
+            row.get(SocialMediaPoster.SOURCE_COL),
+            row.get(SocialMediaPoster.ROW_KEY_COL, index),
+            scheduled_datetime,
+            str(row.get(SocialMediaPoster.IMAGEURL_COL, '')),
+            str(row.get(SocialMediaPoster.CAPTION_COL, '')),
+        )
+
+    def refresh(self):
+        """Revalidate the sheet and apply the differences to the queue"""
+        df = self.poster.load_schedule([self.spreadsheet_url] if self.spreadsheet_url else None, revalidate=True)
+        self._next_refresh = time.monotonic() + self.refresh_interval
+        if df is None or df is self._last_df:
+            return # Load failed or sheet unchanged: the queue is already up to date
+        
+        required_cols = [SocialMediaPoster.DATE_COL, SocialMediaPoster.TIME_COL, SocialMediaPoster.CAPTION_COL,
+                         SocialMediaPoster.HASHTAGS_COL, SocialMediaPoster.IMAGEURL_COL, SocialMediaPoster.STATUS_COL]
+        if not all(col in df.columns for col in required_cols):
+            logger.error(f"Missing one or more required columns in spreadsheet. Expected: {required_cols}. Scheduler queue not refreshed.")
+            return
+        
+        snapshot = self.poster.schedule_snapshot(df)
+        cutoff = datetime.now() - timedelta(minutes=self.tolerance_minutes)
+        
+        current = {}
+        for row in snapshot.records(snapshot.upcoming_positions(cutoff)):
+            scheduled_datetime = row.scheduled_datetime
+            key = self._row_key(row.index, row, scheduled_datetime)
+            current[key] = {'index': row.index, 'row': row, 'scheduled_datetime': scheduled_datetime}
+        
+        with self._lock:
+            added = [key for key in current if key not in self._entries and key not in self._dispatched]
+            removed = [key for key in self._entries if key not in current]
+            for key in removed:
+                del self._entries[key] # Its heap entry is skipped when popped
+            for key in added:
+                self._entries[key] = current[key]
+                heapq.heappush(self._heap, (current[key]['scheduled_datetime'], key))
+            # Forget dispatched rows once the sheet no longer lists them as pending
+            self._dispatched &= set(current)
+        
+        self._last_df = df
+        self.stats['refreshes'] += 1
+        if added or removed:
+            logger.info(f"Scheduler queue refreshed: +{len(added)} / -{len(removed)} posts, {len(self._entries)} queued")
+
+    def _pop_due(self, now: datetime) -> list[dict]:
+        """Pop every queued post whose scheduled minute has arrived. With sharding, posts of other
+        instances are queued again for when they may be taken over, if that is within the window."""
+        shards = self.poster.shards
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                scheduled_datetime, key = heapq.heappop(self._heap)
+                post_info = self._entries.pop(key, None)
+                if post_info is None:
+                    continue # Removed or rescheduled since it was queued
+                if (now - scheduled_datetime) > timedelta(minutes=self.tolerance_minutes):
+                    self.stats['missed'] += 1
+                    logger.warning(f"Row {post_info['index'] + 1} missed its posting window ({scheduled_datetime:%Y-%m-%d %H:%M}). Skipping.")
                     continue
+                if shards is not None and not shards.should_take(self.poster.shard_key(post_info, self.spreadsheet_url),
+                                                                 post_info['scheduled_datetime'], now):
+                    self.stats['deferred'] += 1
+                    if shards.steal_after <= self.tolerance_minutes * 60:
+                        self._entries[key] = post_info
+                        heapq.heappush(self._heap, (scheduled_datetime + timedelta(seconds=shards.steal_after), key))
+                    continue
+                self._dispatched.add(key)
+                due.append(post_info)
+        return due
+
+    def _seconds_until_next_event(self) -> float:
+        with self._lock:
+            next_due = self._heap[0][0] if self._heap else None
+        wait = self._next_refresh - time.monotonic()
+        if next_due is not None:
+            wait = min(wait, (next_due - datetime.now()).total_seconds())
+        return max(0.0, wait)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() >= self._next_refresh:
+                    self.refresh()
                 
-                # Post to Facebook
-                fb_success, fb_result = self.upload_image_to_facebook(temp_image_path, caption, hashtags)
-                time.sleep(3) # Short delay between platforms
-                
-                # Post to Instagram (uses image URL directly)
-                ig_success, ig_result = self.upload_image_to_instagram(image_url, caption, hashtags)
-                
-                status_message = "Posted"
-                if not fb_success and not ig_success:
-                    status_message = "Failed All"
-                elif not fb_success:
-                    status_message = "Failed FB"
-                elif not ig_success:
-                    status_message = "Failed IG"
-
-                results.append({
-                    'index': index,
-                    'image_url': image_url,
-                    'caption': caption,
-                    'facebook_success': fb_success,
-                    'instagram_success': ig_success,
-                    'facebook_result': fb_result,
-                    'instagram_result': ig_result,
-                    'status': status_message # Add status to result for better reporting
-                })
-                
-                # Update status in Google Sheet
-                self.update_google_spreadsheet_status(index, status_message, spreadsheet_url)
-                
-                time.sleep(5) # Delay before processing next post
-                
+                due = self._pop_due(datetime.now())
+                if due:
+                    logger.info(f"Scheduler dispatching {len(due)} posts")
+                    self.stats['dispatched'] += len(due)
+                    self._dispatcher.submit(self._dispatch, due)
             except Exception as e:
-                logger.error(f"Error processing post at row {index + 1}: {e}", exc_info=True) # Log full traceback
-                error_msg_full = f"Unhandled error: {e}"
-                results.append({
-                    'index': index,
-                    'image_url': row.get(imageurl_col, 'unknown'),
-                    'caption': str(row.get(caption_col, '')),
-                    'facebook_success': False,
-                    'instagram_success': False,
-                    'error': error_msg_full,
-                    'status': "Failed: Unhandled Error"
-                })
-                self.update_google_spreadsheet_status(index, "Failed: Unhandled Error", spreadsheet_url)
-            finally:
-                if temp_image_path:
-                    self.cleanup_temp_file(temp_image_path)
+                logger.error(f"Scheduler loop error: {e}", exc_info=True)
+                self._next_refresh = time.monotonic() + self.refresh_interval
+            
+            self._wakeup.wait(timeout=self._seconds_until_next_event())
+            self._wakeup.clear()
 
-        return results
+    def _dispatch(self, ready_posts: list[dict]):
+        try:
+            self.poster.publish_ready_posts(ready_posts, self.spreadsheet_url)
+        except Exception as e:
+            logger.error(f"Scheduler dispatch error: {e}", exc_info=True)
+        finally:
+            self.request_refresh()
+
+    def status(self) -> dict:
+        with self._lock:
+            next_due = self._heap[0][0] if self._heap else None
+            return {
+                'running': bool(self._thread and self._thread.is_alive()),
+                'queued': len(self._entries),
+                'next_due': next_due.isoformat() if next_due else None,
+                **self.stats
+            }
+
+def summarize_results(results: list[dict]) -> dict:
+    """Summary payload for a scheduler run, as returned by /api/run-scheduler"""
+    if not results:
+        return {
+            'message': 'No posts scheduled for this time',
+            'results': [],
+            'total_processed': 0
+        }
+    
+    # Calculate summary stats
+    total = len(results)
+    fb_success = sum(1 for r in results if r['facebook_success'])
+    ig_success = sum(1 for r in results if r['instagram_success'])
+    both_success = sum(1 for r in results if r['facebook_success'] and r['instagram_success'])
+    
+    return {
+        'message': f'Processed {total} posts',
+        'results': results,
+        'total_processed': total,
+        'facebook_success': fb_success,
+        'instagram_success': ig_success,
+        'both_success': both_success
+    }
+
+
+class SchedulerJob:
+    """Progress record for one background scheduler run; also the progress tracker handed to the pipeline"""
+
+    def __init__(self, params: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.status = 'queued'
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.rows = {} # row index -> {'stage', 'updated_at'}
+        self.results = []
+        self.summary = None
+        self.error = None
+        self.future = None
+        self._lock = threading.Lock()
+
+    def row_stage(self, index, stage: str):
+        with self._lock:
+            self.rows[index] = {'stage': stage, 'updated_at': datetime.now().isoformat()}
+
+    def row_result(self, result: dict):
+        with self._lock:
+            self.results.append(result)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'params': self.params,
+                'created_at': self.created_at.isoformat(),
+                'started_at': self.started_at.isoformat() if self.started_at else None,
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+                'elapsed_seconds': round(((self.finished_at or datetime.now()) - (self.started_at or self.created_at)).total_seconds(), 3),
+                'rows': [{'index': index, **info} for index, info in self.rows.items()],
+                'results': list(self.results),
+                'summary': self.summary,
+                'error': self.error
+            }
+
+
+class JobManager:
+    """Runs scheduler passes on a managed executor and keeps their progress for polling.
+
+    Only one scheduler run is in flight at a time: a trigger that arrives while a run is
+    queued or running joins that job instead of starting a second pass over the sheet.
+    """
+
+    def __init__(self, max_workers: int = 2, max_history: int = 50):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._active = None
+        self.max_history = max_history
+        self._lock = threading.Lock()
+
+    def submit_scheduler_run(self, poster, tolerance_minutes: int = 10) -> tuple[SchedulerJob, bool]:
+        """Start a scheduler run, or return the in-flight one. Returns (job, joined_existing)."""
+        with self._lock:
+            if self._active is not None and self._active.status in ('queued', 'running'):
+                return self._active, True
+            
+            job = SchedulerJob({'tolerance': tolerance_minutes})
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_history:
+                self._jobs.popitem(last=False)
+            self._active = job
+            job.future = self._executor.submit(self._run, job, poster, tolerance_minutes)
+            return job, False
+
+    def _run(self, job: SchedulerJob, poster, tolerance_minutes: int):
+        job.status = 'running'
+        job.started_at = datetime.now()
+        try:
+            results = poster.process_scheduled_posts(tolerance_minutes=tolerance_minutes, progress=job)
+            job.summary = summarize_results(results)
+            job.status = 'completed'
+        except Exception as e:
+            logger.error(f"Scheduler job {job.id} failed: {e}", exc_info=True)
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = datetime.now()
+        return job
+
+    def get(self, job_id: str) -> SchedulerJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self) -> dict:
+        with self._lock:
+            active = self._active
+            return {
+                'active_job': active.id if active is not None and active.status in ('queued', 'running') else None,
+                'jobs_tracked': len(self._jobs)
+            }
+
+
+class StartupWarmup:
+    """Keeps the expensive part of starting the app out of the import, for fast cold starts.
+
+    Started once per serving process through start_app_services() (gunicorn's post_worker_init
+    hook in gunicorn.conf.py, or __main__), never by a plain import of the module.
+
+    Modes (STARTUP_WARMUP):
+    - 'background' (default): the worker starts with pandas, numpy and gspread unloaded, so
+      it answers /health at once; delay seconds later a thread imports them, creates the
+      gspread client and then starts the background services.
+    - 'eager': the same warm-up before the worker takes requests; slower to start, no cold requests.
+    - 'off': only the background services are started; everything loads on first use.
+    """
+
+    MODES = ('background', 'eager', 'off')
+
+    def __init__(self, mode: str = 'background', delay: float = 2.0):
+        if mode not in self.MODES:
+            logger.warning(f"Unknown STARTUP_WARMUP '{mode}', using 'background'")
+            mode = 'background'
+        self.mode = mode
+        self.delay = delay
+        self.timings = {}
+        self._thread = None
+        self._started = False
+
+    def warm_up(self, poster):
+        """Import the heavy modules (pandas only with SHEET_BACKEND=pandas) and create the gspread client"""
+        started = time.perf_counter()
+        for module in (np, pd, gspread) if poster.sheet_backend == 'pandas' else (np, gspread):
+            module.load()
+        poster.gc # First access creates the client
+        self.timings['warmup_seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(f"Warm-up finished in {self.timings['warmup_seconds']}s")
+
+    def start(self, poster, start_services):
+        """Run the warm-up as configured, then start_services() (idempotent)"""
+        if self._started:
+            return
+        self._started = True
+        if self.mode == 'eager':
+            self.warm_up(poster)
+            start_services()
+        elif self.mode == 'background':
+            def run():
+                time.sleep(self.delay) # Let the worker take its first requests before competing for the GIL
+                try:
+                    self.warm_up(poster)
+                except Exception as e:
+                    logger.error(f"Warm-up error: {e}", exc_info=True)
+                start_services()
+            self._thread = threading.Thread(target=run, name='startup-warmup', daemon=True)
+            self._thread.start()
+        else:
+            start_services()
+
+    def imported(self):
+        self.timings['import_seconds'] = round(time.perf_counter() - PROCESS_STARTED, 3)
+        logger.info(f"App imported in {self.timings['import_seconds']}s (warm-up: {self.mode})")
+
+    def request_started(self, path: str):
+        if 'first_request_seconds' not in self.timings:
+            self.timings['first_request_seconds'] = round(time.perf_counter() - PROCESS_STARTED, 3)
+            self.timings['first_request_path'] = path
+
+    def status(self) -> dict:
+        return {
+            'mode': self.mode,
+            'started': self._started,
+            **self.timings,
+            'loaded_modules': [module._name for module in (pd, np, gspread) if module.loaded],
+        }
 
 # Initialize Flask app
 app = Flask(__name__)
 poster = SocialMediaPoster()
 
+# Optional in-process scheduler: posts fire at their scheduled minute without external /api/run-scheduler calls
+scheduler = PostScheduler(
+    poster,
+    refresh_interval=float(os.getenv("SCHEDULER_REFRESH_SECONDS", "60")),
+    tolerance_minutes=int(os.getenv("SCHEDULER_TOLERANCE_MINUTES", "10"))
+)
+
+# Background scheduler runs triggered through the API
+jobs = JobManager()
+
+def start_background_services():
+    """Start the threads that work on the schedule outside of requests"""
+    if os.getenv("ENABLE_INTERNAL_SCHEDULER", "false").lower() in ('1', 'true', 'yes'):
+        scheduler.start()
+    
+    # Replicate any statuses a previous process recorded in the ledger but never wrote to the sheet
+    if poster.replicator is not None:
+        poster.replicator.notify(urgent=True)
+    
+    if poster.prefetcher is not None:
+        poster.prefetcher.start()
+    
+    if poster.retry_worker is not None:
+        poster.retry_worker.start()
+    
+    if poster.shards is not None:
+        poster.shards.start()
+
+startup = StartupWarmup(os.getenv("STARTUP_WARMUP", "background").lower(),
+                        delay=float(os.getenv("STARTUP_WARMUP_DELAY_SECONDS", "2")))
+
+def start_app_services():
+    """Warm up and start the background services of a serving process (idempotent). Called by
+    gunicorn's post_worker_init hook (gunicorn.conf.py) and by __main__, so scripts, tests and
+    benchmarks that import the module don't start schedulers or write to the sheet"""
+    startup.start(poster, start_background_services)
+
+# For servers that don't load gunicorn.conf.py: start them with the import instead
+if os.getenv("START_BACKGROUND_SERVICES", "false").lower() in ('1', 'true', 'yes'):
+    start_app_services()
+
+@app.before_request
+def record_first_request():
+    startup.request_started(request.path)
+
 # HTML Template for the web interface
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -561,6 +4821,9 @@ HTML_TEMPLATE = """
         table { width: 100%; border-collapse: collapse; margin: 20px 0; }
         th, td { padding: 12px; text-align: left; border-bottom: 1px solid #ddd; }
         th { background-color: #f8f9fa; }
+        .event-feed { max-height: 320px; overflow-y: auto; font-family: monospace; font-size: 0.9em; border: 1px solid #ddd; border-radius: 5px; padding: 10px; background: #fafafa; }
+        .event-feed .event { padding: 2px 0; }
+        .event-feed .event.failed { color: #721c24; }
         .loading { display: none; text-align: center; padding: 20px; }
         .spinner { border: 4px solid #f3f3f3; border-top: 4px solid #3498db; border-radius: 50%; width: 40px; height: 40px; animation: spin 1s linear infinite; margin: 0 auto; }
         @keyframes spin { 0% { transform: rotate(0deg); } 100% { transform: rotate(360deg); } }
@@ -587,6 +4850,9 @@ HTML_TEMPLATE = """
         </div>
         
         <div id="results"></div>
+        
+        <h2>📡 Live Activity <small id="feed-state" style="color: #666;">connecting...</small></h2>
+        <div class="event-feed" id="event-feed"></div>
     </div>
 
     <script>
@@ -598,6 +4864,82 @@ HTML_TEMPLATE = """
         setInterval(updateTime, 1000);
         updateTime();
         
+        function describeEvent(e) {
+            switch (e.type) {
+                case 'run_started': return `▶️ Run started: ${e.posts} posts on ${e.workers} workers`;
+                case 'row_picked': return `📥 Row ${e.row} picked up (${e.accounts.join(', ')}): ${e.caption}`;
+                case 'facebook_posted': return `📘 Row ${e.row} posted to Facebook (${e.account}): ${e.post_id}`;
+                case 'instagram_container_ready': return `📦 Instagram container ${e.container_id} ready (${e.account})`;
+                case 'instagram_published': return `📸 Row ${e.row} published to Instagram (${e.account}): ${e.media_id}`;
+                case 'step_failed': return `⚠️ Row ${e.row}: ${e.step} failed (${e.account}): ${e.error}`;
+                case 'post_posted': return `✅ Row ${e.row} posted`;
+                case 'post_failed': return `❌ Row ${e.row}: ${e.status}`;
+                case 'status_written': return `📝 Status written to the sheet for ${e.count} rows`;
+                case 'media_flagged': return `🚫 Row ${e.row}: image unusable (${e.error})`;
+                case 'media_warning': return `⚠️ Row ${e.row}: Instagram will likely reject the image (${e.warning})`;
+                case 'run_finished': return `🏁 Run finished: ${e.posted}/${e.posts} posted in ${e.seconds}s`;
+                default: return e.type;
+            }
+        }
+        
+        // Live feed: one shared server-side event stream; EventSource reconnects and resumes by itself.
+        // When every stream slot is taken the server says so with a 'poll' event, and the feed
+        // short-polls /api/events?after=<id> until it is time to try the stream again.
+        let lastEventId = null;
+        function showEvent(e) {
+            const feed = document.getElementById('event-feed');
+            lastEventId = e.id;
+            const line = document.createElement('div');
+            line.className = 'event' + (e.type.endsWith('failed') ? ' failed' : '');
+            line.textContent = `${e.time.slice(11)}  ${describeEvent(e)}`; // textContent: captions are user data
+            feed.prepend(line);
+            while (feed.childElementCount > 200) {
+                feed.lastChild.remove();
+            }
+        }
+        
+        function pollEvents(pollSeconds, until) {
+            const state = document.getElementById('feed-state');
+            if (Date.now() >= until) {
+                connectEvents();
+                return;
+            }
+            fetch('/api/events?after=' + (lastEventId ?? ''))
+                .then(response => response.json())
+                .then(data => {
+                    data.events.forEach(showEvent);
+                    lastEventId = data.last_event_id;
+                    state.textContent = `polling every ${data.poll_seconds}s`;
+                    setTimeout(() => pollEvents(data.poll_seconds, until), data.poll_seconds * 1000);
+                })
+                .catch(() => {
+                    state.textContent = 'offline, retrying in 30s';
+                    setTimeout(() => pollEvents(pollSeconds, until), 30000);
+                });
+        }
+        
+        function connectEvents() {
+            const state = document.getElementById('feed-state');
+            const source = new EventSource('/api/events' + (lastEventId ? `?last_event_id=${lastEventId}` : ''));
+            source.onopen = () => { state.textContent = 'live'; };
+            source.onmessage = (message) => showEvent(JSON.parse(message.data));
+            source.addEventListener('poll', (message) => {
+                // Too many open streams: poll instead, and try the stream again in 5 minutes
+                source.close();
+                pollEvents(JSON.parse(message.data).poll_seconds, Date.now() + 300000);
+            });
+            source.onerror = () => {
+                if (source.readyState === EventSource.CLOSED) {
+                    // Refused (e.g. the server is down): try again later
+                    state.textContent = 'offline, retrying in 30s';
+                    setTimeout(connectEvents, 30000);
+                } else {
+                    state.textContent = 'reconnecting...';
+                }
+            };
+        }
+        connectEvents();
+        
         function showLoading() {
             document.getElementById('loading').style.display = 'block';
             document.getElementById('results').innerHTML = '';
@@ -661,7 +5003,35 @@ HTML_TEMPLATE = """
             showLoading();
             fetch('/api/run-scheduler', { method: 'POST' })
                 .then(response => response.json())
-                .then(data => displayResults(data, '📅 Scheduler Results'))
+                .then(data => {
+                    if (data.error) {
+                        displayResults(data, '📅 Scheduler Results');
+                    } else {
+                        pollJob(data.job_id);
+                    }
+                })
+                .catch(error => {
+                    hideLoading();
+                    document.getElementById('results').innerHTML = `<div class="error status">❌ Error: ${error.message}</div>`;
+                });
+        }
+        
+        function pollJob(jobId) {
+            fetch(`/api/jobs/${jobId}`)
+                .then(response => response.json())
+                .then(job => {
+                    if (job.status === 'completed') {
+                        displayResults(job.summary, '📅 Scheduler Results');
+                    } else if (job.status === 'failed') {
+                        displayResults({ error: job.error }, '📅 Scheduler Results');
+                    } else {
+                        const rows = job.rows.map(row => `<tr><td>${row.index + 1}</td><td>${row.stage}</td></tr>`).join('');
+                        document.getElementById('results').innerHTML =
+                            `<div class="info status">⏳ Job ${job.job_id}: ${job.status} (${job.results.length}/${job.rows.length} posts done, ${job.elapsed_seconds}s)</div>` +
+                            (rows ? `<table><tr><th>Row</th><th>Stage</th></tr>${rows}</table>` : '');
+                        setTimeout(() => pollJob(jobId), 1000);
+                    }
+                })
                 .catch(error => {
                     hideLoading();
                     document.getElementById('results').innerHTML = `<div class="error status">❌ Error: ${error.message}</div>`;
@@ -698,39 +5068,49 @@ def health_check():
         'service': 'social-media-poster'
     })
 
+@app.route('/metrics')
+def get_metrics():
+    """Stage latency histograms and pipeline counters in the Prometheus text format"""
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/run-scheduler', methods=['POST'])
 def run_scheduler():
-    """Run the post scheduler manually"""
+    """Start a scheduler run in the background (or join the one in flight).
+    Send {"wait": true} to block until it finishes and get the results directly.
+    A run in flight with a different tolerance is not joined: the request gets a 409."""
     try:
         logger.info("Manual scheduler run triggered")
         
         # Get tolerance from request or use default
-        tolerance = request.json.get('tolerance', 10) if request.is_json else 10
-        
-        # Process scheduled posts
-        results = poster.process_scheduled_posts(tolerance_minutes=tolerance)
+        params = request.get_json(silent=True) or {}
+        tolerance = params.get('tolerance', 10)
+        if isinstance(tolerance, bool) or not isinstance(tolerance, (int, float)) or not 0 <= tolerance < float('inf'):
+            return jsonify({'error': f"Invalid 'tolerance' {tolerance!r}: expected a non-negative number of minutes"}), 400
         
-        if not results:
-            return jsonify({
-                'message': 'No posts scheduled for this time',
-                'results': [],
-                'total_processed': 0
-            })
+        job, joined = jobs.submit_scheduler_run(poster, tolerance_minutes=tolerance)
+        if joined:
+            if job.params.get('tolerance') != tolerance:
+                return jsonify({
+                    'error': f"A scheduler run with tolerance {job.params.get('tolerance')} is already in progress",
+                    'job_id': job.id,
+                    'params': job.params,
+                    'status_url': f'/api/jobs/{job.id}'
+                }), 409
+            logger.info(f"Scheduler run already in progress, joining job {job.id}")
         
-        # Calculate summary stats
-        total = len(results)
-        fb_success = sum(1 for r in results if r['facebook_success'])
-        ig_success = sum(1 for r in results if r['instagram_success'])
-        both_success = sum(1 for r in results if r['facebook_success'] and r['instagram_success'])
+        if params.get('wait'):
+            job.future.result()
+            snapshot = job.snapshot()
+            if snapshot['status'] == 'failed':
+                return jsonify({'error': snapshot['error'], 'job_id': job.id}), 500
+            return jsonify({**snapshot['summary'], 'job_id': job.id})
         
         return jsonify({
-            'message': f'Processed {total} posts',
-            'results': results,
-            'total_processed': total,
-            'facebook_success': fb_success,
-            'instagram_success': ig_success,
-            'both_success': both_success
-        })
+            'job_id': job.id,
+            'status': job.status,
+            'joined': joined,
+            'status_url': f'/api/jobs/{job.id}'
+        }), 202
         
     except Exception as e:
         logger.error(f"Error running scheduler: {e}", exc_info=True)
@@ -738,16 +5118,75 @@ def run_scheduler():
             'error': str(e)
         }), 500
 
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Progress of a background scheduler run: per-row stage, results so far and timings"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    return jsonify(job.snapshot())
+
+# Largest page /api/pending-posts returns when a limit is given
+PENDING_POSTS_MAX_LIMIT = 1000
+
+def parse_date_filter(value: str, end: bool = False) -> datetime:
+    """Datetime of a from/to query parameter (ISO date or date-time). A bare date as the end bound covers that whole day."""
+    bound = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        bound += timedelta(days=1)
+    return bound
+
 @app.route('/api/pending-posts')
 def get_pending_posts():
-    """Get all pending posts"""
+    """Get pending posts, ordered by scheduled time.
+
+    Optional query parameters: from / to (ISO date or date-time) bound the scheduled time,
+    status (comma-separated: pending, scheduled, blank) filters on the Status column, and
+    limit / cursor page through the result (next_cursor is returned while more posts remain).
+    Responses carry an ETag; a matching If-None-Match is answered with 304 Not Modified.
+    """
     try:
-        posts = poster.get_pending_posts()
+        try:
+            start = parse_date_filter(request.args['from']) if request.args.get('from') else None
+            end = parse_date_filter(request.args['to'], end=True) if request.args.get('to') else None
+            statuses = None
+            if request.args.get('status') is not None:
+                statuses = [name.strip().lower() for name in request.args['status'].split(',') if name.strip()]
+                unknown = [name for name in statuses if name not in PendingPostsView.STATUS_FILTERS]
+                if unknown:
+                    raise ValueError(f"unknown status filter(s) {', '.join(unknown)}; expected {', '.join(PendingPostsView.STATUS_FILTERS)}")
+            limit = request.args.get('limit')
+            limit = min(max(1, int(limit)), PENDING_POSTS_MAX_LIMIT) if limit else None
+        except ValueError as e:
+            return jsonify({'error': f'Invalid query parameter: {e}'}), 400
         
-        return jsonify({
+        view = poster.pending_posts_view()
+        if view is None:
+            return jsonify({'posts': [], 'total_pending': 0, 'total_matching': 0, 'next_cursor': None})
+        
+        # One ETag per view and query, so each filtered page revalidates on its own
+        query = urlencode(sorted(request.args.items(multi=True)))
+        etag = view.etag if not query else f"{view.etag}-{hashlib.sha1(query.encode('utf-8')).hexdigest()[:8]}"
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        positions = view.select(start, end, statuses)
+        try:
+            posts, next_cursor = view.page(positions, request.args.get('cursor'), limit)
+        except ValueError:
+            return jsonify({'error': 'Invalid query parameter: malformed cursor'}), 400
+        
+        response = jsonify({
             'posts': posts,
-            'total_pending': len(posts)
+            'total_pending': len(view),
+            'total_matching': len(positions),
+            'next_cursor': next_cursor
         })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache' # Always revalidate; unchanged pages cost a 304
+        return response
         
     except Exception as e:
         logger.error(f"Error getting pending posts: {e}", exc_info=True)
@@ -755,6 +5194,51 @@ def get_pending_posts():
             'error': str(e)
         }), 500
 
+# Seconds an event stream stays open before the client is asked to reconnect (frees the server thread)
+EVENT_STREAM_SECONDS = float(os.getenv("EVENT_STREAM_SECONDS", "300"))
+# Poll interval suggested to viewers over EVENT_STREAM_MAX_SUBSCRIBERS
+EVENT_POLL_SECONDS = float(os.getenv("EVENT_POLL_SECONDS", "5"))
+
+@app.route('/api/events')
+def stream_events():
+    """Live feed of pipeline events as Server-Sent Events, shared by every dashboard viewer.
+    Resumes after the Last-Event-ID header (sent by EventSource on reconnect) or ?last_event_id.
+    With ?after=<id> it returns the events since then as JSON instead (short-polling), which is
+    what viewers are told to switch to once every stream slot is taken."""
+    after = request.args.get('after')
+    if after is not None:
+        last_id = int(after) if after.isdigit() else None
+        pending = events.since(last_id)
+        return jsonify({
+            'events': pending,
+            'last_event_id': pending[-1]['id'] if pending else min(last_id or 0, events.status()['last_event_id']),
+            'poll_seconds': EVENT_POLL_SECONDS
+        })
+    
+    if not events.try_subscribe():
+        # Over the cap: rather than refusing the viewer, tell it to short-poll ?after=<id>
+        response = app.response_class(f"event: poll\ndata: {json.dumps({'poll_seconds': EVENT_POLL_SECONDS})}\n\n",
+                                      mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+    
+    def generate():
+        yield "retry: 3000\n\n"
+        for event in events.stream(last_id, max_seconds=EVENT_STREAM_SECONDS):
+            if event is None:
+                yield ": keep-alive\n\n" # Also detects viewers that went away
+            else:
+                yield f"id: {event['id']}\ndata: {json.dumps(event, default=str)}\n\n"
+    
+    response = app.response_class(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Keep proxies from buffering the stream
+    response.call_on_close(events.unsubscribe)
+    return response
+
 @app.route('/api/status')
 def get_status():
     """Get system status"""
@@ -763,7 +5247,21 @@ def get_status():
             'status': 'online',
             'timestamp': datetime.now().isoformat(),
             'service': 'social-media-poster',
-            'version': '1.0.0'
+            'version': '1.0.0',
+            'sheet_cache': dict(poster.sheet_cache.stats),
+            'scheduler': scheduler.status(),
+            'http': poster.http.stats(),
+            'media_cache': poster.media_cache.status() if poster.media_cache else None,
+            'instagram_poller': poster.ig_poller.status(),
+            'jobs': jobs.status(),
+            'ledger': {**poster.ledger.status(), 'write_through': poster.ledger_write_through} if poster.ledger else None,
+            'rate_limits': poster.rate_limiter.status(),
+            'accounts': poster.accounts.status(),
+            'events': events.status(),
+            'media_prefetch': poster.prefetcher.status() if poster.prefetcher else None,
+            'retries': poster.retry_worker.status() if poster.retry_worker else None,
+            'shards': poster.shards.status() if poster.shards else None,
+            'startup': startup.status()
         })
         
     except Exception as e:
@@ -772,11 +5270,14 @@ def get_status():
             'error': str(e)
         }), 500
 
+startup.imported()
+
 if __name__ == '__main__':
     # Get port from environment variable or use default
     port = int(os.environ.get('PORT', 8080))
     
     logger.info(f"Starting Social Media Auto Poster server on port {port}")
+    start_app_services()
     
     # Run the Flask app
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Importing main builds the app's poster: keep it from touching a ledger or the sheet
+os.environ.setdefault('LEDGER_PATH', '')
+os.environ.setdefault('START_BACKGROUND_SERVICES', 'false')
@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+
+import main
+from main import JobManager
+
+
+class Poster:
+    """Stands in for SocialMediaPoster: each run blocks until released"""
+
+    def __init__(self, results: list[dict] = None, error: Exception = None):
+        self.results = results or []
+        self.error = error
+        self.release = threading.Event()
+        self.runs = []
+
+    def process_scheduled_posts(self, tolerance_minutes: int = 10, progress=None):
+        self.runs.append(tolerance_minutes)
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        for result in self.results:
+            progress.row_result(result)
+        return self.results
+
+
+def test_a_trigger_joins_the_run_in_flight():
+    poster = Poster([{'index': 0, 'status': 'Posted', 'facebook_success': True, 'instagram_success': True}])
+    manager = JobManager()
+    job, joined = manager.submit_scheduler_run(poster, 10)
+    again, joined_again = manager.submit_scheduler_run(poster, 10)
+    assert (joined, joined_again) == (False, True)
+    assert again is job
+    assert manager.status()['active_job'] == job.id
+
+    poster.release.set()
+    job.future.result(5)
+    assert job.status == 'completed'
+    assert job.summary['total_processed'] == job.summary['both_success'] == 1
+    assert len(job.results) == 1
+    assert poster.runs == [10]
+    assert manager.status()['active_job'] is None
+
+
+def test_a_trigger_after_the_run_starts_a_new_one():
+    poster = Poster()
+    poster.release.set()
+    manager = JobManager()
+    first, _ = manager.submit_scheduler_run(poster, 10)
+    first.future.result(5)
+    second, joined = manager.submit_scheduler_run(poster, 10)
+    assert not joined and second is not first
+
+
+def test_a_failing_run_is_reported_on_the_job():
+    poster = Poster(error=RuntimeError('sheet unavailable'))
+    poster.release.set()
+    manager = JobManager()
+    job, _ = manager.submit_scheduler_run(poster, 10)
+    job.future.result(5)
+    assert (job.status, job.error) == ('failed', 'sheet unavailable')
+    assert manager.get(job.id) is job
+
+
+def test_history_is_bounded():
+    poster = Poster()
+    poster.release.set()
+    manager = JobManager(max_history=3)
+    ids = []
+    for _ in range(5):
+        job, _ = manager.submit_scheduler_run(poster, 10)
+        job.future.result(5)
+        ids.append(job.id)
+    assert [manager.get(job_id) is not None for job_id in ids] == [False, False, True, True, True]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    poster = Poster()
+    monkeypatch.setattr(main, 'poster', poster)
+    monkeypatch.setattr(main, 'jobs', JobManager())
+    yield main.app.test_client(), poster
+    poster.release.set()
+
+
+@pytest.mark.parametrize('tolerance', ['10', -1, True, None, [10]])
+def test_run_scheduler_rejects_an_invalid_tolerance(client, tolerance):
+    http, poster = client
+    response = http.post('/api/run-scheduler', json={'tolerance': tolerance})
+    assert response.status_code == 400
+    assert poster.runs == []
+
+
+def test_run_scheduler_joins_a_run_with_the_same_params(client):
+    http, poster = client
+    first = http.post('/api/run-scheduler', json={'tolerance': 5})
+    second = http.post('/api/run-scheduler', json={'tolerance': 5})
+    assert (first.status_code, second.status_code) == (202, 202)
+    assert second.json['joined'] and second.json['job_id'] == first.json['job_id']
+
+
+def test_run_scheduler_refuses_to_join_a_run_with_other_params(client):
+    http, poster = client
+    first = http.post('/api/run-scheduler', json={'tolerance': 5})
+    second = http.post('/api/run-scheduler', json={'tolerance': 30})
+    assert second.status_code == 409
+    assert second.json['job_id'] == first.json['job_id']
+    assert second.json['params'] == {'tolerance': 5}
+
+
+def test_run_scheduler_defaults_the_tolerance(client):
+    http, poster = client
+    poster.release.set()
+    response = http.post('/api/run-scheduler', json={'wait': True})
+    assert response.status_code == 200
+    assert poster.runs == [10]
@@ -0,0 +1,103 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from main import PostLedger
+
+SHEET = 'https://docs.google.com/spreadsheets/d/test'
+KEY = ('id:1', 'hash-1')
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return PostLedger(str(tmp_path / 'ledger.db'), retry_base=60.0, retry_max_attempts=3)
+
+
+def test_claim_is_rejected_while_in_progress(ledger):
+    assert ledger.claim(KEY, SHEET, 2)
+    assert not ledger.claim(KEY, SHEET, 2)
+
+
+def test_concurrent_claims_have_one_winner(ledger):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def claim():
+        barrier.wait()
+        results.append(ledger.claim(KEY, SHEET, 2))
+
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [False] * 7 + [True]
+
+
+def test_posted_row_is_never_claimed_again(ledger):
+    assert ledger.claim(KEY, SHEET, 2)
+    ledger.record_result(KEY, 'Posted', facebook_post_id='fb-1')
+    ledger.mark_synced(ledger.unsynced())
+    assert not ledger.claim(KEY, SHEET, 2)
+
+
+def test_failed_row_is_claimable_only_after_its_status_is_synced(ledger):
+    assert ledger.claim(KEY, SHEET, 2)
+    ledger.record_result(KEY, 'Failed: boom', error='boom')
+    assert not ledger.claim(KEY, SHEET, 2)
+    assert KEY in ledger.settled_keys(SHEET)
+
+    ledger.mark_synced(ledger.unsynced())
+    assert KEY not in ledger.settled_keys(SHEET)
+    assert ledger.claim(KEY, SHEET, 2)
+
+
+def test_mark_synced_skips_a_status_that_changed_since_it_was_read(ledger):
+    assert ledger.claim(KEY, SHEET, 2)
+    ledger.record_result(KEY, 'Failed: first', error='first')
+    stale = ledger.unsynced()
+    ledger.record_result(KEY, 'Failed: second', error='second')
+    ledger.mark_synced(stale)
+    assert [row[4] for row in ledger.unsynced()] == ['Failed: second']
+    assert not ledger.claim(KEY, SHEET, 2)
+
+
+def test_edited_row_is_a_new_post(ledger):
+    assert ledger.claim(KEY, SHEET, 2)
+    ledger.record_result(KEY, 'Posted')
+    assert ledger.claim((KEY[0], 'hash-2'), SHEET, 2)
+
+
+def test_retryable_failure_is_retried_once_due(ledger):
+    assert ledger.claim(KEY, SHEET, 2)
+    ledger.record_result(KEY, 'Failed: timeout', error='timeout', retryable=True)
+    assert ledger.retry_due(datetime.now()) == []
+
+    due = ledger.retry_due(datetime.now() + timedelta(seconds=61))
+    assert [(row[0], row[1]) for row in due] == [KEY]
+    assert ledger.claim_retry(KEY)
+    assert not ledger.claim_retry(KEY)
+
+
+def test_retries_stop_after_max_attempts(ledger):
+    for _ in range(ledger.retry_max_attempts):
+        assert ledger.claim(KEY, SHEET, 2) or ledger.claim_retry(KEY)
+        ledger.record_result(KEY, 'Failed: timeout', error='timeout', retryable=True)
+    assert ledger.retry_due(datetime.now() + timedelta(days=1)) == []
+
+
+def test_cancelled_retry_is_not_claimed(ledger):
+    assert ledger.claim(KEY, SHEET, 2)
+    ledger.record_result(KEY, 'Failed: timeout', error='timeout', retryable=True)
+    ledger.cancel_retry(KEY)
+    assert not ledger.claim_retry(KEY)
+
+
+def test_stages_are_kept_per_account(ledger):
+    assert ledger.claim(KEY, SHEET, 2)
+    ledger.record_stage(KEY, 'main', PostLedger.STAGE_FACEBOOK_POSTED, 'fb-1')
+    ledger.record_stage(KEY, 'main', PostLedger.STAGE_INSTAGRAM_CONTAINER, 'c-1')
+    ledger.record_stage(KEY, 'main', PostLedger.STAGE_INSTAGRAM_CONTAINER, 'c-2')
+    assert ledger.stages(KEY) == {'main': {PostLedger.STAGE_FACEBOOK_POSTED: 'fb-1',
+                                           PostLedger.STAGE_INSTAGRAM_CONTAINER: 'c-2'}}
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from main import MediaPayload, SocialMediaPoster
+
+SHEET_URL = 'https://docs.google.com/spreadsheets/d/test'
+
+
+class StatusBuffer:
+    def __init__(self):
+        self.statuses = {}
+        self.flushed = 0
+
+    def queue(self, index, status: str):
+        self.statuses[index] = status
+
+    def queue_key(self, row_key: str, status: str):
+        self.statuses[row_key] = status
+
+    def flush(self):
+        self.flushed += 1
+
+
+class InFlight:
+    """Counts the calls running at once"""
+
+    def __init__(self, seconds: float = 0.05):
+        self.seconds = seconds
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, result):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.current -= 1
+        return result
+
+
+@pytest.fixture
+def poster(monkeypatch):
+    monkeypatch.setenv('PUBLISH_WORKERS', '4')
+    monkeypatch.setenv('FB_CONCURRENCY', '2')
+    monkeypatch.setenv('IG_CONCURRENCY', '3')
+    poster = SocialMediaPoster()
+    buffer = StatusBuffer()
+    monkeypatch.setattr(poster, 'create_status_buffer', lambda *args, **kwargs: buffer)
+    monkeypatch.setattr(poster, 'fetch_media', lambda url: MediaPayload(url, 'image/jpeg', data=b'\xff\xd8\xff' + b'0' * 64))
+    poster.status_buffer = buffer
+    return poster
+
+
+def ready_posts(count: int) -> list[dict]:
+    columns = SocialMediaPoster
+    return [{'index': number, 'row': {columns.IMAGEURL_COL: f"https://example.com/{number}.jpg",
+                                      columns.CAPTION_COL: f"post {number}", columns.HASHTAGS_COL: '#test'},
+             'spreadsheet_url': SHEET_URL}
+            for number in range(count)]
+
+
+def test_posts_are_published_concurrently_within_the_platform_limits(poster, monkeypatch):
+    facebook, instagram = InFlight(), InFlight()
+    monkeypatch.setattr(poster, 'upload_media_to_facebook', lambda *args: facebook((True, 'fb')))
+    monkeypatch.setattr(poster, 'upload_image_to_instagram', lambda *args, **kwargs: instagram((True, 'ig')))
+
+    results = poster.publish_ready_posts(ready_posts(12))
+
+    assert [result['status'] for result in results] == ['Posted'] * 12
+    assert facebook.peak == 2
+    assert 1 < instagram.peak <= 3
+    assert poster.status_buffer.statuses == {number: 'Posted' for number in range(12)}
+    assert poster.status_buffer.flushed == 1
+
+
+def test_results_keep_the_order_of_the_ready_posts(poster, monkeypatch):
+    def facebook(media, caption, hashtags, account):
+        time.sleep(0.01 * (12 - int(caption.split()[1]))) # Later posts finish first
+        return True, 'fb'
+
+    monkeypatch.setattr(poster, 'upload_media_to_facebook', facebook)
+    monkeypatch.setattr(poster, 'upload_image_to_instagram', lambda *args, **kwargs: (True, 'ig'))
+
+    results = poster.publish_ready_posts(ready_posts(12))
+    assert [result['index'] for result in results] == list(range(12))
+
+
+def test_a_failing_platform_does_not_stop_the_other(poster, monkeypatch):
+    monkeypatch.setattr(poster, 'upload_media_to_facebook', lambda *args: (False, 'Invalid token'))
+    monkeypatch.setattr(poster, 'upload_image_to_instagram', lambda *args, **kwargs: (True, 'ig'))
+
+    results = poster.publish_ready_posts(ready_posts(3))
+    assert [result['status'] for result in results] == ['Failed FB'] * 3
+    assert poster.status_buffer.statuses == {number: 'Failed FB' for number in range(3)}
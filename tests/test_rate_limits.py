@@ -0,0 +1,182 @@
+import json
+import time
+
+import pytest
+
+from main import GraphRateLimiter, PublishingQuota, TokenBucket
+
+
+class Clock:
+    """Stands in for time.time, time.monotonic and time.sleep"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'time', clock)
+    monkeypatch.setattr(time, 'monotonic', clock)
+    monkeypatch.setattr(time, 'sleep', clock.sleep)
+    return clock
+
+
+class Response:
+    def __init__(self, status_code: int, body='{}', headers: dict = None):
+        self.status_code = status_code
+        self.text = body
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def test_bucket_allows_a_burst_then_refills(clock):
+    bucket = TokenBucket(60, 60, burst=2)
+    assert bucket.acquire(0) and bucket.acquire(0)
+    assert not bucket.acquire(0)
+    clock.now += 1
+    assert bucket.acquire(0)
+    assert not bucket.acquire(0)
+
+
+def test_bucket_waits_up_to_max_wait(clock):
+    bucket = TokenBucket(1, 10, burst=1)
+    assert bucket.acquire(0)
+    assert not bucket.acquire(5)
+    started = clock.now
+    assert bucket.acquire(10)
+    assert clock.now - started == pytest.approx(10)
+
+
+def test_paused_bucket_refuses_until_the_pause_ends(clock):
+    bucket = TokenBucket(60, 60, burst=5)
+    bucket.pause(30)
+    clock.now += 10 # Refilled, but still paused
+    assert not bucket.acquire(0)
+    clock.now += 21
+    assert bucket.acquire(0)
+
+
+def test_scaled_bucket_refills_slower(clock):
+    bucket = TokenBucket(60, 60, burst=1)
+    assert bucket.acquire(0)
+    bucket.set_scale(0.5)
+    clock.now += 1
+    assert not bucket.acquire(0)
+    clock.now += 1
+    assert bucket.acquire(0)
+
+
+def test_quota_grants_the_whole_allowance_at_once(clock):
+    quota = PublishingQuota(50, 24 * 3600)
+    assert all(quota.acquire(0) for _ in range(50))
+    assert not quota.acquire(3600)
+    assert quota.status()['remaining'] == 0
+
+
+def test_quota_rolls_over_one_grant_at_a_time(clock):
+    quota = PublishingQuota(2, 24 * 3600)
+    assert quota.acquire(0)
+    clock.now += 3600
+    assert quota.acquire(0)
+    assert not quota.acquire(0)
+    clock.now += 23 * 3600 # The first grant leaves the window
+    assert quota.acquire(0)
+    assert not quota.acquire(0)
+    clock.now += 3600
+    assert quota.acquire(0)
+
+
+def test_release_gives_a_grant_back(clock):
+    quota = PublishingQuota(1, 3600)
+    assert quota.acquire(0)
+    quota.release()
+    assert quota.acquire(0)
+
+
+def test_quota_counts_usage_reported_by_the_api(clock):
+    quota = PublishingQuota(50, 24 * 3600, sync_interval=300)
+    assert quota.needs_sync()
+    quota.sync(used=49)
+    assert not quota.needs_sync()
+    assert quota.acquire(0)
+    assert not quota.acquire(0)
+    clock.now += 300
+    assert quota.needs_sync()
+    quota.sync(used=10) # Earlier posts left Meta's window
+    assert quota.acquire(0)
+
+
+def test_reported_limit_only_lowers_the_quota(clock):
+    quota = PublishingQuota(50, 24 * 3600)
+    quota.sync(used=0, limit=100)
+    assert quota.limit == 50
+    quota.sync(used=0, limit=25)
+    assert quota.limit == 25
+
+
+def test_paused_quota_refuses_calls(clock):
+    quota = PublishingQuota(50, 24 * 3600)
+    quota.pause(60)
+    assert not quota.acquire(30)
+    assert quota.acquire(60)
+
+
+@pytest.fixture
+def limiter(clock):
+    return GraphRateLimiter({'facebook_photos': (60, 60, 5), 'instagram_publish': (50, 24 * 3600, None)},
+                            cooldown=60.0)
+
+
+def test_observe_pauses_the_endpoint_on_429(limiter, clock):
+    limiter.observe('facebook_photos', Response(429))
+    assert limiter.throttled['facebook_photos'] == 1
+    assert not limiter.buckets['facebook_photos'].acquire(30)
+    clock.now += 61
+    assert limiter.buckets['facebook_photos'].acquire(0)
+
+
+def test_observe_pauses_the_endpoint_on_a_throttle_error_code(limiter):
+    limiter.observe('facebook_photos', Response(400, '{"error": {"code": 613, "message": "Calls limited"}}'))
+    assert limiter.throttled['facebook_photos'] == 1
+    limiter.observe('facebook_photos', Response(400, '{"error": {"code": 100, "message": "Invalid parameter"}}'))
+    assert limiter.throttled['facebook_photos'] == 1
+
+
+def test_observe_waits_for_the_time_meta_estimates(limiter, clock):
+    usage = json.dumps({'123': [{'type': 'pages', 'call_count': 100, 'estimated_time_to_regain_access': 5}]})
+    limiter.observe('facebook_photos', Response(200, headers={'X-Business-Use-Case-Usage': usage}))
+    clock.now += 299
+    assert not limiter.buckets['facebook_photos'].acquire(0)
+    clock.now += 2
+    assert limiter.buckets['facebook_photos'].acquire(0)
+
+
+@pytest.mark.parametrize('body', ['["error"]', '"Bad Gateway"', '{"error": "text"}', '{"error": null}', '<html>'])
+def test_observe_tolerates_error_bodies_that_are_not_graph_errors(limiter, body):
+    limiter.observe('facebook_photos', Response(502, body))
+    assert limiter.throttled['facebook_photos'] == 0
+    assert GraphRateLimiter.error_code(Response(502, body)) is None
+
+
+def test_usage_headers_slow_the_bucket_down(limiter):
+    limiter.observe('facebook_photos', Response(200, headers={'X-App-Usage': '{"call_count": 90}'}))
+    assert limiter.buckets['facebook_photos'].scale == pytest.approx(0.4)
+    limiter.observe('facebook_photos', Response(200, headers={'X-App-Usage': '{"call_count": 10}'}))
+    assert limiter.buckets['facebook_photos'].scale == 1.0
+
+
+def test_acquire_raises_once_the_quota_is_used(limiter):
+    from main import RateLimitExceeded
+    for _ in range(50):
+        limiter.acquire('instagram_publish', max_wait=0)
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire('instagram_publish', max_wait=0)
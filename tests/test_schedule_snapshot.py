@@ -0,0 +1,100 @@
+import csv
+from datetime import datetime, timedelta
+from io import StringIO
+
+import pytest
+
+from main import ScheduleSnapshot, SocialMediaPoster
+
+SHEET_URL = 'https://docs.google.com/spreadsheets/d/test'
+NOW = datetime(2025, 6, 12, 9, 0)
+HEADER = ['Date', 'Post Timings', 'Caption', 'Hashtags', 'Filename.jpg', 'Status']
+ROWS = [
+    ['12 June 2025', '9:00 AM', 'due now', '#a', 'https://example.com/0.jpg', ''],
+    ['12 June 2025', '9:05 AM', 'due in 5 minutes', '#a', 'https://example.com/1.jpg', 'Pending'],
+    ['12 June 2025', '9:00 AM', 'already posted', '#a', 'https://example.com/2.jpg', 'Posted'],
+    ['2025-06-12', '10:30', 'later today', '#b', 'https://example.com/3.jpg', 'scheduled'],
+    ['', '9:00 AM', 'no date', '#b', 'https://example.com/4.jpg', ''],
+    ['12 June 2025', 'soon', 'unparseable time', '#b', 'https://example.com/5.jpg', ''],
+    ['11 June 2025', '9:00 AM', 'yesterday', '#a', 'https://example.com/6.jpg', 'Failed FB'],
+    ['11 June 2025', '8:50 PM', 'last night', '#a', 'https://example.com/7.jpg', ''],
+]
+
+
+def sheet_csv(rows=ROWS) -> str:
+    out = StringIO()
+    csv.writer(out).writerows([HEADER, *rows])
+    return out.getvalue()
+
+
+@pytest.fixture
+def poster(monkeypatch):
+    monkeypatch.setenv('SHEET_BACKEND', 'pandas')
+    return SocialMediaPoster()
+
+
+@pytest.fixture
+def sheet(poster):
+    return poster._assign_row_identity(poster.table_from_csv(sheet_csv()), SHEET_URL)
+
+
+def captions(snapshot, positions) -> list[str]:
+    return [snapshot.record(position)['Caption'] for position in positions]
+
+
+def test_snapshot_keeps_only_pending_rows_with_a_schedule(poster, sheet):
+    snapshot = poster.schedule_snapshot(sheet)
+    assert captions(snapshot, range(len(snapshot))) == [
+        'due now', 'due in 5 minutes', 'later today', 'unparseable time', 'last night']
+    assert [snapshot.record(position).index for position in range(len(snapshot))] == [0, 1, 3, 5, 7]
+    assert list(snapshot.status_codes) == [ScheduleSnapshot.STATUS_BLANK, 1, 2, ScheduleSnapshot.STATUS_BLANK,
+                                           ScheduleSnapshot.STATUS_BLANK]
+
+
+def test_snapshot_parses_each_schedule(poster, sheet):
+    snapshot = poster.schedule_snapshot(sheet)
+    assert [snapshot.scheduled_datetime(position) for position in range(len(snapshot))] == [
+        datetime(2025, 6, 12, 9, 0), datetime(2025, 6, 12, 9, 5), datetime(2025, 6, 12, 10, 30), None,
+        datetime(2025, 6, 11, 20, 50)]
+
+
+def test_due_positions_match_is_time_to_post(poster, sheet):
+    snapshot = poster.schedule_snapshot(sheet)
+    for tolerance in (0, 5, 10, 90):
+        due = captions(snapshot, snapshot.due_positions(NOW, tolerance))
+        expected = [snapshot.record(position)['Caption'] for position in range(len(snapshot))
+                    if snapshot.scheduled_datetime(position) is not None
+                    and abs(snapshot.scheduled_datetime(position) - NOW) <= timedelta(minutes=tolerance)]
+        assert due == expected
+    assert captions(snapshot, snapshot.due_positions(NOW, 5)) == ['due now', 'due in 5 minutes']
+
+
+def test_range_queries(poster, sheet):
+    snapshot = poster.schedule_snapshot(sheet)
+    assert captions(snapshot, snapshot.positions_between(NOW, NOW + timedelta(hours=1))) == ['due now', 'due in 5 minutes']
+    assert captions(snapshot, snapshot.upcoming_positions(NOW + timedelta(minutes=1))) == ['due in 5 minutes', 'later today']
+
+
+def test_records_read_like_sheet_rows(poster, sheet):
+    snapshot = poster.schedule_snapshot(sheet)
+    row = snapshot.record(1)
+    assert row['Filename.jpg'] == 'https://example.com/1.jpg'
+    assert row.get(poster.SOURCE_COL) == SHEET_URL
+    assert row.get(poster.SHEET_ROW_COL) == 3
+    assert row.get('No such column', 'default') == 'default'
+    assert row.scheduled_datetime == datetime(2025, 6, 12, 9, 5)
+
+
+def test_snapshot_is_built_once_per_loaded_sheet(poster, sheet):
+    snapshot = poster.schedule_snapshot(sheet)
+    assert poster.schedule_snapshot(sheet) is snapshot
+    reloaded = poster._assign_row_identity(poster.table_from_csv(sheet_csv()), SHEET_URL)
+    assert poster.schedule_snapshot(reloaded) is not snapshot
+
+
+def test_repeated_text_is_stored_once(poster):
+    rows = [['12 June 2025', '9:00 AM', f"post {number}", '#same', f"https://example.com/{number}.jpg", '']
+            for number in range(50)]
+    sheet = poster._assign_row_identity(poster.table_from_csv(sheet_csv(rows)), SHEET_URL)
+    hashtags = poster.schedule_snapshot(sheet).columns['Hashtags']
+    assert len({id(value) for value in hashtags}) == 1
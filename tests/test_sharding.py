@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from main import FileLeaseStore, ShardCoordinator, SQLiteLeaseStore
+
+POST = 'id:1|hash-1'
+SHEET_URL = 'https://docs.google.com/spreadsheets/d/test'
+TTL = 60.0
+NOW = 1_000_000.0
+
+
+@pytest.fixture(params=['sqlite', 'file'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteLeaseStore(str(tmp_path / 'leases.db'))
+    return FileLeaseStore(str(tmp_path / 'leases'))
+
+
+def test_lease_held_by_another_instance_is_rejected(store):
+    assert store.acquire(POST, 'a', TTL, NOW)
+    assert not store.acquire(POST, 'b', TTL, NOW + 1)
+
+
+def test_expired_lease_can_be_stolen(store):
+    assert store.acquire(POST, 'a', TTL, NOW)
+    assert not store.acquire(POST, 'b', TTL, NOW + TTL)
+    assert store.acquire(POST, 'b', TTL, NOW + TTL + 1)
+    # The old holder's late completion no longer applies
+    store.complete(POST, 'a', 'released', NOW + TTL + 2)
+    assert not store.acquire(POST, 'c', TTL, NOW + TTL + 3)
+
+
+def test_posted_lease_is_never_acquired_again(store):
+    assert store.acquire(POST, 'a', TTL, NOW)
+    store.complete(POST, 'a', 'posted', NOW + 1)
+    assert not store.acquire(POST, 'b', TTL, NOW + 10 * TTL)
+    assert not store.acquire(POST, 'a', TTL, NOW + 10 * TTL)
+
+
+def test_partial_lease_stays_with_its_holder(store):
+    assert store.acquire(POST, 'a', TTL, NOW)
+    store.complete(POST, 'a', 'partial', NOW + 1)
+    assert not store.acquire(POST, 'b', TTL, NOW + 10 * TTL)
+    assert store.acquire(POST, 'a', TTL, NOW + 10 * TTL)
+
+
+def test_released_lease_is_free_for_anyone(store):
+    assert store.acquire(POST, 'a', TTL, NOW)
+    store.complete(POST, 'a', 'released', NOW + 1)
+    assert store.acquire(POST, 'b', TTL, NOW + 2)
+
+
+def test_members_are_the_recent_heartbeats(store):
+    store.heartbeat('a', NOW)
+    store.heartbeat('b', NOW - 2 * TTL)
+    assert store.members(NOW - TTL) == ['a']
+    store.leave('a')
+    assert store.members(NOW - TTL) == []
+
+
+def test_prune_keeps_active_leases(store):
+    assert store.acquire('done', 'a', TTL, NOW)
+    store.complete('done', 'a', 'posted', NOW)
+    assert store.acquire('active', 'a', TTL, NOW)
+    store.prune(NOW + 1)
+    assert store.acquire('done', 'b', TTL, NOW + 2)
+    assert not store.acquire('active', 'b', TTL, NOW + 2)
+
+
+@pytest.fixture
+def coordinators(tmp_path):
+    store = SQLiteLeaseStore(str(tmp_path / 'leases.db'))
+    started = [ShardCoordinator(store, instance_id=name, steal_after=120.0) for name in ('a', 'b')]
+    for coordinator in started:
+        coordinator.start()
+    yield started
+    for coordinator in started:
+        coordinator.stop()
+
+
+def test_every_post_has_one_owner_that_all_instances_agree_on(coordinators):
+    a, b = coordinators
+    assert a.members() == b.members() == ['a', 'b']
+    posts = [f"id:{number}|hash" for number in range(200)]
+    owners = [a.owner(post) for post in posts]
+    assert owners == [b.owner(post) for post in posts]
+    assert {'a', 'b'} == set(owners)
+
+
+def test_overdue_posts_of_another_instance_are_stolen(coordinators):
+    a, b = coordinators
+    post = next(f"id:{number}|hash" for number in range(200) if a.owner(f"id:{number}|hash") == 'b')
+    now = datetime.now()
+    assert not a.should_take(post, now - timedelta(seconds=60), now)
+    assert a.should_take(post, now - timedelta(seconds=120), now)
+
+
+def test_a_post_goes_to_one_instance(coordinators):
+    a, b = coordinators
+    assert a.acquire(POST)
+    assert not b.acquire(POST)
+    assert b.stats['taken'] == 1
+    a.complete(POST, 'posted')
+    assert not b.acquire(POST)
+
+
+def test_status_does_not_join_the_shards(tmp_path):
+    store = SQLiteLeaseStore(str(tmp_path / 'leases.db'))
+    coordinator = ShardCoordinator(store, instance_id='idle')
+    assert coordinator.status()['members'] == ['idle']
+    assert not coordinator.status()['heartbeat_running']
+    assert store.members(0.0) == []
+
+
+@pytest.fixture
+def sharded_poster(tmp_path, monkeypatch):
+    import main
+    monkeypatch.setenv('LEDGER_PATH', str(tmp_path / 'ledger.db'))
+    poster = main.SocialMediaPoster()
+    poster.shards = ShardCoordinator(SQLiteLeaseStore(str(tmp_path / 'leases.db')), instance_id='me')
+    yield poster
+    poster.shards.stop()
+
+
+def ready_post(poster, number: int) -> dict:
+    row = {'Image URL': f"https://example.com/{number}.jpg", 'Caption': f"post {number}"}
+    return {'index': number, 'row': row, 'spreadsheet_url': SHEET_URL,
+            'scheduled_datetime': datetime.now() - timedelta(seconds=600)}
+
+
+def test_lease_of_a_row_the_ledger_refuses_is_released(sharded_poster):
+    post = ready_post(sharded_poster, 1)
+    key = sharded_poster.ledger_key(SHEET_URL, 1, post['row'])
+    assert sharded_poster.ledger.claim(key, SHEET_URL, 3)
+    sharded_poster.ledger.record_result(key, 'Failed: boom', error='boom') # Status not written back yet
+
+    assert sharded_poster.publish_ready_posts([post]) == []
+    assert sharded_poster.shards.store.acquire(sharded_poster.shard_key(post), 'other', TTL, datetime.now().timestamp())
+
+
+def test_lease_of_a_posted_row_stays_posted(sharded_poster):
+    post = ready_post(sharded_poster, 1)
+    key = sharded_poster.ledger_key(SHEET_URL, 1, post['row'])
+    assert sharded_poster.ledger.claim(key, SHEET_URL, 3)
+    sharded_poster.ledger.record_result(key, 'Posted')
+
+    assert sharded_poster.publish_ready_posts([post]) == []
+    assert not sharded_poster.shards.store.acquire(sharded_poster.shard_key(post), 'other', TTL, datetime.now().timestamp())
+
+
+def test_leases_are_released_when_the_ledger_fails(sharded_poster, monkeypatch):
+    posts = [ready_post(sharded_poster, number) for number in range(3)]
+    claims = []
+
+    def claim(*args, **kwargs):
+        if len(claims) == 2:
+            raise RuntimeError('database is locked')
+        claims.append(args)
+        return True
+
+    monkeypatch.setattr(sharded_poster.ledger, 'claim', claim)
+    with pytest.raises(RuntimeError):
+        sharded_poster.publish_ready_posts(posts)
+    now = datetime.now().timestamp()
+    assert all(sharded_poster.shards.store.acquire(sharded_poster.shard_key(post), 'other', TTL, now) for post in posts)
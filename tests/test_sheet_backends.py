@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pytest
+
+from main import SheetTable, SocialMediaPoster
+
+SHEET_URL = 'https://docs.google.com/spreadsheets/d/test'
+CSV = """Date,Post Timings,Caption,Hashtags,Filename.jpg,Status,Notes,Notes
+12 June 2025,9:00 AM,first,#a,https://example.com/0.jpg,,x,y
+12 June 2025,9:05 AM,"quoted, with comma",#a,https://example.com/1.jpg,Pending,N/A,
+12 June 2025,9:00 AM,posted,#a,https://example.com/2.jpg,Posted,,
+
+2025-06-12,10:30,later,#b,https://example.com/3.jpg,scheduled,,
+,9:00 AM,no date,#b,https://example.com/4.jpg,,,
+12 June 2025,soon,bad time,#b,https://example.com/5.jpg,NULL,,
+"""
+
+
+def poster_for(monkeypatch, backend: str) -> SocialMediaPoster:
+    monkeypatch.setenv('SHEET_BACKEND', backend)
+    return SocialMediaPoster()
+
+
+def cell(value):
+    """A cell as comparable across backends: missing cells (NaN or None) as None"""
+    return None if value is None or (isinstance(value, float) and math.isnan(value)) else value
+
+
+def test_csv_is_read_as_pandas_reads_it(monkeypatch):
+    pandas_df = poster_for(monkeypatch, 'pandas').table_from_csv(CSV)
+    table = SheetTable.from_csv(CSV)
+    assert list(table.columns) == list(pandas_df.columns) == [
+        'Date', 'Post Timings', 'Caption', 'Hashtags', 'Filename.jpg', 'Status', 'Notes', 'Notes.1']
+    assert len(table) == len(pandas_df) == 7 # The blank line stays a row
+    for name in pandas_df.columns:
+        assert [cell(value) for value in table[name]] == [cell(value) for value in pandas_df[name]], name
+
+
+def test_short_rows_are_padded_with_missing_cells():
+    table = SheetTable.from_rows(['Date', 'Caption', 'Status'], [['12 June 2025'], ['12 June 2025', 'x', 'Posted', 'extra']])
+    assert [cell(value) for value in table['Caption']] == [None, 'x']
+    assert list(table.columns) == ['Date', 'Caption', 'Status']
+
+
+def test_concat_takes_the_union_of_columns():
+    first = SheetTable.from_rows(['Date', 'Caption'], [['d1', 'c1']])
+    second = SheetTable.from_rows(['Date', 'Status'], [['d2', 'Posted']])
+    merged = SheetTable.concat([first, second])
+    assert list(merged.columns) == ['Date', 'Caption', 'Status']
+    assert [cell(value) for value in merged['Caption']] == ['c1', None]
+    assert [cell(value) for value in merged['Status']] == [None, 'Posted']
+
+
+@pytest.fixture
+def snapshots(monkeypatch):
+    result = {}
+    for backend in ('pandas', 'csv'):
+        poster = poster_for(monkeypatch, backend)
+        sheet = poster._assign_row_identity(poster.table_from_csv(CSV), SHEET_URL)
+        result[backend] = (poster, poster.schedule_snapshot(sheet))
+    return result
+
+
+def test_both_backends_build_the_same_schedule(snapshots):
+    (_, pandas_snapshot), (_, csv_snapshot) = snapshots['pandas'], snapshots['csv']
+    assert list(csv_snapshot.index) == list(pandas_snapshot.index) == [0, 1, 4, 6]
+    assert np.array_equal(csv_snapshot.scheduled_seconds, pandas_snapshot.scheduled_seconds)
+    assert np.array_equal(csv_snapshot.status_codes, pandas_snapshot.status_codes)
+    assert csv_snapshot.columns.keys() == pandas_snapshot.columns.keys()
+    for name in pandas_snapshot.columns:
+        assert [cell(value) for value in csv_snapshot.columns[name]] == \
+               [cell(value) for value in pandas_snapshot.columns[name]], name
+
+
+def test_both_backends_key_posts_alike(snapshots):
+    keys = {}
+    for backend, (poster, snapshot) in snapshots.items():
+        keys[backend] = [poster.ledger_key(SHEET_URL, row.index, row) for row in snapshot.records()]
+    assert keys['csv'] == keys['pandas']
+    assert len(set(keys['csv'])) == 4